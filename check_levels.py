@@ -0,0 +1,81 @@
+from modules.headless import use_dummy_drivers, map_in_workers
+
+# Levels are searched without a window or sound
+use_dummy_drivers()
+
+import argparse
+import glob
+import os
+import re
+import time
+from dev_modules.solvability import SolvabilityChecker
+
+"""
+* =============================================================== *
+* This is the entry point for the level solvability checks.       *
+* Every level is searched in parallel to find out if its gateway  *
+* can be reached from the starting position.                      *
+* =============================================================== *
+
+USAGE
+-------------------------
+    python check_levels.py                  Checks every level in assets/levels/
+    python check_levels.py LEVEL [LEVEL]    Checks the given level files
+
+Each level is reported as one of:
+    SOLVABLE        ->      The gateway can be reached
+    PUSH            ->      The gateway can only be reached if the pushable blocks are moved out of the way
+    UNREACHABLE     ->      The gateway cannot be reached
+    INCONCLUSIVE    ->      The level was too large to search completely
+"""
+
+
+def check_level(filepath: str):
+    """Searches a single level in a worker process"""
+    return SolvabilityChecker(filepath).check()
+
+
+def get_level_number(filepath: str) -> int:
+    """Returns the number in the name of a level file, so that level10 is sorted after level9"""
+    match = re.search(r"(\d+)", os.path.basename(filepath))
+    return int(match.group(1)) if match else 0
+
+
+def main() -> None:
+    """Checks every level given on the command line"""
+    parser = argparse.ArgumentParser(description="Checks that the levels of The Tower can be completed")
+    parser.add_argument("levels", nargs="*", metavar="LEVEL", help="level file to check (default: every level)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+
+    filepaths = args.levels
+    if len(filepaths) == 0:
+        filepaths = sorted(glob.glob("assets/levels/level*.json"), key=get_level_number)
+
+    start_time = time.perf_counter()
+
+    results = map_in_workers(check_level, filepaths, args.workers)
+
+    failures = 0
+    for result in results:
+        if result.is_solvable:
+            status = "SOLVABLE"
+        elif result.needs_pushable_blocks:
+            status = "PUSH"
+        elif result.is_conclusive:
+            status = "UNREACHABLE"
+            failures += 1
+        else:
+            status = "INCONCLUSIVE"
+
+        print("%-12s %s: %d states, %d tiles reached in %.2f s"
+              % (status, result.filepath, result.states_searched, result.tiles_reached, result.search_time))
+
+    print("%d levels checked in %.2f s, %d unreachable"
+          % (len(results), time.perf_counter() - start_time, failures))
+    if failures > 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+from modules.headless import use_dummy_drivers, map_in_workers
+
+# Replays are played back without a window or sound
+use_dummy_drivers()
+
+import argparse
+import glob
+import os
+import time
+from modules.replay import Replay, ReplayRunner
+
+"""
+* =============================================================== *
+* This is the entry point for the gameplay regression checks.     *
+* Every replay in a directory is played back in parallel, and the *
+* state hashes of each run are compared against a golden trace.   *
+* =============================================================== *
+
+USAGE
+-------------------------
+    python check_replays.py DIRECTORY --update      Records a golden trace for every replay in DIRECTORY
+    python check_replays.py DIRECTORY               Checks every replay in DIRECTORY against its golden trace
+
+The golden trace of a replay is stored next to it, with the extension ".trace". Each line of a trace
+holds the step number and the hash of the state after that step.
+"""
+
+TRACE_EXTENSION = ".trace"
+
+
+def load_trace(filepath: str) -> list:
+    """Reads a trace from the specified file"""
+    trace = []
+    with open(filepath) as f:
+        for line in f:
+            step, state_hash = line.split()
+            trace.append((int(step), state_hash))
+    return trace
+
+
+def save_trace(filepath: str, trace: list):
+    """Writes a trace to the specified file"""
+    with open(filepath, "w") as f:
+        for step, state_hash in trace:
+            f.write(str(step) + " " + state_hash + "\n")
+
+
+def check_replay(job: tuple) -> tuple:
+    """Plays back a single replay and compares it against its golden trace.
+    Returns the path of the replay, the status and a description of the result."""
+    filepath, interval, update = job
+    trace_filepath = os.path.splitext(filepath)[0] + TRACE_EXTENSION
+
+    result, trace = ReplayRunner(Replay.load(filepath)).run_trace(interval)
+    summary = "%s after %d steps in %.2f s" % (result.outcome, result.steps, result.elapsed_time)
+
+    if update:
+        save_trace(trace_filepath, trace)
+        return filepath, "UPDATED", summary
+    if not os.path.exists(trace_filepath):
+        return filepath, "MISSING", "no golden trace, run with --update first"
+
+    golden_trace = load_trace(trace_filepath)
+    for (step, state_hash), (golden_step, golden_hash) in zip(trace, golden_trace):
+        if step != golden_step or state_hash != golden_hash:
+            return filepath, "FAIL", "state diverges by step " + str(golden_step)
+    if len(trace) != len(golden_trace):
+        return filepath, "FAIL", "ended after %d steps, expected %d" % (trace[-1][0], golden_trace[-1][0])
+
+    return filepath, "PASS", summary
+
+
+def main() -> None:
+    """Checks every replay in the directory given on the command line"""
+    parser = argparse.ArgumentParser(description="Checks replays of The Tower against golden state traces")
+    parser.add_argument("directory", help="directory containing the replays")
+    parser.add_argument("--update", action="store_true", help="record new golden traces instead of checking")
+    parser.add_argument("--interval", type=int, default=30, help="number of steps between state hashes")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+
+    filepaths = sorted(glob.glob(os.path.join(args.directory, "*.replay")))
+    if len(filepaths) == 0:
+        print("No replays found in " + args.directory)
+        return
+
+    start_time = time.perf_counter()
+    jobs = [(filepath, args.interval, args.update) for filepath in filepaths]
+
+    results = map_in_workers(check_replay, jobs, args.workers)
+
+    failures = 0
+    for filepath, status, description in results:
+        print("%-8s %s: %s" % (status, filepath, description))
+        if status in ("FAIL", "MISSING"):
+            failures += 1
+
+    print("%d replays checked in %.2f s, %d failed" % (len(results), time.perf_counter() - start_time, failures))
+    if failures > 0:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
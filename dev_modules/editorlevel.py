@@ -32,6 +32,12 @@ class EditorLevel:
         starting_position = data["starting_position"]
         self.player = EditorPlayer(starting_position)
 
+        # The editor cannot change the backgrounds, lighting or visibility, but keeps them so that they are saved
+        # with the level
+        self.backgrounds = data.get("backgrounds")
+        self.lighting = data.get("lighting")
+        self.visibility = data.get("visibility")
+
         # TOGGLES
         self.draw_enemies = True
         self.draw_player_starting_position = True
@@ -63,10 +69,17 @@ class EditorLevel:
         }
         enemies = self.enemies.serialise_to_list()
 
-        return {"enemies": enemies,
-                "map": map,
-                "starting_position": starting_position
-                }
+        level_dict = {"enemies": enemies,
+                      "map": map,
+                      "starting_position": starting_position
+                      }
+        if self.backgrounds is not None:
+            level_dict["backgrounds"] = self.backgrounds
+        if self.lighting is not None:
+            level_dict["lighting"] = self.lighting
+        if self.visibility is not None:
+            level_dict["visibility"] = self.visibility
+        return level_dict
 
     def render(self, camera, surface):
         self.map.render(camera, surface)
@@ -107,10 +120,13 @@ class EditorMap(Map):
                     sprite.kill()
                     break
             # then add the new sprite in
+            new_block = None
             if code != "  ":
-                self.background_terrain_group.add(Block(self.texture_set.get_texture_from_code(code),
-                                                        col * Block.BLOCK_SIZE,
-                                                        row * Block.BLOCK_SIZE))
+                new_block = Block(self.texture_set.get_texture_from_code(code),
+                                  col * Block.BLOCK_SIZE,
+                                  row * Block.BLOCK_SIZE)
+                self.background_terrain_group.add(new_block)
+            self.background_tiles.set(row, col, new_block)
         elif layer == 2:
             self.decorations_array[row][col] = code
             for sprite in self.middle_ground_terrain_group:
@@ -118,10 +134,13 @@ class EditorMap(Map):
                     sprite.kill()
                     break
 
+            new_block = None
             if code != "  ":
-                self.middle_ground_terrain_group.add(Block(self.texture_set.get_texture_from_code(code),
-                                                           col * Block.BLOCK_SIZE,
-                                                           row * Block.BLOCK_SIZE))
+                new_block = Block(self.texture_set.get_texture_from_code(code),
+                                  col * Block.BLOCK_SIZE,
+                                  row * Block.BLOCK_SIZE)
+                self.middle_ground_terrain_group.add(new_block)
+            self.middle_ground_tiles.set(row, col, new_block)
         elif layer == 3:
             self.terrain_array[row][col] = code
             for sprite in self.collideable_terrain_group:
@@ -133,6 +152,7 @@ class EditorMap(Map):
                     sprite.kill()
                     break
 
+            new_block = None
             if code != "  ":
                 # By right the group you add into doesnt matter here bc you cant update anyway lmao get rekt
                 # so ill just add them all to collideable terrain
@@ -141,6 +161,8 @@ class EditorMap(Map):
                                   col * Block.BLOCK_SIZE,
                                   row * Block.BLOCK_SIZE)
                 self.collideable_terrain_group.add(new_block)
+            self.terrain_tiles.set(row, col, new_block)
+            self.object_tiles.set(row, col, None)
 
     def delete(self, coordinates, layer):
         # replace both array and group
@@ -154,12 +176,14 @@ class EditorMap(Map):
                 if sprite.rect.collidepoint(coordinates):
                     sprite.kill()
                     break
+            self.background_tiles.set(row, col, None)
         elif layer == 2:
             self.decorations_array[row][col] = "  "
             for sprite in self.middle_ground_terrain_group:
                 if sprite.rect.collidepoint(coordinates):
                     sprite.kill()
                     break
+            self.middle_ground_tiles.set(row, col, None)
         elif layer == 3:
             self.terrain_array[row][col] = "  "
             for sprite in self.collideable_terrain_group:
@@ -170,30 +194,21 @@ class EditorMap(Map):
                 if sprite.rect.collidepoint(coordinates):
                     sprite.kill()
                     break
+            self.terrain_tiles.set(row, col, None)
+            self.object_tiles.set(row, col, None)
 
     def render(self, camera, surface):
+        # Killed sprites are skipped by the TileLayers, so only the tiles in view are looked at
         if self.bg_on:
-            for sprite in self.background_terrain_group:
-                if camera.rect.colliderect(sprite.rect):
-                    surface.blit(sprite.image,
-                                 (sprite.rect.x - camera.rect.x, sprite.rect.y - camera.rect.y))
+            self.background_tiles.render(camera.rect, surface)
 
         if self.decorations_on:
-            for sprite in self.middle_ground_terrain_group:
-                if camera.rect.colliderect(sprite.rect):
-                    surface.blit(sprite.image,
-                                 (sprite.rect.x - camera.rect.x, sprite.rect.y - camera.rect.y))
+            self.middle_ground_tiles.render(camera.rect, surface)
 
         if self.terrain_on:
-            for sprite in self.collideable_terrain_group:
-                if camera.rect.colliderect(sprite.rect):
-                    surface.blit(sprite.image,
-                                 (sprite.rect.x - camera.rect.x, sprite.rect.y - camera.rect.y))
-
-            for sprite in self.interactive_objects_group:
-                if camera.rect.colliderect(sprite.rect):
-                    surface.blit(sprite.image,
-                                 (sprite.rect.x - camera.rect.x, sprite.rect.y - camera.rect.y))
+            self.terrain_tiles.render(camera.rect, surface)
+            self.object_tiles.render(camera.rect, surface)
+            self.render_moving_blocks(camera.rect, surface)
 
 
 class EditorEnemyManager:
@@ -209,7 +224,8 @@ class EditorEnemyManager:
         for enemy_dict in enemies_list:
             self.enemies_list.append(EditorEnemy(enemy_dict["type"],
                                                  self.enemy_type[enemy_dict["type"]],
-                                                 enemy_dict["coordinates"]))
+                                                 enemy_dict["coordinates"],
+                                                 enemy_dict.get("ai")))
 
     def add(self, coordinates, code):
         # This line prevents the program from crashing if you accidentally add a block in the enemies layer
@@ -227,10 +243,12 @@ class EditorEnemyManager:
         """Converts the state of the manager to a JSON array equivalent in python (aka a list)"""
         output_list = []
         for enemy in self.enemies_list:
-            output_list.append({"type": enemy.code,
-                                "coordinates": [enemy.rect.x, enemy.rect.y]
-                                }
-                               )
+            enemy_dict = {"type": enemy.code,
+                          "coordinates": [enemy.rect.x, enemy.rect.y]
+                          }
+            if enemy.ai is not None:
+                enemy_dict["ai"] = enemy.ai
+            output_list.append(enemy_dict)
         return output_list
 
     def render(self, camera, surface):
@@ -256,8 +274,10 @@ class EditorPlayer:
 
 class EditorEnemy:
     """Stripped-down enemy for use in the map editor"""
-    def __init__(self, code, type_object, coordinates):
+    def __init__(self, code, type_object, coordinates, ai=None):
         self.code = code
+        # The editor cannot change the AI of an enemy, but keeps it so that it is saved with the level
+        self.ai = ai
         self.image = type_object.animation_library[EntityState.IDLE][0]
         self.rect = type_object.rect.copy()
         self.blit_rect = type_object.blit_rect
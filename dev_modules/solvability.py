@@ -0,0 +1,230 @@
+import pygame as pg
+import json
+import time
+from collections import deque
+from modules.block import Block, LadderBlock, GatewayBlock, PushableBlock, SpikeBlock
+from modules.components import SoundComponent
+from modules.entities import Player
+from modules.entitystate import EntityState, InputAction
+from modules.inputstate import InputState
+from modules.leveljson import Map
+from modules.timestep import FIXED_TIMESTEP
+
+"""
+* =============================================================== *
+* This module contains the SolvabilityChecker, which searches     *
+* every position that the player can reach in a level to find     *
+* out if the gateway can be reached from the starting position.   *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+Rather than modelling the movement of the player separately, the search moves a real Player with its own
+PlayerInputComponent and PlayerPhysicsComponent through a real Map, one simulation step at a time, so the
+checker always agrees with the game about how high and how far the player can jump. Ladders and spikes are
+handled by the LadderBlocks and SpikeBlocks themselves, just like in the game, so the player can walk over
+spikes for as long as it has health left.
+
+Starting from starting_position, every action which makes a difference is tried from every state reached
+so far (a breadth-first search). The only things that affect where the player can go next are its position,
+y-velocity, EntityState, health and the number of steps left before it can take damage again (the x-velocity
+is always set from the input before it is used), so any state which has already been reached is not searched
+again. Having more health or more immunity is never worse, so a state is also skipped if the player has
+already been in the same place with the same velocity and EntityState, with at least as much health and
+immunity. This keeps the search small even though it is done one step at a time.
+
+LIMITATIONS
+-------------------------
+    - Enemies are ignored, and coins are never collected.
+    - Falling blocks stay where they are placed in the level.
+    - Pushable blocks are never moved. If the gateway cannot be reached, the level is searched again with the
+      pushable blocks removed, and if the gateway can then be reached, the level is reported as possibly
+      requiring the pushable blocks to be moved, rather than as unsolvable.
+"""
+
+# Combinations of inputs which make a difference to the movement of the player
+MOVE_ACTIONS = (InputState(),
+                InputState.from_actions(InputAction.LEFT),
+                InputState.from_actions(InputAction.RIGHT))
+JUMP_ACTIONS = (InputState.from_actions(InputAction.JUMP),
+                InputState.from_actions(InputAction.LEFT, InputAction.JUMP),
+                InputState.from_actions(InputAction.RIGHT, InputAction.JUMP))
+LADDER_ACTIONS = (InputState.from_actions(InputAction.UP),
+                  InputState.from_actions(InputAction.DOWN))
+
+
+class SolvabilityResult:
+    """Outcome of searching a single level"""
+    def __init__(self, filepath: str, is_solvable: bool, needs_pushable_blocks: bool, is_conclusive: bool,
+                 states_searched: int, tiles_reached: int, search_time: float):
+        self.filepath = filepath
+        self.is_solvable = is_solvable
+        self.needs_pushable_blocks = needs_pushable_blocks
+        self.is_conclusive = is_conclusive          # False if the search gave up before searching every state
+        self.states_searched = states_searched
+        self.tiles_reached = tiles_reached
+        self.search_time = search_time
+
+
+class SolvabilityChecker:
+    """Searches the positions that the player can reach in a level"""
+    # Gives up on levels which are too large to search
+    MAX_STATES = 2000000
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        with open(filepath) as f:
+            data = json.load(f)
+
+        self.map = Map(data["map"])
+        self.starting_position = data["starting_position"]
+
+        self.ladders = []
+        self.spikes = []
+        self.gateways = []
+        for sprite in self.map.interactive_objects_group:
+            if isinstance(sprite, LadderBlock):
+                self.ladders.append(sprite)
+            elif isinstance(sprite, SpikeBlock):
+                self.spikes.append(sprite)
+            elif isinstance(sprite, GatewayBlock):
+                self.gateways.append(sprite)
+
+        # Only the ladders and spikes that the player touches need to be updated
+        self.ladder_rects = [ladder.mid_rect for ladder in self.ladders]
+        self.spike_rects = [spike.rect for spike in self.spikes]
+
+        # The Player being moved around. Nothing is heard while searching.
+        SoundComponent.muted = True
+        self.player = Player()
+
+    def get_state(self) -> tuple:
+        """Returns everything about the player which affects where it can move next"""
+        player = self.player
+        immune_steps = 0
+        if player.is_immune():
+            immune_steps = round((player.last_collide_time + Player.IMMUNITY_TIME - player.simulation_time)
+                                 / FIXED_TIMESTEP)
+        return player.rect.x, player.rect.y, player.y_velocity, player.state, player.health, immune_steps
+
+    def set_state(self, state: tuple):
+        """Puts the player back into a state returned by get_state()"""
+        player = self.player
+        player.rect.x, player.rect.y, player.y_velocity, player.state, player.health, immune_steps = state
+        player.x_velocity = 0
+
+        # Only the time left before the player can take damage again matters
+        player.simulation_time = 0
+        player.last_collide_time = None
+        if immune_steps > 0:
+            player.last_collide_time = immune_steps * FIXED_TIMESTEP - Player.IMMUNITY_TIME
+
+    def get_actions(self) -> tuple:
+        """Returns the actions which can make a difference to the player in its current state"""
+        state = self.player.state
+        if state == EntityState.JUMPING:
+            # Jumping does nothing in the air, and ladders cannot be grabbed while jumping
+            return MOVE_ACTIONS
+        if state == EntityState.HANGING or state == EntityState.CLIMBING \
+                or self.player.rect.collidelist(self.ladder_rects) != -1:
+            return MOVE_ACTIONS + JUMP_ACTIONS + LADDER_ACTIONS
+        return MOVE_ACTIONS + JUMP_ACTIONS
+
+    def advance(self, input_state: InputState):
+        """Moves the player by a single simulation step, in the same order as the GameScene"""
+        player = self.player
+        player.handle_input(input_state)
+        player.simulation_time += FIXED_TIMESTEP
+        player.physics_component.update(FIXED_TIMESTEP, player, self.map)
+        for index in player.rect.inflate(0, 2).collidelistall(self.spike_rects):
+            self.spikes[index].update(player)
+        for index in player.rect.collidelistall(self.ladder_rects):
+            self.ladders[index].update(player, self.map.collision_grid, input_state)
+
+    def is_failed(self) -> bool:
+        """Checks if the player has fallen out of the map or has run out of health"""
+        return self.player.rect.top > self.map.rect.bottom or self.player.state == EntityState.DEAD
+
+    def is_at_gateway(self) -> bool:
+        """Checks if the player is touching a gateway, using the same check as the GatewayBlock"""
+        return any(self.player.rect.collidepoint(gateway.rect.center) for gateway in self.gateways)
+
+    def check(self) -> SolvabilityResult:
+        """Checks if the gateway can be reached, first with and then without the pushable blocks"""
+        start_time = time.perf_counter()
+        is_solvable, states_searched, tiles_reached = self.search()
+
+        needs_pushable_blocks = False
+        is_conclusive = is_solvable or states_searched < self.MAX_STATES
+        if not is_solvable and is_conclusive:
+            for sprite in self.map.interactive_objects_group:
+                if isinstance(sprite, PushableBlock):
+                    self.map.collision_grid.remove_dynamic(sprite)
+            needs_pushable_blocks, more_states_searched, tiles_reached = self.search()
+            is_conclusive = needs_pushable_blocks or more_states_searched < self.MAX_STATES
+            states_searched += more_states_searched
+
+        return SolvabilityResult(self.filepath,
+                                 is_solvable,
+                                 needs_pushable_blocks,
+                                 is_conclusive,
+                                 states_searched,
+                                 tiles_reached,
+                                 time.perf_counter() - start_time)
+
+    def search(self):
+        """Searches every state reachable from the starting position, stopping once the gateway is reached.
+        Returns whether the gateway was reached, the number of states searched and the number of tiles reached."""
+        self.player.rect.x = self.starting_position[0]
+        self.player.rect.y = self.starting_position[1]
+        start_state = self.get_state()
+
+        # Maps the position, velocity and EntityState of every state reached to the (health, immune steps) that
+        # it was reached with, keeping only the pairs which are not beaten on both counts by another pair
+        visited = {start_state[:4]: [start_state[4:]]}
+        states_searched = 1
+        tiles_reached = set()
+        queue = deque((start_state,))
+        is_solvable = False
+        while queue and not is_solvable and states_searched < self.MAX_STATES:
+            state = queue.popleft()
+            self.set_state(state)
+            for input_state in self.get_actions():
+                self.set_state(state)
+                self.advance(input_state)
+                if self.is_failed():
+                    continue
+                if self.is_at_gateway():
+                    is_solvable = True
+                    break
+
+                new_state = self.get_state()
+                if self.add_state(visited, new_state):
+                    states_searched += 1
+                    queue.append(new_state)
+                    tiles_reached.add((self.player.rect.centerx // Block.BLOCK_SIZE,
+                                       self.player.rect.centery // Block.BLOCK_SIZE))
+
+        # Running out of health posts GAME_OVER events, which are of no use here
+        pg.event.clear()
+
+        return is_solvable, states_searched, len(tiles_reached)
+
+    @staticmethod
+    def add_state(visited: dict, state: tuple) -> bool:
+        """Adds the state to the visited states, unless it is no better than a state already visited.
+        Returns True if the state was added, and therefore still has to be searched."""
+        key = state[:4]
+        health, immune_steps = state[4:]
+        pairs = visited.get(key)
+        if pairs is None:
+            visited[key] = [(health, immune_steps)]
+            return True
+
+        for visited_health, visited_immune_steps in pairs:
+            if visited_health >= health and visited_immune_steps >= immune_steps:
+                return False
+
+        pairs[:] = [pair for pair in pairs if pair[0] > health or pair[1] > immune_steps]
+        pairs.append((health, immune_steps))
+        return True
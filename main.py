@@ -1,5 +1,8 @@
+import argparse
 import pygame as pg
 from modules.gamescene import SceneManager, TitleScene
+from modules.replay import ReplayRecorder
+from modules.entitystate import GameEvent
 
 """
 * =============================================================== *
@@ -13,6 +16,14 @@ from modules.gamescene import SceneManager, TitleScene
 def main() -> None:
     """Initialises PyGame and invokes all the necessary functions and modules to run the game"""
 
+    # Parse command line options
+    parser = argparse.ArgumentParser(description="The Tower")
+    parser.add_argument("--record", metavar="DIRECTORY",
+                        help="record a replay of every level played into DIRECTORY")
+    parser.add_argument("--fast-forward", type=int, default=SceneManager.FAST_FORWARD_SPEED, metavar="SPEED",
+                        help="speed of the game while TAB is held down (default: %(default)s)")
+    args = parser.parse_args()
+
     # Initialise sound
     # pg.mixer.init(44100, 16, 2, 512)
 
@@ -31,17 +42,46 @@ def main() -> None:
     # Initialise scene manager with TitleScene set as the initial scene
     manager = SceneManager(TitleScene())
 
+    manager.fast_forward_speed = args.fast_forward
+
+    # Record every level played, so that it can be played back with run_replay.py
+    if args.record is not None:
+        manager.recorder = ReplayRecorder(args.record)
+
     # Game loop runs when this is true
     run = True
 
+    # Time since the last frame was rendered, used to skip frames while fast-forwarding
+    render_timer = 0
+
     # -------------------- GAME LOOP -------------------- #
     while run:
-        # gets the delta time, capped at 60 fps
-        delta_time = clock.tick(60) / 1000
+        # gets the delta time, capped at 60 fps unless fast-forwarding
+        delta_time = clock.tick(0 if manager.is_fast_forwarding else 60) / 1000
 
-        # Directs the scene to process events in the queue, update its state and render onto the window
+        # Directs the scene to process events in the queue
         manager.scene.handle_events()
-        manager.scene.update(delta_time)
+
+        # Steps the simulation in fixed increments to cover the time taken by the last frame
+        manager.timestep.advance(delta_time)
+        while manager.timestep.consume_step():
+            manager.scene.update(manager.timestep.step)
+
+            # Scenes only change when events are handled, so stop stepping once the scene has asked to change.
+            # Otherwise a long frame (e.g. while fast-forwarding) could end the same level several times.
+            if pg.event.peek([GameEvent.SWITCH_LEVEL.value,
+                              GameEvent.GAME_OVER.value,
+                              GameEvent.GAME_COMPLETE.value]):
+                manager.timestep.stop_stepping()
+                break
+
+        # While fast-forwarding, only a few frames are rendered, so that time is spent on the simulation instead
+        render_timer += delta_time
+        if manager.is_fast_forwarding and render_timer < manager.FAST_FORWARD_FRAME_TIME:
+            continue
+        render_timer = 0
+
+        # Renders the scene onto the window, interpolated between the last two simulation steps
         manager.scene.render(window)
 
         # Updates the window to reflect the current rendered image
@@ -0,0 +1,104 @@
+import json
+import pygame as pg
+from .spritesheet import Spritesheet
+
+"""
+* =============================================================== *
+* This module contains the Animations of the game, which are      *
+* loaded once and shared, and the AnimationClock which decides    *
+* the current frame of every animated tile and entity.            *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+An Animation is a sequence of frames, each shown for the same amount of time. The current frame of an animation
+is worked out from the time alone, rather than by counting the steps since it started, so animated tiles (e.g.
+coins) do not have to be updated to animate. Every animated tile shares the same AnimationClock, which is moved
+forward by the GameScene on every simulation step, so every coin in a level shows the same frame at the same
+time.
+
+Animations are loaded by the AnimationLibrary the first time that they are needed, from the definitions in
+ANIMATIONS, and are shared by everything that shows them.
+
+ADDING A NEW ANIMATION
+-------------------------
+Add an entry to ANIMATIONS with the filepath of the spritesheet, its number of rows and columns, and the time
+each frame is shown for in seconds. Every frame of the spritesheet is used, in order.
+
+ENTITIES
+-------------------------
+The player and enemies have an Animation for every state, which starts over whenever the state changes (see
+PlayerAnimationComponent in modules/components.py). The time each frame of a state is shown for is read from
+FRAME_DURATIONS_FILEPATH, by the name of the entity and the name of the state, e.g.
+
+    {"Player": {"IDLE": 0.15, "WALKING": 0.08}}
+
+States which are not given a duration use DEFAULT_FRAME_DURATION. Every state in the file is given 5/60 of a
+second, which is how long every frame was shown for when animations counted updates, so that changing the speed of
+an animation only needs a change to the file.
+"""
+
+# Definitions of the animations, as (filepath, rows, columns, frame duration)
+ANIMATIONS = {
+    "COIN": ("assets/textures/environment/animated/ruby.png", 1, 16, 5 / 60),
+}
+
+# Time each frame of an entity is shown for, in seconds, by entity and then by state
+FRAME_DURATIONS_FILEPATH = "assets/textures/animations.json"
+DEFAULT_FRAME_DURATION = 5 / 60
+
+
+class Animation:
+    """Sequence of frames which are each shown for the same amount of time, looping forever"""
+    def __init__(self, frames: list, frame_duration: float):
+        self.frames = frames
+        self.frame_duration = frame_duration
+
+    def get_frame(self, time: float) -> pg.Surface:
+        """Returns the frame shown at the given time since the animation started"""
+        # The time is a sum of simulation steps, which can fall just short of the end of a frame due to rounding
+        return self.frames[int(time / self.frame_duration + 1e-6) % len(self.frames)]
+
+
+class AnimationClock:
+    """Simulation time shared by every animated tile and entity"""
+    def __init__(self):
+        self.time = 0
+
+    def advance(self, delta_time: float) -> None:
+        self.time += delta_time
+
+    def reset(self) -> None:
+        self.time = 0
+
+
+class AnimationLibrary:
+    """Loads every animation the first time that it is needed, and shares it afterwards"""
+    def __init__(self):
+        self.animations = {}
+        self.frame_durations = None
+
+    def get(self, name: str) -> Animation:
+        animation = self.animations.get(name)
+        if animation is None:
+            filepath, rows, columns, frame_duration = ANIMATIONS[name]
+            spritesheet = Spritesheet(filepath, rows, columns)
+            animation = Animation(spritesheet.get_images_at(*range(rows * columns)), frame_duration)
+            self.animations[name] = animation
+        return animation
+
+    def get_entity_animations(self, name: str, animation_sequences: dict) -> dict:
+        """Returns an Animation for the frames of every state of the entity, with the frame durations given for
+        the entity in FRAME_DURATIONS_FILEPATH"""
+        if self.frame_durations is None:
+            with open(FRAME_DURATIONS_FILEPATH, "r") as file:
+                self.frame_durations = json.load(file)
+        frame_durations = self.frame_durations.get(name, {})
+
+        return {state: Animation(frames, frame_durations.get(state.name, DEFAULT_FRAME_DURATION))
+                for state, frames in animation_sequences.items()}
+
+
+# Shared by every animated tile and entity
+animation_clock = AnimationClock()
+animation_library = AnimationLibrary()
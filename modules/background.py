@@ -18,25 +18,100 @@ of the camera.
 As the blit coordinates always lie between 0 and BG_WIDTH (since it is a modulo 
 of the BG_WIDTH), the viewport will always lie within the boundaries of the two 
 images.
+
+Wrapped strips
+--------------------------------------
+Instead of blitting the two images separately, a moving background can be drawn
+with render_wrapped(), which blits a single area of its strip. The strip is the
+background repeated side by side once, when the background is created, so that it
+is one screen wider than the background. Any screen-sized area starting within the
+first copy of the background therefore lies entirely within the strip.
+
+Background stacks
+--------------------------------------
+A BackgroundStack draws a list of backgrounds from back to front. Static backgrounds
+never change, so every run of static backgrounds in the stack is composited onto a
+single surface when the stack is created. The run at the back of the stack is
+composited onto an opaque surface, which is faster to blit than a surface with
+per-pixel alpha. A stack of only static backgrounds is therefore drawn with a single
+blit per frame, and each moving background adds a single blit of its strip.
+
+If the strip of a background cannot be made (e.g. because it would be too large), or
+the stack is created with wrapped=False, the background is drawn with the two blits
+of render() instead.
+
+Level backgrounds
+--------------------------------------
+Levels can declare their own backgrounds in the "backgrounds" field of their level file,
+which is a JSON array with one JSON object for each background, from back to front:
+    image               ->          Filepath of the image of the background
+    speed               ->          How far the background moves for every pixel that the camera moves,
+                                    e.g. 0.5 for a background which moves at half the speed of the camera.
+                                    Backgrounds with a speed of 0 are static.
+    anchor (optional)   ->          Where the background is placed vertically on the screen, one of "fill",
+                                    "top", "center" or "bottom". A background anchored to "fill" (the default)
+                                    is scaled to the height of the screen, and otherwise it is drawn at the size
+                                    of its image. Static backgrounds always fill the screen.
+Levels without the field use DEFAULT_BACKGROUNDS.
+
+Image cache
+--------------------------------------
+Images are decoded, scaled and composited through the image_cache, which is shared
+by every scene. Scenes showing the same backgrounds (e.g. the title screen and the
+level selection screen) share the same surfaces, which are only made the first time
+that they are needed.
 """
 
 
+class ImageCache:
+    """Keeps the images loaded from files, and the surfaces made from them, so that each is only made once"""
+    def __init__(self):
+        self.surfaces = {}
+
+    def get_or_build(self, key, build):
+        """Returns the surface stored under the key, calling build() to make it if it is not stored yet"""
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = build()
+        return surface
+
+    def load(self, filepath: str) -> pg.Surface:
+        """Returns the image in the file, converted for fast blitting"""
+        return self.get_or_build(filepath, lambda: pg.image.load(filepath).convert_alpha())
+
+    def load_scaled(self, filepath: str, size: tuple) -> pg.Surface:
+        """Returns the image in the file, scaled to the given size"""
+        return self.get_or_build((filepath, size), lambda: pg.transform.scale(self.load(filepath), size))
+
+    def clear(self) -> None:
+        self.surfaces.clear()
+
+
+# Shared by every scene
+image_cache = ImageCache()
+
+# Backgrounds of levels which do not declare their own, and of the menus
+DEFAULT_BACKGROUNDS = ({"image": "assets/textures/background/01_background.png", "speed": 0},
+                       {"image": "assets/textures/background/03 background B.png", "speed": 0},
+                       {"image": "assets/textures/background/04 background.png", "speed": 0})
+
+ANCHORS = ("fill", "top", "center", "bottom")
+
+
 class StaticBackground:
     """Handles the rendering of a static, unmoving background, which does not change with the camera position"""
     def __init__(self, filepath: str, surface: pg.Surface):
+        self.filepath = filepath
         self.surface = surface
-        self.image = pg.image.load(filepath).convert_alpha()
+        self.image = image_cache.load(filepath)
         # scales the image to fill the screen
         if self.image.get_width() / self.image.get_height() > surface.get_width() / surface.get_height():
-            self.background = pg.transform.scale(self.image,
-                                                 (int(self.image.get_width() *
-                                                  surface.get_height() / self.image.get_height()),
-                                                  surface.get_height()))
+            size = (int(self.image.get_width() * surface.get_height() / self.image.get_height()),
+                    surface.get_height())
         else:
-            self.background = pg.transform.scale(self.image,
-                                                 (surface.get_width(),
-                                                  int(self.image.get_height() *
-                                                  surface.get_width() / self.image.get_width())))
+            size = (surface.get_width(),
+                    int(self.image.get_height() * surface.get_width() / self.image.get_width()))
+        self.background = image_cache.load_scaled(filepath, size)
 
         self.blit_coordinates = (int((self.surface.get_width() - self.background.get_width()) / 2),
                                  int((self.surface.get_height() - self.background.get_height()) / 2))
@@ -49,58 +124,152 @@ class StaticBackground:
         self.surface.blit(self.background, self.blit_coordinates)
 
 
-# Used for GameScene
-class ParallaxBackground:
-    """Handles the rendering of a background that moves with the camera"""
-    def __init__(self, filepath: str, surface: pg.Surface):
+class MovingBackground:
+    """Base class of backgrounds which wrap around horizontally as they move"""
+    def __init__(self, filepath: str, surface: pg.Surface, anchor: str = "fill"):
+        if anchor not in ANCHORS:
+            raise ValueError("Unknown background anchor: " + str(anchor))
+        self.filepath = filepath
         self.surface = surface
-        self.image = pg.image.load(filepath).convert_alpha()
-        self.background = pg.transform.scale(self.image,
-            (self.image.get_width() * int(surface.get_height() / self.image.get_height()), surface.get_height()))
-        
+        self.image = image_cache.load(filepath)
+        if anchor == "fill":
+            # scales the image to the height of the screen
+            self.background = image_cache.load_scaled(filepath,
+                (int(self.image.get_width() * surface.get_height() / self.image.get_height()), surface.get_height()))
+        else:
+            self.background = self.image
+
         # The x-coordinate of the position where the background will be blitted
         self.blit_position = 0
 
         self.BACKGROUND_WIDTH = self.background.get_width()
         self.BACKGROUND_HEIGHT = self.background.get_height()
 
+        # The y-coordinate is fixed by the anchor
+        if anchor == "top" or anchor == "fill":
+            self.blit_y = 0
+        elif anchor == "center":
+            self.blit_y = int((surface.get_height() - self.BACKGROUND_HEIGHT) / 2)
+        else:
+            self.blit_y = surface.get_height() - self.BACKGROUND_HEIGHT
+
+        try:
+            self.strip = image_cache.get_or_build(("strip", filepath, anchor, surface.get_size()), self.build_strip)
+        except pg.error:
+            # Drawn with render() instead
+            self.strip = None
+        self.strip_area = pg.Rect(0, 0, surface.get_width(), self.BACKGROUND_HEIGHT)
+
+    def build_strip(self) -> pg.Surface:
+        """Returns the background repeated side by side, one screen wider than the background"""
+        strip = pg.Surface((self.BACKGROUND_WIDTH + self.surface.get_width(), self.BACKGROUND_HEIGHT), pg.SRCALPHA)
+        for x in range(0, strip.get_width(), self.BACKGROUND_WIDTH):
+            strip.blit(self.background, (x, 0))
+        return strip.convert_alpha()
+
+    def render(self):
+        """Renders the background onto the surface according to the blit position"""
+        # Two blits, unless the background is narrower than the screen
+        x = int(self.blit_position) - self.BACKGROUND_WIDTH
+        while x < self.surface.get_width():
+            self.surface.blit(self.background, (x, self.blit_y))
+            x += self.BACKGROUND_WIDTH
+
+    def render_wrapped(self):
+        """Renders the background onto the surface according to the blit position, with a single blit of the
+        strip"""
+        if self.strip is None:
+            self.render()
+            return
+        self.strip_area.x = (self.BACKGROUND_WIDTH - int(self.blit_position)) % self.BACKGROUND_WIDTH
+        self.surface.blit(self.strip, (0, self.blit_y), self.strip_area)
+
+
+# Used for GameScene
+class ParallaxBackground(MovingBackground):
+    """Handles the rendering of a background that moves with the camera"""
+    def __init__(self, filepath: str, surface: pg.Surface, anchor: str = "fill", speed: float = 1.0):
+        super().__init__(filepath, surface, anchor)
+        # Used when the background is updated by a BackgroundStack
+        self.speed = speed
+
     def update(self, speed: float, camera: Camera):
         """
         Updates the section of the background to be blitted based on the movement of the
         given camera and proportional to the given speed
         """
-        current_x_position = camera.rect.left
+        # render_rect is where the camera is drawn from, between the last two simulation steps
+        current_x_position = camera.render_rect.left
         self.blit_position = - int(current_x_position * speed) % self.BACKGROUND_WIDTH
 
-    def render(self):
-        """Renders the background onto the surface according to the blit position"""
-        self.surface.blit(self.background, (self.blit_position, 0))
-        self.surface.blit(self.background, (self.blit_position - self.BACKGROUND_WIDTH, 0))
-
 
 # Used for TitleScene
-class ScrollingBackground:
+class ScrollingBackground(MovingBackground):
     """Handles the rendering of a background that automatically scrolls"""
-    def __init__(self, filepath: str, surface: pg.Surface):
-        self.surface = surface
-        self.image = pg.image.load(filepath).convert_alpha()
-        self.background = pg.transform.scale(self.image,
-                                             (self.image.get_width() * int(
-                                                 surface.get_height() / self.image.get_height()), surface.get_height()))
-
-        # The x-coordinate of the position where the background will be blitted
-        self.blit_position = 0
-
-        self.BACKGROUND_WIDTH = self.background.get_width()
-        self.BACKGROUND_HEIGHT = self.background.get_height()
-
     def update(self, speed: float):
         """Changes the blit position by the value of the given speed"""
         # blit_position is now a float to allow slower updates
         self.blit_position = (self.blit_position - speed) % self.BACKGROUND_WIDTH
 
+
+class BackgroundStack:
+    """Renders a list of backgrounds from back to front, with every run of static backgrounds composited into one
+    surface"""
+    def __init__(self, layers, surface: pg.Surface, wrapped: bool = True):
+        self.layers = tuple(layers)
+        self.surface = surface
+        self.parallax_layers = [layer for layer in self.layers if isinstance(layer, ParallaxBackground)]
+
+        # Each step of rendering the stack is either the blit of a composited run of static backgrounds, or the
+        # wrapped render of a moving background
+        self.render_steps = []
+        static_run = []
+        for layer in self.layers:
+            if isinstance(layer, StaticBackground):
+                static_run.append(layer)
+                continue
+            if static_run:
+                self.add_composite(static_run)
+                static_run = []
+            self.render_steps.append(layer.render_wrapped if wrapped else layer.render)
+        if static_run:
+            self.add_composite(static_run)
+
+    def add_composite(self, static_run: list) -> None:
+        opaque = not self.render_steps
+        key = ("composite", opaque, self.surface.get_size(), tuple(layer.filepath for layer in static_run))
+        composite = image_cache.get_or_build(key, lambda: self.build_composite(static_run, opaque))
+        self.render_steps.append(lambda: self.surface.blit(composite, (0, 0)))
+
+    def build_composite(self, static_run: list, opaque: bool) -> pg.Surface:
+        """Returns the static backgrounds blitted onto a single surface, in order"""
+        if opaque:
+            composite = pg.Surface(self.surface.get_size())
+        else:
+            composite = pg.Surface(self.surface.get_size(), pg.SRCALPHA)
+        for layer in static_run:
+            composite.blit(layer.background, layer.blit_coordinates)
+        return composite.convert() if opaque else composite.convert_alpha()
+
+    @staticmethod
+    def from_definitions(definitions, surface: pg.Surface, wrapped: bool = True):
+        """Builds the stack of backgrounds declared by a level (see Level backgrounds above)"""
+        layers = []
+        for definition in definitions:
+            speed = definition.get("speed", 0)
+            if speed == 0:
+                layers.append(StaticBackground(definition["image"], surface))
+            else:
+                layers.append(ParallaxBackground(definition["image"], surface,
+                                                 definition.get("anchor", "fill"), speed))
+        return BackgroundStack(layers, surface, wrapped)
+
+    def update(self, camera: Camera):
+        """Moves the parallax backgrounds in the stack with the camera"""
+        for layer in self.parallax_layers:
+            layer.update(layer.speed, camera)
+
     def render(self):
-        """Renders the background onto the surface according to the blit position"""
-        integer_blit_position = int(self.blit_position)
-        self.surface.blit(self.background, (integer_blit_position, 0))
-        self.surface.blit(self.background, (integer_blit_position - self.BACKGROUND_WIDTH, 0))
\ No newline at end of file
+        """Renders every background in the stack onto the surface"""
+        for render_step in self.render_steps:
+            render_step()
@@ -1,7 +1,8 @@
 import pygame as pg
-from .components import SimpleAnimationComponent
-from .entitystate import GameEvent, EntityState, Direction
-from .spritesheet import Spritesheet, TerrainType
+from .components import SoundComponent
+from .animation import animation_clock, animation_library
+from .entitystate import GameEvent, EntityState, Direction, InputAction
+from .spritesheet import TerrainType
 
 """
 * =============================================================== *
@@ -17,22 +18,27 @@ class Block(pg.sprite.Sprite):
 
     def __init__(self, type_object: TerrainType, x, y):
         super().__init__()
-        self.image = pg.transform.scale(type_object.image.convert_alpha(),
-                                        (int(type_object.block_width * Block.BLOCK_SIZE),
-                                         int(type_object.block_height * Block.BLOCK_SIZE))
-                                        )
+        self.reset(type_object, x, y)
+
+    def reset(self, type_object: TerrainType, x, y):
+        """Puts the block into the state of a new block, so that it can be reused from an ObjectPool"""
+        self.image = type_object.get_block_image(Block.BLOCK_SIZE)
+        self.reset_hitbox(type_object, x, y)
+        self.is_spike = False
+
+    def reset_hitbox(self, type_object: TerrainType, x, y):
+        """Puts the hitbox of the block where the hitbox of a new block of the given type would be"""
         self.rect = pg.Rect(x + int(type_object.block_pos_x * Block.BLOCK_SIZE),
                             y + int(type_object.block_pos_y * Block.BLOCK_SIZE),
                             int(type_object.block_width * Block.BLOCK_SIZE),
                             int(type_object.block_height * Block.BLOCK_SIZE))
-        self.is_spike = False
 
 
 class SpikeBlock(Block):
     """Represents a block that damages the player if the player comes into contact with it"""
 
-    def __init__(self, type_object, x, y):
-        super().__init__(type_object, x, y)
+    def reset(self, type_object, x, y):
+        super().reset(type_object, x, y)
         self.is_spike = True
 
     def update(self, entity, *args):
@@ -54,7 +60,7 @@ class GatewayBlock(Block):
     def __init__(self, type_object, x, y):
         super().__init__(type_object, x, y)
 
-    def update(self, player, terrain_group):
+    def update(self, player, collision_grid, *args):
         """Checks if the player has collided with itself, and initiates a level transition if there is a collision"""
         if player.rect.collidepoint(self.rect.centerx, self.rect.centery):
             pg.event.post(
@@ -66,27 +72,25 @@ class GatewayBlock(Block):
 
 # Has potential for many variations
 class FallingBlock(Block):
-    def __init__(self, type_object, x, y):
-        super().__init__(type_object, x, y)
+    def reset(self, type_object, x, y):
+        super().reset(type_object, x, y)
         self.vel = 1
         self.fallen = False
 
-    def update(self, player, terrain_group):
+    def update(self, player, collision_grid, *args):
         if (self.rect.top == player.rect.bottom) and not self.fallen \
                 and (self.rect.left < player.rect.left < self.rect.right
                      or self.rect.left < player.rect.right < self.rect.right):
-            self.rect.y += self.vel
+            # Stops falling once the FallingBlock falls on a Block
+            allowed_dy, colliding_sprite = collision_grid.sweep_y(self.rect, self.vel, self)
+            self.rect.y += allowed_dy
+            if colliding_sprite is not None:
+                self.fallen = True
 
             # This is necessary - or else, player will fluctuate between the IDLE and JUMPING state
             # causing it to flash
             player.rect.bottom = self.rect.top
 
-        # If the FallingBlock falls on a Block
-        for colliding_sprite in pg.sprite.spritecollide(self, terrain_group, False):
-                if colliding_sprite.rect.top < self.rect.bottom < colliding_sprite.rect.bottom:
-                    self.rect.bottom = colliding_sprite.rect.top
-                    self.fallen = True
-
         # Block should also fall when a pushable block falls on it
         # Commented this out because it is still buggy - player's state will fluctuate rapidly
 
@@ -102,11 +106,11 @@ class FallingBlock(Block):
 
 
 class MovingBlock(Block):
-    def __init__(self, type_object, x, y):
-        super().__init__(type_object, x, y)
+    def reset(self, type_object, x, y):
+        super().reset(type_object, x, y)
         self.vel = 1
 
-    def update(self, player, *args):
+    def update(self, player, collision_grid, input_state, *args):
         if ((self.rect.top == player.rect.bottom) \
             and (self.rect.left < player.rect.left < self.rect.right \
                  or self.rect.left < player.rect.right < self.rect.right)) \
@@ -120,89 +124,89 @@ class MovingBlock(Block):
                 self.rect.x += self.vel
                 player.rect.x = self.rect.x
 
-            if pg.key.get_pressed()[pg.K_UP]:
+            if input_state.is_pressed(InputAction.UP):
                 self.rect.y -= self.vel
                 player.rect.bottom = self.rect.top
 
-            elif pg.key.get_pressed()[pg.K_DOWN]:
+            elif input_state.is_pressed(InputAction.DOWN):
                 self.rect.y += self.vel
                 player.rect.bottom = self.rect.top
 
 
 class Coin(Block):
     """Represents a coin which heals the player when picked up"""
+    # Loaded by the first coin, and shared by every coin
+    coin_sound = None
 
     def __init__(self, type_object, x, y):
         super().__init__(type_object, x, y)
-        spritesheet = Spritesheet("assets/textures/environment/animated/ruby.png", 1, 16)
-        coin_animation = spritesheet.get_images_at(0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15)
-        self.animation_component = SimpleAnimationComponent(coin_animation)
-        self.coin_sound = pg.mixer.Sound("assets/sound/sfx/coin.ogg")
+        self.animation = animation_library.get("COIN")
+        if Coin.coin_sound is None:
+            Coin.coin_sound = pg.mixer.Sound("assets/sound/sfx/coin.ogg")
+
+    @property
+    def image(self):
+        """The current frame of the animation, according to the clock shared by every animated tile"""
+        return self.animation.get_frame(animation_clock.time)
+
+    def reset(self, type_object, x, y):
+        """Puts the coin into the state of a new coin. A coin always shows its animation rather than the image of
+        its type, so its image is not reset."""
+        self.reset_hitbox(type_object, x, y)
+        self.is_spike = False
 
     def update(self, entity, *args):
-        """Checks if the player has collided with the coin, healing the player if there is a collision,
-        and updates the animation of the coin"""
+        """Checks if the player has collided with the coin, healing the player if there is a collision"""
         if pg.sprite.collide_rect(self, entity):
             if entity.health < 100:
                 entity.health += 20
-            self.coin_sound.play()
+            if not SoundComponent.muted:
+                self.coin_sound.play()
+            entity.message("COIN")
             self.kill()
 
-        self.animation_component.update(self)
-
 
 class LadderBlock(Block):
-    def __init__(self, type_object, x, y):
-        super().__init__(type_object, x, y)
+    def reset(self, type_object, x, y):
+        super().reset(type_object, x, y)
         self.mid_rect = pg.Rect(self.rect.centerx - 0.5, self.rect.top, 1, self.rect.height)
 
-    def update(self, entity, *args):
-        current_keys = pg.key.get_pressed()
+    def update(self, entity, collision_grid, input_state, *args):
         if self.mid_rect.colliderect(entity.rect) and entity.state != EntityState.JUMPING:
-            if current_keys[pg.K_UP] or current_keys[pg.K_DOWN]:
+            if input_state.is_pressed(InputAction.UP) or input_state.is_pressed(InputAction.DOWN):
                 # Snap player to middle of ladder when entering HANGING state
                 entity.rect.centerx = self.mid_rect.centerx
                 entity.state = EntityState.HANGING
 
 
 class PushableBlock(Block):
-    def __init__(self, type_object, x, y):
-        super().__init__(type_object, x, y)
+    def reset(self, type_object, x, y):
+        super().reset(type_object, x, y)
         self.y_velocity = 1
         self.gravity = 1
 
     # A pushable block reacts to gravity, hence it interacts with both the player and terrain group
     # In future, possible to make one superclass for all blocks that are affected by gravity and collides with other
     # blocks
-    def update(self, player, terrain_group):
+    def update(self, player, collision_grid, *args):
 
         # If player is pushing the block
         if (self.rect.left == player.rect.right or self.rect.right == player.rect.left) \
                 and player.state == EntityState.WALKING \
                 and player.rect.bottom == self.rect.bottom:
-            # FIXME: Block movement speed varies with FPS
-            # Reason is bc the block is in the collideable terrain group
+            # Block movement speed used to vary with FPS, since the block is in the collideable terrain group
             # Hence every update cycle, the colliding player will be at the same distance from the block
             # and the speed therefore depends on the rate of update
-            # The ideal solution is to add a delta_time field to the arguments, but nah
-            # The hack is to let the block handle its own collision separately
-            # The broke method is to ignore this since it is slightly discernible at normal speeds of 30 - 60 fps
-            self.rect.x += (self.rect.centerx - player.rect.centerx) / 20
+            # This is no longer an issue since the game is updated in fixed steps regardless of FPS
+            # Rects truncate the new position, so this is the distance the block would have moved by
+            dx = int(self.rect.x + (self.rect.centerx - player.rect.centerx) / 20) - self.rect.x
 
-        for colliding_sprite in pg.sprite.spritecollide(self, terrain_group, False):
-            if colliding_sprite.rect.left < self.rect.left < colliding_sprite.rect.right:
-                self.rect.left = colliding_sprite.rect.right
-            if colliding_sprite.rect.left < self.rect.right < colliding_sprite.rect.right:
-                self.rect.right = colliding_sprite.rect.left
+            # Unlike entities, the block cannot be pushed through spikes
+            allowed_dx, colliding_sprite = collision_grid.sweep_x(self.rect, dx, self, solid_spikes=True)
+            self.rect.x += allowed_dx
 
         self.y_velocity += self.gravity
-        self.rect.y += self.y_velocity
-        isFloating = True
-        for colliding_sprite in pg.sprite.spritecollide(self, terrain_group, False):
-            if colliding_sprite.rect.top < self.rect.top < colliding_sprite.rect.bottom:
-                self.rect.top = colliding_sprite.rect.bottom
-                self.y_velocity = 0
-            if colliding_sprite.rect.top < self.rect.bottom < colliding_sprite.rect.bottom:
-                isFloating = False
-                self.rect.bottom = colliding_sprite.rect.top
-                self.y_velocity = 0
+        allowed_dy, colliding_sprite = collision_grid.sweep_y(self.rect, self.y_velocity, self, solid_spikes=True)
+        self.rect.y += allowed_dy
+        if colliding_sprite is not None:
+            self.y_velocity = 0
@@ -23,6 +23,13 @@ class Camera:
         self.camera_size = camera_size
         self.rect = pg.Rect((0, 0), camera_size)
 
+        # The simulation moves rect in fixed steps, while rendering uses render_rect, which is interpolated
+        # between the position at the start of the last step and the current position.
+        # alpha is the fraction of a step to interpolate by, and is also used when rendering entities.
+        self.previous_position = self.rect.topleft
+        self.render_rect = self.rect.copy()
+        self.alpha = 1
+
     # Moves this camera's position to the target's position
     def follow_target(self, target):
         # Give the camera some lag
@@ -52,5 +59,19 @@ class Camera:
         elif self.rect.right > self.boundaries.right:
             self.rect.right = self.boundaries.right
 
+        # Snapping should not be smoothed out by interpolation
+        self.save_previous_position()
+        self.interpolate(1)
+
+    def save_previous_position(self):
+        """Stores the current position of the camera. Must be called before every simulation step."""
+        self.previous_position = self.rect.topleft
+
+    def interpolate(self, alpha):
+        """Moves render_rect to the position between the previous and current position of the camera"""
+        self.alpha = alpha
+        self.render_rect.x = round(self.previous_position[0] + (self.rect.x - self.previous_position[0]) * alpha)
+        self.render_rect.y = round(self.previous_position[1] + (self.rect.y - self.previous_position[1]) * alpha)
+
     def update_boundaries(self, map_rect):
         self.boundaries = map_rect
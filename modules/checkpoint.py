@@ -0,0 +1,81 @@
+from .entitystate import EntityState
+
+"""
+* =============================================================== *
+* This module contains the Checkpoint, a snapshot of the state of *
+* a level and the player which is taken every few seconds, so     *
+* that the player can carry on from it after dying.               *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+A Checkpoint only stores what can change while a level is played, as tuples of numbers and enums:
+    - the position, velocities, state, direction, health and immunity of the player, and the position of the
+      camera, which decides how often each enemy is simulated
+    - the position, velocities, state, direction, health and remaining time of every enemy, and whether it has
+      been killed (see EnemyManager.capture_state() in modules/leveljson.py)
+    - the falling and pushable blocks which have moved, and the coins which have been collected (see
+      Map.capture_state() in modules/leveljson.py)
+
+Blocks and coins are stored as a difference from the level as it was loaded, so most of a level is never looked
+at, and a checkpoint of a level where nothing has happened yet is almost empty. Sprites are referred to by their
+index in the lists kept by the Map and EnemyManager, which never change while the level is loaded.
+
+Restoring a checkpoint changes the sprites of the level in place rather than making new ones. Rects are changed
+rather than replaced, since the CollisionGrid keeps references to the rects of moving blocks.
+
+WHEN CHECKPOINTS ARE TAKEN
+-------------------------
+The GameScene takes a checkpoint once every CHECKPOINT_INTERVAL seconds, but only while the player is somewhere
+it is safe to go back to: standing on the ground, and not just hit. A checkpoint belongs to the Level it was
+taken in, and cannot be restored once another level has been loaded.
+"""
+
+# Seconds of simulation time between checkpoints
+CHECKPOINT_INTERVAL = 3
+
+
+class Checkpoint:
+    """Snapshot of the state of a level and the player, taken at a point in time"""
+    def __init__(self, level, time: float, player_state: tuple, camera_position: tuple, enemy_state: tuple,
+                 map_state: tuple):
+        self.level = level
+        self.time = time
+        self.player_state = player_state
+        self.camera_position = camera_position
+        self.enemy_state = enemy_state
+        self.map_state = map_state
+
+    @staticmethod
+    def is_safe(player) -> bool:
+        """Returns whether the player is somewhere that it is safe to go back to"""
+        return (player.state == EntityState.IDLE or player.state == EntityState.WALKING) \
+            and player.health > 0 and not player.is_immune()
+
+    @staticmethod
+    def capture_player(player) -> tuple:
+        """Returns the state of the player which changes while a level is played"""
+        immunity = 0
+        if player.is_immune():
+            immunity = player.IMMUNITY_TIME - (player.simulation_time - player.last_collide_time)
+        return (player.rect.x,
+                player.rect.y,
+                player.x_velocity,
+                player.y_velocity,
+                player.state,
+                player.direction,
+                player.health,
+                immunity)
+
+    @staticmethod
+    def restore_player(player, player_state: tuple) -> None:
+        """Puts the player back into a state returned by capture_player()"""
+        x, y, player.x_velocity, player.y_velocity, player.state, player.direction, player.health, immunity = \
+            player_state
+        player.rect.topleft = (x, y)
+        player.save_previous_position()
+
+        # Only the time left before the player can take damage again is stored
+        player.last_collide_time = None
+        if immunity > 0:
+            player.last_collide_time = player.simulation_time - (player.IMMUNITY_TIME - immunity)
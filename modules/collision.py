@@ -0,0 +1,340 @@
+import pygame as pg
+
+"""
+* =============================================================== *
+* This module contains the CollisionGrid, which stores the        *
+* collideable terrain of a map in a grid of tiles, and moves      *
+* hitboxes through the terrain without letting them pass through  *
+* any collider.                                                   *
+* =============================================================== *
+
+SWEPT COLLISIONS
+-------------------------
+Instead of moving a hitbox to its new position and then pushing it out of every collider it overlaps,
+the hitbox is swept along one axis at a time. The distance to the nearest collider in the path of the hitbox
+(the time of impact) is the furthest the hitbox can move, so a hitbox can never tunnel through a collider, no
+matter how fast it is moving.
+
+The colliders in the path are found by walking through the rows (or columns) of tiles that the hitbox passes,
+in the direction that it is moving. The walk stops as soon as the next row is further away than a collider
+which has already been hit, so a sweep which hits something nearby only looks at a few tiles, however long it
+is. The walk is also clipped to the tiles which contain any static colliders, so a sweep far outside the map
+(e.g. the player falling out of it after a long frame) looks at no tiles at all.
+
+If the hitbox has already sunk into a collider that it is moving towards (for example, when the starting
+position of a level overlaps the floor), the distance is negative and the hitbox is pushed back out.
+
+Colliders which never move are stored in the tiles that they cover. Colliders which move (falling and
+pushable blocks) are kept in a separate list which is checked directly, since there are only a few of them.
+Their rects are also kept in a list of their own, so that they can all be tested in a single call to
+Rect.collidelistall(). Moving colliders must therefore be moved by changing their rect in place, and never by
+replacing it.
+
+MERGED TILES
+-------------------------
+Most of the terrain is made of plain, full-sized tiles, such as long floors and walls. These are merged 
+into as few rectangles as possible when the map is loaded, so that a sweep only has to look at a handful 
+of large colliders instead of one collider per tile. Tiles with smaller hitboxes, spikes and moving blocks 
+are never merged.
+
+Merging must not change any collision result. A hitbox which is clear of the terrain only ever meets the 
+outside edges of a merged rectangle, which are edges of its tiles too. A hitbox which has already sunk into 
+the terrain can also meet the edges between the tiles inside it, so a merged Collider works out the edges of 
+its tiles nearest to the hitbox instead of using its own edges, and get_overlapping() returns the tiles of a 
+merged Collider which overlap the hitbox rather than the whole rectangle. Both give the same results as one 
+collider per tile.
+
+SPIKES
+-------------------------
+Spikes can be landed on, but they do not block movement sideways or upwards, which matches how the
+SpikeBlock is meant to be touched from above.
+"""
+
+
+class Collider:
+    """A static collider covering several merged tiles"""
+    def __init__(self, rect: pg.Rect, cell_size: int):
+        self.rect = rect
+        self.cell_size = cell_size
+        self.is_spike = False
+
+    def get_tile_top(self, y: int) -> int:
+        """Returns the top of the highest tile of the collider below y"""
+        return max(self.rect.top, (y // self.cell_size + 1) * self.cell_size)
+
+    def get_tile_bottom(self, y: int) -> int:
+        """Returns the bottom of the lowest tile of the collider above y"""
+        return min(self.rect.bottom, (y - 1) // self.cell_size * self.cell_size)
+
+    def get_tile_left(self, x: int) -> int:
+        """Returns the left of the leftmost tile of the collider to the right of x"""
+        return max(self.rect.left, (x // self.cell_size + 1) * self.cell_size)
+
+    def get_tile_right(self, x: int) -> int:
+        """Returns the right of the rightmost tile of the collider to the left of x"""
+        return min(self.rect.right, (x - 1) // self.cell_size * self.cell_size)
+
+    def get_tiles(self, rect) -> list:
+        """Returns a collider for every tile of the collider which overlaps the rect"""
+        overlap = self.rect.clip(rect)
+        size = self.cell_size
+        return [Collider(pg.Rect(column * size, row * size, size, size), size)
+                for row in range(overlap.top // size, (overlap.bottom - 1) // size + 1)
+                for column in range(overlap.left // size, (overlap.right - 1) // size + 1)]
+
+
+class CollisionGrid:
+    """Stores the colliders of a map in a grid of tiles, and sweeps hitboxes through them"""
+    def __init__(self, cell_size: int):
+        self.cell_size = cell_size
+
+        # Maps (column, row) to the list of static colliders which overlap that tile
+        self.static_cells = {}
+
+        # First and last column and row of the tiles which contain static colliders
+        self.first_column = 0
+        self.last_column = -1
+        self.first_row = 0
+        self.last_row = -1
+
+        # Colliders which can move, and therefore cannot be stored in a fixed tile, along with their rects
+        self.dynamic_colliders = []
+        self.dynamic_rects = []
+
+    def add_static(self, sprite):
+        """Adds a collider which never moves to every tile that it overlaps"""
+        cells = self.get_cells_in_rect(sprite.rect)
+        if not cells:
+            return
+        if not self.static_cells:
+            # The first collider sets the bounds
+            (self.first_column, self.first_row), (self.last_column, self.last_row) = cells[0], cells[-1]
+        else:
+            self.first_column = min(self.first_column, cells[0][0])
+            self.first_row = min(self.first_row, cells[0][1])
+            self.last_column = max(self.last_column, cells[-1][0])
+            self.last_row = max(self.last_row, cells[-1][1])
+
+        for cell in cells:
+            self.static_cells.setdefault(cell, []).append(sprite)
+
+    def add_solid_tiles(self, solid_tiles: list):
+        """Merges the solid tiles, given as a 2-dimensional array of booleans, into maximal rectangles
+        and adds each rectangle as a static collider"""
+        rows = len(solid_tiles)
+        columns = len(solid_tiles[0]) if rows > 0 else 0
+        is_merged = [[False] * columns for row in range(rows)]
+
+        for row in range(rows):
+            for column in range(columns):
+                if not solid_tiles[row][column] or is_merged[row][column]:
+                    continue
+
+                # Grow the rectangle as far right as possible
+                width = 1
+                while column + width < columns \
+                        and solid_tiles[row][column + width] and not is_merged[row][column + width]:
+                    width += 1
+
+                # Then grow it downwards for as long as the whole row below is solid
+                height = 1
+                while row + height < rows \
+                        and all(solid_tiles[row + height][x] and not is_merged[row + height][x]
+                                for x in range(column, column + width)):
+                    height += 1
+
+                for y in range(row, row + height):
+                    for x in range(column, column + width):
+                        is_merged[y][x] = True
+
+                self.add_static(Collider(pg.Rect(column * self.cell_size,
+                                                 row * self.cell_size,
+                                                 width * self.cell_size,
+                                                 height * self.cell_size),
+                                         self.cell_size))
+
+    def add_dynamic(self, sprite):
+        """Adds a collider which can move"""
+        self.dynamic_colliders.append(sprite)
+        self.dynamic_rects.append(sprite.rect)
+
+    def remove_dynamic(self, sprite):
+        """Removes a collider which can move"""
+        index = self.dynamic_colliders.index(sprite)
+        del self.dynamic_colliders[index]
+        del self.dynamic_rects[index]
+
+    def get_cells_in_rect(self, rect):
+        """Returns the (column, row) of every tile that the rect overlaps"""
+        first_column = rect.left // self.cell_size
+        last_column = (rect.right - 1) // self.cell_size
+        first_row = rect.top // self.cell_size
+        last_row = (rect.bottom - 1) // self.cell_size
+        return [(column, row)
+                for row in range(first_row, last_row + 1)
+                for column in range(first_column, last_column + 1)]
+
+    def query(self, rect, ignore=None) -> list:
+        """Returns every collider which might overlap the given rect, in the order that they were added"""
+        candidates = {}
+        for cell in self.get_cells_in_rect(rect):
+            for sprite in self.static_cells.get(cell, ()):
+                candidates[sprite] = None
+        for index in rect.collidelistall(self.dynamic_rects):
+            sprite = self.dynamic_colliders[index]
+            if sprite.alive():
+                candidates[sprite] = None
+        candidates.pop(ignore, None)
+        return list(candidates)
+
+    def get_overlapping(self, rect, ignore=None) -> list:
+        """Returns every collider which overlaps the given rect, with merged tiles split back into tiles"""
+        overlapping = []
+        for sprite in self.query(rect, ignore):
+            if sprite.rect.colliderect(rect):
+                if isinstance(sprite, Collider):
+                    overlapping.extend(sprite.get_tiles(rect))
+                else:
+                    overlapping.append(sprite)
+        return overlapping
+
+    def sweep_y(self, rect, dy: int, ignore=None, solid_spikes=False):
+        """Finds how far the rect can move along the y-axis before hitting a collider.
+        Returns the distance that can be moved and the collider that was hit (or None)."""
+        if dy == 0:
+            return 0, None
+
+        allowed_dy = dy
+        hit = None
+
+        # There are only a few moving colliders, so all of the ones in the path are found at once
+        for index in rect.union(rect.move(0, dy)).collidelistall(self.dynamic_rects):
+            sprite = self.dynamic_colliders[index]
+            if sprite is not ignore and sprite.alive():
+                distance = self.get_distance_y(rect, sprite, dy, allowed_dy, solid_spikes)
+                if distance is not None:
+                    allowed_dy = distance
+                    hit = sprite
+
+        # Static colliders are found one row of tiles at a time, in the direction of movement. A collider that is
+        # first found in a row is no nearer than the edge of that row, so the walk stops once the edge of the next
+        # row is further away than a collider that has already been hit.
+        size = self.cell_size
+        first_column = max(rect.left // size, self.first_column)
+        last_column = min((rect.right - 1) // size, self.last_column)
+        if dy > 0:
+            rows = range(max(rect.top // size, self.first_row),
+                         min((rect.bottom - 1 + dy) // size, self.last_row) + 1)
+        else:
+            rows = range(min((rect.bottom - 1) // size, self.last_row),
+                         max((rect.top + dy) // size, self.first_row) - 1, -1)
+        for row in rows:
+            # The nearest that a collider first found in this row can be
+            if dy > 0:
+                edge = row * size - rect.bottom
+            else:
+                edge = (row + 1) * size - rect.top
+            if (dy > 0 and edge >= allowed_dy) or (dy < 0 and edge <= allowed_dy):
+                break
+            for column in range(first_column, last_column + 1):
+                for sprite in self.static_cells.get((column, row), ()):
+                    if sprite is not ignore:
+                        distance = self.get_distance_y(rect, sprite, dy, allowed_dy, solid_spikes)
+                        if distance is not None:
+                            allowed_dy = distance
+                            hit = sprite
+
+        return allowed_dy, hit
+
+    @staticmethod
+    def get_distance_y(rect, sprite, dy: int, allowed_dy: int, solid_spikes: bool):
+        """Returns the distance the rect can move along the y-axis before hitting the sprite, if it is nearer than
+        allowed_dy, and otherwise None"""
+        other = sprite.rect
+        # Only colliders which overlap the rect horizontally are in its path
+        if not (other.left < rect.right and other.right > rect.left):
+            return None
+
+        if dy > 0:
+            # Moving down: spikes can always be landed on. Only tops below the top of the rect can be hit, which
+            # for merged tiles may be the top of a tile inside the collider.
+            top = sprite.get_tile_top(rect.top) if isinstance(sprite, Collider) else other.top
+            distance = top - rect.bottom
+            if distance < allowed_dy and rect.top < top < other.bottom:
+                return distance
+        elif not sprite.is_spike or solid_spikes:
+            # Moving up: spikes do not act as ceilings
+            bottom = sprite.get_tile_bottom(rect.bottom) if isinstance(sprite, Collider) else other.bottom
+            distance = bottom - rect.top
+            if distance > allowed_dy and other.top < bottom < rect.bottom:
+                return distance
+        return None
+
+    def sweep_x(self, rect, dx: int, ignore=None, solid_spikes=False):
+        """Finds how far the rect can move along the x-axis before hitting a collider.
+        Returns the distance that can be moved and the collider that was hit (or None)."""
+        if dx == 0:
+            return 0, None
+
+        allowed_dx = dx
+        hit = None
+
+        for index in rect.union(rect.move(dx, 0)).collidelistall(self.dynamic_rects):
+            sprite = self.dynamic_colliders[index]
+            if sprite is not ignore and sprite.alive():
+                distance = self.get_distance_x(rect, sprite, dx, allowed_dx, solid_spikes)
+                if distance is not None:
+                    allowed_dx = distance
+                    hit = sprite
+
+        # Static colliders are found one column of tiles at a time, in the same way as in sweep_y()
+        size = self.cell_size
+        first_row = max(rect.top // size, self.first_row)
+        last_row = min((rect.bottom - 1) // size, self.last_row)
+        if dx > 0:
+            columns = range(max(rect.left // size, self.first_column),
+                            min((rect.right - 1 + dx) // size, self.last_column) + 1)
+        else:
+            columns = range(min((rect.right - 1) // size, self.last_column),
+                            max((rect.left + dx) // size, self.first_column) - 1, -1)
+        for column in columns:
+            if dx > 0:
+                edge = column * size - rect.right
+            else:
+                edge = (column + 1) * size - rect.left
+            if (dx > 0 and edge >= allowed_dx) or (dx < 0 and edge <= allowed_dx):
+                break
+            for row in range(first_row, last_row + 1):
+                for sprite in self.static_cells.get((column, row), ()):
+                    if sprite is not ignore:
+                        distance = self.get_distance_x(rect, sprite, dx, allowed_dx, solid_spikes)
+                        if distance is not None:
+                            allowed_dx = distance
+                            hit = sprite
+
+        return allowed_dx, hit
+
+    @staticmethod
+    def get_distance_x(rect, sprite, dx: int, allowed_dx: int, solid_spikes: bool):
+        """Returns the distance the rect can move along the x-axis before hitting the sprite, if it is nearer than
+        allowed_dx, and otherwise None"""
+        # Spikes do not act as walls
+        if sprite.is_spike and not solid_spikes:
+            return None
+
+        other = sprite.rect
+        # Only colliders which overlap the rect vertically are in its path
+        if not (other.top < rect.bottom and other.bottom > rect.top):
+            return None
+
+        if dx > 0:
+            left = sprite.get_tile_left(rect.left) if isinstance(sprite, Collider) else other.left
+            distance = left - rect.right
+            if distance < allowed_dx and rect.left < left < other.right:
+                return distance
+        else:
+            right = sprite.get_tile_right(rect.right) if isinstance(sprite, Collider) else other.right
+            distance = right - rect.left
+            if distance > allowed_dx and other.left < right < rect.right:
+                return distance
+        return None
@@ -1,5 +1,6 @@
 import pygame as pg
-from .entitystate import EntityState, Direction
+from .entitystate import EntityState, Direction, InputAction
+from .animation import animation_clock
 
 """
 * =============================================================== *
@@ -50,164 +51,121 @@ class PlayerInputComponent(Component):
     def __init__(self):
         super().__init__()
 
-    def update(self, player, *args):
-        current_keys = pg.key.get_pressed()
+    def update(self, player, input_state, *args):
 
         if player.state == EntityState.IDLE:
             # Resolves the bug of player sliding along surface when idle
             player.x_velocity = 0
             player.y_velocity = 0
 
-            if current_keys[pg.K_LEFT]:
+            if input_state.is_pressed(InputAction.LEFT):
                 player.state = EntityState.WALKING
                 player.direction = Direction.LEFT
                 player.x_velocity = -180
 
-            if current_keys[pg.K_RIGHT]:
+            if input_state.is_pressed(InputAction.RIGHT):
                 player.state = EntityState.WALKING
                 player.direction = Direction.RIGHT
                 player.x_velocity = 180
 
-            if current_keys[pg.K_SPACE]:
+            if input_state.is_pressed(InputAction.JUMP):
                 player.state = EntityState.JUMPING
                 player.y_velocity = -750
                 player.message("JUMP")
 
         elif player.state == EntityState.WALKING:
-            if current_keys[pg.K_LEFT]:
+            if input_state.is_pressed(InputAction.LEFT):
                 player.x_velocity = -180
                 player.direction = Direction.LEFT
 
-            if current_keys[pg.K_RIGHT]:
+            if input_state.is_pressed(InputAction.RIGHT):
                 player.x_velocity = 180
                 player.direction = Direction.RIGHT
 
-            if not (current_keys[pg.K_LEFT] or current_keys[pg.K_RIGHT]):
+            if not (input_state.is_pressed(InputAction.LEFT) or input_state.is_pressed(InputAction.RIGHT)):
                 player.state = EntityState.IDLE
                 player.x_velocity = 0
 
-            if current_keys[pg.K_SPACE]:
+            if input_state.is_pressed(InputAction.JUMP):
                 player.state = EntityState.JUMPING
                 player.y_velocity = -750
                 player.message("JUMP")
 
         elif player.state == EntityState.JUMPING:
-            if current_keys[pg.K_LEFT]:
+            if input_state.is_pressed(InputAction.LEFT):
                 player.x_velocity = -180
                 player.direction = Direction.LEFT
 
-            if current_keys[pg.K_RIGHT]:
+            if input_state.is_pressed(InputAction.RIGHT):
                 player.x_velocity = 180
                 player.direction = Direction.RIGHT
 
-            if not (current_keys[pg.K_LEFT] or current_keys[pg.K_RIGHT]):
+            if not (input_state.is_pressed(InputAction.LEFT) or input_state.is_pressed(InputAction.RIGHT)):
                 player.x_velocity = 0
 
         elif player.state == EntityState.HANGING:
             player.x_velocity = 0
             player.y_velocity = 0
 
-            if current_keys[pg.K_UP] or current_keys[pg.K_DOWN]:
+            if input_state.is_pressed(InputAction.UP) or input_state.is_pressed(InputAction.DOWN):
                 player.state = EntityState.CLIMBING
 
-            if current_keys[pg.K_LEFT]:
+            if input_state.is_pressed(InputAction.LEFT):
                 player.direction = Direction.RIGHT
 
-            if current_keys[pg.K_RIGHT]:
+            if input_state.is_pressed(InputAction.RIGHT):
                 player.direction = Direction.LEFT
 
-            if current_keys[pg.K_SPACE]:
+            if input_state.is_pressed(InputAction.JUMP):
                 player.state = EntityState.JUMPING
                 player.y_velocity = -750
                 player.message("JUMP")
 
         if player.state == EntityState.CLIMBING:
-            if current_keys[pg.K_UP]:
+            if input_state.is_pressed(InputAction.UP):
                 player.y_velocity = -120
 
-            if current_keys[pg.K_DOWN]:
+            if input_state.is_pressed(InputAction.DOWN):
                 player.y_velocity = 180
 
-            if not (current_keys[pg.K_UP] or current_keys[pg.K_DOWN]):
+            if not (input_state.is_pressed(InputAction.UP) or input_state.is_pressed(InputAction.DOWN)):
                 player.state = EntityState.HANGING
 
 
-class PlayerPhysicsComponent(Component):
+class PhysicsComponent(Component):
+    """Moves an entity by one step of the simulation and resolves its collisions with the terrain"""
     def __init__(self):
         super().__init__()
         self.gravity = 60           # because 60 * delta time gives 0 occasionally, which makes entity change state
                                     # due to the game thinking that it is jumping
-        self.DISCRETE_TIMESTEP = 1 / 60      # This is important for framerate independence
 
     def update(self, delta_time, entity, game_map):
-        # simulate multiple timesteps
-        num_full_steps = int(delta_time / self.DISCRETE_TIMESTEP)
-        remainder_time = delta_time % self.DISCRETE_TIMESTEP
-
-        for i in range(0, num_full_steps):
-            if entity.state != EntityState.CLIMBING and entity.state != EntityState.HANGING:
-                entity.y_velocity += int(self.gravity * self.DISCRETE_TIMESTEP * 60)
-
-            # Handle collisions in y-axis
-            entity.rect.y += int(entity.y_velocity * self.DISCRETE_TIMESTEP)
-            isJumping = True
-            for colliding_sprite in pg.sprite.spritecollide(entity, game_map.collideable_terrain_group, False):
-                if not colliding_sprite.is_spike:
-                    if colliding_sprite.rect.top < entity.rect.top < colliding_sprite.rect.bottom:
-                        entity.rect.top = colliding_sprite.rect.bottom
-                        entity.y_velocity = 0
-                if colliding_sprite.rect.top < entity.rect.bottom < colliding_sprite.rect.bottom:
-                    isJumping = False
-                    if entity.state == EntityState.JUMPING:
-                        entity.state = EntityState.IDLE
-                    entity.rect.bottom = colliding_sprite.rect.top
-                    entity.y_velocity = 0
-            if entity.state != EntityState.CLIMBING and entity.state != EntityState.HANGING:
-                if isJumping:
-                    entity.state = EntityState.JUMPING
-
-            # Handle collisions in x-axis
-            entity.rect.x += int(entity.x_velocity * self.DISCRETE_TIMESTEP)
-            for colliding_sprite in pg.sprite.spritecollide(entity, game_map.collideable_terrain_group, False):
-                if not colliding_sprite.is_spike:
-                    if colliding_sprite.rect.left < entity.rect.left < colliding_sprite.rect.right:
-                        entity.rect.left = colliding_sprite.rect.right
-                    if colliding_sprite.rect.left < entity.rect.right < colliding_sprite.rect.right:
-                        entity.rect.right = colliding_sprite.rect.left
-
-        # lerps the remainder and run simulation one last time
-        if entity.state != EntityState.CLIMBING and entity.state != EntityState.HANGING:
-            entity.y_velocity += int(self.gravity * remainder_time * 60)
-
-        # Handles collisions along the y axis next
-        # Positions the entity at its future position
-        entity.rect.y += int(entity.y_velocity * remainder_time)
-        if int(entity.y_velocity * remainder_time) != 0:
-            isJumping = True
-            for colliding_sprite in pg.sprite.spritecollide(entity, game_map.collideable_terrain_group, False):
-                if not colliding_sprite.is_spike:
-                    if colliding_sprite.rect.top < entity.rect.top < colliding_sprite.rect.bottom:
-                        entity.rect.top = colliding_sprite.rect.bottom
-                        entity.y_velocity = 0
-                if colliding_sprite.rect.top < entity.rect.bottom < colliding_sprite.rect.bottom:
-                    isJumping = False
-                    if entity.state == EntityState.JUMPING:
-                        entity.state = EntityState.IDLE
-                    entity.rect.bottom = colliding_sprite.rect.top
-                    entity.y_velocity = 0
-            # This is a hack to ensure that people fall properly
-            if entity.state != EntityState.CLIMBING and entity.state != EntityState.HANGING:
-                if isJumping:
-                    entity.state = EntityState.JUMPING
-
-        # Handle collisions along x-axis next
-        entity.rect.x += int(entity.x_velocity * remainder_time)
-        for colliding_sprite in pg.sprite.spritecollide(entity, game_map.collideable_terrain_group, False):
-            if not colliding_sprite.is_spike:
-                if colliding_sprite.rect.left < entity.rect.left < colliding_sprite.rect.right:
-                    entity.rect.left = colliding_sprite.rect.right
-                if colliding_sprite.rect.left < entity.rect.right < colliding_sprite.rect.right:
-                    entity.rect.right = colliding_sprite.rect.left
+        # The game loop always calls this with a fixed delta_time, which keeps the physics framerate independent
+        is_affected_by_gravity = entity.state != EntityState.CLIMBING and entity.state != EntityState.HANGING
+        if is_affected_by_gravity:
+            entity.y_velocity += round(self.gravity * delta_time * 60)
+
+        # Sweep along the y-axis, stopping at the first collider in the way
+        dy = int(entity.y_velocity * delta_time)
+        allowed_dy, colliding_sprite = game_map.collision_grid.sweep_y(entity.rect, dy)
+        entity.rect.y += allowed_dy
+        isJumping = True
+        if colliding_sprite is not None:
+            entity.y_velocity = 0
+            if dy > 0:
+                isJumping = False
+                if entity.state == EntityState.JUMPING:
+                    entity.state = EntityState.IDLE
+        # This is a hack to ensure that people fall properly
+        if is_affected_by_gravity and isJumping:
+            entity.state = EntityState.JUMPING
+
+        # Then sweep along the x-axis
+        dx = int(entity.x_velocity * delta_time)
+        allowed_dx, colliding_sprite = game_map.collision_grid.sweep_x(entity.rect, dx)
+        entity.rect.x += allowed_dx
+        if colliding_sprite is not None:
+            self.on_wall_collision(entity, Direction.LEFT if dx < 0 else Direction.RIGHT)
 
         # Then keeps everything within map boundaries
         map_width = game_map.rect.width
@@ -218,63 +176,42 @@ class PlayerPhysicsComponent(Component):
         elif entity.rect.right > map_width:
             entity.rect.right = map_width
 
+    def on_wall_collision(self, entity, side: Direction):
+        """Called when the entity runs into a wall on the given side"""
+        pass
 
-# For simple and single animation of terrain, without any state
-class SimpleAnimationComponent(Component):
-    def __init__(self, animation_sequence):
-        super().__init__()
-        self.animation_sequence = animation_sequence
-        self.frame_counter = 0
-        self.frames_per_update = 5
-        self.current_index = 0
-        self.animation_length = len(self.animation_sequence)
 
-    def update(self, entity):
-        self.frame_counter = (self.frame_counter + 1) % self.frames_per_update
-        if self.frame_counter == 0:
-            # this will probably cause some anim bugs
-            self.current_index = (self.current_index + 1) % self.animation_length
-            entity.image = self.animation_sequence[self.current_index]
-
-    def get_current_image(self):
-        return self.animation_sequence[self.current_index]
+class PlayerPhysicsComponent(PhysicsComponent):
+    def __init__(self):
+        super().__init__()
 
 
+# Animation of an entity with a sequence of frames for every state
 class PlayerAnimationComponent(Component):
-    def __init__(self, animation_sequences, state: EntityState):
+    def __init__(self, animations: dict, state: EntityState):
         super().__init__()
+        self.reset(animations, state)
 
-        # Save a dictionary of animations
-        self.animation_sequences = animation_sequences
+    def reset(self, animations: dict, state: EntityState):
+        """Starts the animation of the given state over, with a new set of animations"""
+        # Dictionary of an Animation for every state (see modules/animation.py)
+        self.animations = animations
 
-        # Current animation of entity will depend on its current_state
+        # The current frame is worked out from the time since the entity entered its current state
         self.current_state = state
-        self.current_animation = self.animation_sequences[self.current_state]
-
-        self.frame_counter = 0
-        self.frames_per_update = 5
-        self.current_index = 0
-        self.animation_length = len(self.current_animation)
+        self.start_time = animation_clock.time
 
     def update(self, entity):
-        # If entity has changed its state
-        if entity.state != self.current_state:
-            # Update current state of animation
+        """Starts the animation over if the entity has changed its state"""
+        if entity.state != self.current_state and entity.state in self.animations:
             self.current_state = entity.state
-            self.current_animation = self.animation_sequences[self.current_state]
-            self.frame_counter = 0
-            self.current_index = 0
-            self.animation_length = len(self.current_animation)
-        else:
-            self.frame_counter = (self.frame_counter + 1) % self.frames_per_update
+            self.start_time = animation_clock.time
 
-        if self.frame_counter == 0:
-            # this will probably cause some anim bugs
-            self.current_index = (self.current_index + 1) % self.animation_length
-            entity.image = self.current_animation[self.current_index]
-
-    def get_current_image(self):
-        return self.current_animation[self.current_index]
+    def get_current_image(self, entity):
+        # Entities which are not updated every step (e.g. far away enemies) may have changed state since their
+        # last update, so the state is checked again whenever they are drawn
+        self.update(entity)
+        return self.animations[self.current_state].get_frame(animation_clock.time - self.start_time)
 
 
 class RenderComponent(Component):
@@ -287,13 +224,23 @@ class RenderComponent(Component):
         rendered_image = entity.image.subsurface(entity.blit_rect)
         if entity.direction == Direction.LEFT:
             rendered_image = pg.transform.flip(rendered_image, True, False)
+
+        # Draw the entity between its previous and current position, by the same amount as the camera
+        x, y = entity.get_render_position(camera.alpha)
         surface.blit(rendered_image,
-                     (entity.rect.x - camera.rect.x, entity.rect.y - camera.rect.y))
+                     (x - camera.render_rect.x, y - camera.render_rect.y))
 
 
 class SoundComponent(Component):
+    # Silences every SoundComponent at once, e.g. while fast-forwarding
+    muted = False
+
     def __init__(self, sounds):
         super().__init__()
+        self.reset(sounds)
+
+    def reset(self, sounds):
+        """Plays the given sounds from now on"""
         self.state = None
         self.sounds = sounds
 
@@ -301,6 +248,9 @@ class SoundComponent(Component):
         pass
 
     def receive(self, message):
+        if SoundComponent.muted:
+            return
+
         if message == "JUMP":
             # also stop walking sound playback
             self.sounds["JUMP"].play()
@@ -308,13 +258,37 @@ class SoundComponent(Component):
             self.sounds["HIT"].play()
 
 
+class ParticleComponent(Component):
+    """Emits particles for the messages received by an entity, in the same way as SoundComponent plays sounds"""
+    # Effect of each message, as (point of the rect to emit from, count, colour, velocity, spread, lifetime)
+    EFFECTS = {
+        "JUMP": ("midbottom", 12, "DUST", (0, -20), 40, 0.35),
+        "HIT": ("center", 30, "BLOOD", (0, -60), 90, 0.6),
+        "COIN": ("center", 24, "RUBY", (0, -80), 70, 0.7),
+    }
+
+    def __init__(self, particle_system):
+        super().__init__()
+        self.particle_system = particle_system
+
+    def update(self, *args):
+        pass
+
+    def receive(self, entity, message):
+        effect = ParticleComponent.EFFECTS.get(message)
+        if effect is None:
+            return
+        point, count, colour, velocity, spread, lifetime = effect
+        self.particle_system.emit(getattr(entity.rect, point), count, colour, velocity, spread, lifetime)
+
+
 # -------------------- ENEMY COMPONENTS -------------------- #
 class EnemyAIInputComponent(Component):
     # This is a simple AI component that walks back and forth between two points
     def __init__(self):
         super().__init__()
 
-    def update(self, entity, map):
+    def update(self, entity, map, *args):
         entity.state = EntityState.WALKING
         if entity.direction == Direction.LEFT:
             if entity.rect.x > entity.left_bound:
@@ -330,103 +304,74 @@ class EnemyAIInputComponent(Component):
                 entity.x_velocity = -90
 
 
-class EnemyPhysicsComponent(Component):
+class EnemyPhysicsComponent(PhysicsComponent):
     def __init__(self):
         super().__init__()
-        self.gravity = 60           # because 60 * delta time gives 0 occasionally, which makes entity change state
-                                    # due to the game thinking that it is jumping
-        self.DISCRETE_TIMESTEP = 1 / 60      # This is important for framerate independence
 
-    def update(self, delta_time, entity, game_map):
-        # simulate multiple timesteps
-        num_full_steps = int(delta_time / self.DISCRETE_TIMESTEP)
-        remainder_time = delta_time % self.DISCRETE_TIMESTEP
-
-        for i in range(0, num_full_steps):
-            if entity.state != EntityState.CLIMBING and entity.state != EntityState.HANGING:
-                entity.y_velocity += int(self.gravity * self.DISCRETE_TIMESTEP * 60)
-
-            # Handle collisions in y-axis
-            entity.rect.y += int(entity.y_velocity * self.DISCRETE_TIMESTEP)
-            isJumping = True
-            for colliding_sprite in pg.sprite.spritecollide(entity, game_map.collideable_terrain_group, False):
-                if not colliding_sprite.is_spike:
-                    if colliding_sprite.rect.top < entity.rect.top < colliding_sprite.rect.bottom:
-                        entity.rect.top = colliding_sprite.rect.bottom
-                        entity.y_velocity = 0
-                if colliding_sprite.rect.top < entity.rect.bottom < colliding_sprite.rect.bottom:
-                    isJumping = False
-                    if entity.state == EntityState.JUMPING:
-                        entity.state = EntityState.IDLE
-                    entity.rect.bottom = colliding_sprite.rect.top
-                    entity.y_velocity = 0
-            if isJumping:
-                entity.state = EntityState.JUMPING
-
-            # Handle collisions in x-axis
-            entity.rect.x += int(entity.x_velocity * self.DISCRETE_TIMESTEP)
-            for colliding_sprite in pg.sprite.spritecollide(entity, game_map.collideable_terrain_group, False):
-                if not colliding_sprite.is_spike:
-                    if colliding_sprite.rect.left < entity.rect.left < colliding_sprite.rect.right:
-                        entity.rect.left = colliding_sprite.rect.right
-                        entity.direction = Direction.RIGHT
-                        entity.x_velocity = -entity.x_velocity
-
-                    if colliding_sprite.rect.left < entity.rect.right < colliding_sprite.rect.right:
-                        entity.rect.right = colliding_sprite.rect.left
-                        entity.direction = Direction.LEFT
-                        entity.x_velocity = -entity.x_velocity
-
-        # lerps the remainder and run simulation one last time
-        entity.y_velocity += int(self.gravity * remainder_time * 60)
-
-        # Handles collisions along the y axis next
-        # Positions the entity at its future position
-        entity.rect.y += int(entity.y_velocity * remainder_time)
-        if int(entity.y_velocity * remainder_time) != 0:
-            isJumping = True
-            for colliding_sprite in pg.sprite.spritecollide(entity, game_map.collideable_terrain_group, False):
-                if not colliding_sprite.is_spike:
-                    if colliding_sprite.rect.top < entity.rect.top < colliding_sprite.rect.bottom:
-                        entity.rect.top = colliding_sprite.rect.bottom
-                        entity.y_velocity = 0
-                if colliding_sprite.rect.top < entity.rect.bottom < colliding_sprite.rect.bottom:
-                    isJumping = False
-                    if entity.state == EntityState.JUMPING:
-                        entity.state = EntityState.IDLE
-                    entity.rect.bottom = colliding_sprite.rect.top
-                    entity.y_velocity = 0
-            if isJumping:
-                entity.state = EntityState.JUMPING
-
-        # Handle collisions along x-axis next
-        entity.rect.x += int(entity.x_velocity * remainder_time)
-        for colliding_sprite in pg.sprite.spritecollide(entity, game_map.collideable_terrain_group, False):
-            if not colliding_sprite.is_spike:
-                if colliding_sprite.rect.left < entity.rect.left < colliding_sprite.rect.right:
-                    entity.rect.left = colliding_sprite.rect.right
-                if colliding_sprite.rect.left < entity.rect.right < colliding_sprite.rect.right:
-                    entity.rect.right = colliding_sprite.rect.left
+    def on_wall_collision(self, entity, side: Direction):
+        """Turns the enemy around when it walks into a wall"""
+        entity.direction = Direction.RIGHT if side == Direction.LEFT else Direction.LEFT
+        entity.x_velocity = -entity.x_velocity
 
-        # Then keeps everything within map boundaries
-        map_width = game_map.rect.width
-        if entity.rect.top < 0:
-            entity.rect.top = 0
-        if entity.rect.left < 0:
-            entity.rect.left = 0
-        elif entity.rect.right > map_width:
-            entity.rect.right = map_width
 
+class EnemyAdvancedAIInputComponent(EnemyAIInputComponent):
+    """Allows the enemy to chase the target around the map, using the flow field or navigation graph of the map
+    to decide which way to walk. Patrols like the simple AI while the target cannot be reached."""
+    # Stops the enemy from turning back and forth when it is right below or above the target
+    CHASE_DEAD_ZONE = 4
 
-class EnemyAdvancedAIInputComponent(Component):
-    """Allows the enemy to chase the target within the boundaries of its own island."""
     def __init__(self):
         super().__init__()
 
-    def update(self, entity, game_map):
-        # Assume I have already generated the Floyd-Warshall array
-        #
-        pass
+    def update(self, entity, game_map, target=None):
+        if target is None:
+            super().update(entity, game_map)
+            return
+
+        # Both ways of finding the direction have already done the searching, so this takes constant time
+        if game_map.flow_field is not None:
+            is_near_target, direction = self.get_flow_field_direction(entity, game_map.flow_field)
+        elif game_map.navigation_graph is not None:
+            is_near_target, direction = self.get_navigation_graph_direction(entity, game_map.navigation_graph, target)
+        else:
+            is_near_target, direction = False, None
+
+        if is_near_target:
+            dx = target.rect.centerx - entity.rect.centerx
+            if abs(dx) <= self.CHASE_DEAD_ZONE:
+                entity.state = EntityState.IDLE
+                entity.x_velocity = 0
+                return
+            direction = Direction.LEFT if dx < 0 else Direction.RIGHT
+        elif direction is None:
+            super().update(entity, game_map)
+            return
+
+        entity.state = EntityState.WALKING
+        entity.direction = direction
+        entity.x_velocity = -90 if direction == Direction.LEFT else 90
+
+    @staticmethod
+    def get_flow_field_direction(entity, flow_field):
+        """Returns whether the enemy is in the same tile as the target, and the direction to walk in"""
+        distance, direction = flow_field.get_step(entity.rect)
+        if distance is None:
+            return False, None
+        if direction is None:
+            # The enemy is in the air, or about to walk off a ledge, so it carries on the way it was going
+            direction = entity.direction
+        return distance == 0, direction
+
+    @staticmethod
+    def get_navigation_graph_direction(entity, graph, target):
+        """Returns whether the enemy is on the same island as the target, and the direction to walk in"""
+        island = graph.get_island(entity.rect)
+        target_island = graph.get_island(target.rect)
+        if island is None or target_island is None:
+            return False, None
+        if island == target_island:
+            return True, None
+        return False, graph.get_next_direction(island, target_island)
 
 
 class EnemyDamageCollisionComponent(Component):
@@ -449,7 +394,7 @@ class EnemyDamageCrushComponent(Component):
         super().__init__()
 
     def update(self, entity, map):
-        for colliding_sprite in pg.sprite.spritecollide(entity, map.collideable_terrain_group, False):
+        for colliding_sprite in map.collision_grid.get_overlapping(entity.rect):
             if colliding_sprite.rect.bottom < entity.rect.centery:
                 entity.take_damage(100)
 
@@ -1,6 +1,7 @@
 import pygame as pg
 from .entitystate import GameEvent, EntityState, Direction
 from .spritesheet import Spritesheet
+from .animation import animation_library
 from .components import PlayerInputComponent, PlayerAnimationComponent, PlayerPhysicsComponent, \
                         SoundComponent, RenderComponent, EnemyDamageCollisionComponent, \
                         EnemyDamageCrushComponent
@@ -20,6 +21,9 @@ HOW TO MAKE A NEW ENEMY VARIANT
                                             for each state
         sound_library: dict         ->      Dictionary containing the different
                                             sounds to be played for each state
+        animations: dict            ->      Animation for every state of the
+                                            animation library, made with
+                                            animation_library.get_entity_animations()
 2.  Conduct manual inspection to determine the best width, height and hit_rect 
     attribute for the EnemyType.
 3.  Pass this EnemyType object to the Enemy constructor to instantiate a new variant 
@@ -34,6 +38,10 @@ class Entity(pg.sprite.Sprite):
         # Defines the hitbox of the Entity. Must be redefined in the subclass.
         self.rect = None                   
 
+        self.reset_entity_state()
+
+    def reset_entity_state(self):
+        """Puts the velocities, direction and state of the entity back to those of a new entity"""
         # Velocities
         self.x_velocity = 0              
         self.y_velocity = 0
@@ -44,19 +52,34 @@ class Entity(pg.sprite.Sprite):
         # State of the entity  
         self.state = EntityState.IDLE
 
+        # Position of the entity at the start of the current simulation step, used for render interpolation
+        self.previous_position = (0, 0)
+
+    @property
+    def image(self):
+        """Current frame of the animation of the entity, worked out when it is needed rather than every step"""
+        return self.animation_component.get_current_image(self)
+
     def update(self, *args):
         raise NotImplementedError
 
+    def save_previous_position(self):
+        """Stores the current position of the entity. Must be called before every simulation step."""
+        self.previous_position = self.rect.topleft
+
+    def get_render_position(self, alpha):
+        """Returns the position of the entity interpolated between its previous and current position"""
+        return (round(self.previous_position[0] + (self.rect.x - self.previous_position[0]) * alpha),
+                round(self.previous_position[1] + (self.rect.y - self.previous_position[1]) * alpha))
+
 
 class Player(Entity):
     """Represents the player character"""
+    # Number of seconds after taking damage during which the player cannot take damage again
+    IMMUNITY_TIME = 0.5
+
     def __init__(self):
         super().__init__()
-        self.health = 100
-        self.rect = pg.Rect(10, 10, 20, 30)
-        # blit rect x coord changed from 50 to 30
-        self.blit_rect = pg.Rect(15, 3.5, 20, 30)
-        self.last_collide_time = 0
 
         # Spritesheets
         idle_spritesheet = Spritesheet("assets/textures/player/adventurer-idle.png", 1, 4)
@@ -65,7 +88,7 @@ class Player(Entity):
         climb_spritesheet = Spritesheet("assets/textures/player/adventurer-climb.png", 1, 4)
 
         # Animations
-        animation_library = {
+        animation_sequences = {
                             EntityState.IDLE: idle_spritesheet.get_images_at(0, 1, 2, 3),
                             EntityState.WALKING: run_spritesheet.get_images_at(0, 1, 2, 3, 4, 5),
                             EntityState.JUMPING: jump_spritesheet.get_images_at(0),
@@ -84,13 +107,31 @@ class Player(Entity):
 
         # Components
         self.input_component = PlayerInputComponent()
-        self.animation_component = PlayerAnimationComponent(animation_library, self.state)
+        self.animation_component = PlayerAnimationComponent(
+            animation_library.get_entity_animations("Player", animation_sequences), self.state)
         self.physics_component = PlayerPhysicsComponent()
         self.sound_component = SoundComponent(sound_library)
         self.render_component = RenderComponent()
 
-        # Current Image
-        self.image = self.animation_component.get_current_image()
+        # Set by the GameScene if particles can be shown, since they need NumPy
+        self.particle_component = None
+
+        self.reset()
+
+    def reset(self):
+        """Puts the player back into the state of a new player, without loading its animations and sounds again"""
+        self.reset_entity_state()
+        self.health = 100
+        self.rect = pg.Rect(10, 10, 20, 30)
+        # blit rect x coord changed from 50 to 30
+        self.blit_rect = pg.Rect(15, 3.5, 20, 30)
+
+        # Time is measured in simulation time rather than wall-clock time, so that replays are deterministic
+        self.simulation_time = 0
+        self.last_collide_time = None
+
+        # Starts the animation of the new state over
+        self.animation_component.update(self)
 
     # ---------- DIRTY METHODS ---------- #
     # These will be placed here until I can find a way to wrap them in a component nicely
@@ -100,7 +141,7 @@ class Player(Entity):
             return
         else:
             self.health -= damage
-            self.last_collide_time = pg.time.get_ticks()
+            self.last_collide_time = self.simulation_time
             self.message("HIT")
             self.y_velocity = -2
 
@@ -113,17 +154,20 @@ class Player(Entity):
             )
 
     def is_immune(self):
-        return self.last_collide_time > pg.time.get_ticks() - 500
+        return self.last_collide_time is not None and self.simulation_time - self.last_collide_time < self.IMMUNITY_TIME
 
     def message(self, message):
         # Apart from sound, can force animation to receive animations too
         # But it is too much work to do animation, so we will not do that
         self.sound_component.receive(message)
+        if self.particle_component is not None:
+            self.particle_component.receive(self, message)
 
-    def handle_input(self):
-        self.input_component.update(self)
+    def handle_input(self, input_state):
+        self.input_component.update(self, input_state)
 
     def update(self, delta_time, map):
+        self.simulation_time += delta_time
         if self.rect.top > map.rect.bottom:
             self.state = EntityState.DEAD
             pg.event.post(
@@ -150,7 +194,23 @@ class Enemy(Entity):
                  patrol_radius=25
                  ):
         super().__init__()
-
+        self.damage_collide_component = EnemyDamageCollisionComponent()
+        self.damage_crush_component = EnemyDamageCrushComponent()
+        # Kept when the enemy is reused, and given the animations and sounds of its new type by reset()
+        self.animation_component = PlayerAnimationComponent(type_object.animations, EntityState.IDLE)
+        self.sound_component = SoundComponent(type_object.sound_library)
+        self.reset(type_object, ai_component, physics_component, render_component, starting_position, patrol_radius)
+
+    def reset(self,
+              type_object,
+              ai_component,
+              physics_component,
+              render_component,
+              starting_position,
+              patrol_radius=25
+              ):
+        """Puts the enemy into the state of a new enemy, so that it can be reused from an ObjectPool"""
+        self.reset_entity_state()
         self.health = 100
 
         # Boundaries for patrol
@@ -161,21 +221,25 @@ class Enemy(Entity):
         self.physics_component = physics_component
         self.render_component = render_component
 
-        self.damage_collide_component = EnemyDamageCollisionComponent()
-        self.damage_crush_component = EnemyDamageCrushComponent()
-
         # Animation and sound are taken from a type object
-        self.animation_component = PlayerAnimationComponent(type_object.animation_library, self.state)
-        self.sound_component = SoundComponent(type_object.sound_library)
+        self.animation_component.reset(type_object.animations, self.state)
+        self.sound_component.reset(type_object.sound_library)
 
         # Define starting position
         # index 0 is x position, index 1 is y position, index 2 is patrol range
-        self.rect = type_object.rect
+        # Each Enemy needs its own copy of the hitbox, otherwise all enemies of the same type share a position
+        self.rect = type_object.rect.copy()
         self.rect.x = starting_position[0]
         self.rect.y = starting_position[1]
         self.blit_rect = type_object.blit_rect
 
-        self.image = self.animation_component.get_current_image()
+        # Enemies far from the camera are not updated on every step, so they start out interpolating from their
+        # starting position rather than from the corner of the map
+        self.save_previous_position()
+
+        # Used by the SimulationScheduler to stagger updates, and to accumulate time between updates
+        self.schedule_slot = 0
+        self.pending_time = 0
 
     def take_damage(self, damage):
         """Instantly kills the enemy"""
@@ -186,12 +250,19 @@ class Enemy(Entity):
         pass
     
     def update(self,delta_time, map, player):
-        self.input_component.update(self, map)
+        self.input_component.update(self, map, player)
         self.physics_component.update(delta_time, self, map)
         self.damage_collide_component.update(self, player)
         self.damage_crush_component.update(self, map)
         self.animation_component.update(self)
 
+    def update_reduced(self, delta_time, map, player):
+        """Simulates the enemy in a single coarse step covering delta_time, without damage checks on the
+        player and without animation. Used for enemies that are far away from the camera."""
+        self.input_component.update(self, map, player)
+        self.physics_component.update(delta_time, self, map)
+        self.damage_crush_component.update(self, map)
+
     def render(self, camera, surface):
         self.render_component.update(self, camera, surface)
 
@@ -202,6 +273,8 @@ class EnemyType:
     def __init__(self):
         self.health = 100
         self.animation_library = {}
+        # Animation for every state in the animation library, made by the subclass
+        self.animations = {}
 
         jump_sound = pg.mixer.Sound("assets/sound/sfx/jump.ogg")
         self.sound_library = {
@@ -228,6 +301,7 @@ class PinkGuy(EnemyType):
             EntityState.JUMPING: jump_spritesheet.get_images_at(0),
             EntityState.DEAD: idle_spritesheet.get_images_at(0)
         }
+        self.animations = animation_library.get_entity_animations("Pink Guy", self.animation_library)
 
 
 class TrashMonster(EnemyType):
@@ -252,6 +326,7 @@ class TrashMonster(EnemyType):
             EntityState.JUMPING: jump_spritesheet.get_images_and_flip(0),
             EntityState.DEAD: idle_spritesheet.get_images_and_flip(0)
         }
+        self.animations = animation_library.get_entity_animations("Trash Monster", self.animation_library)
 
 
 class ToothWalker(EnemyType):
@@ -274,3 +349,4 @@ class ToothWalker(EnemyType):
             EntityState.JUMPING: walk_spritesheet.get_images_at(0),
             EntityState.DEAD: dead_spritesheet.get_images_at(0)
         }
+        self.animations = animation_library.get_entity_animations("Tooth Walker", self.animation_library)
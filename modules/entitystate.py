@@ -22,6 +22,20 @@ class Direction(Enum):
     RIGHT = 1
 
 
+class InputAction(Enum):
+    LEFT = 0
+    RIGHT = 1
+    UP = 2
+    DOWN = 3
+    JUMP = 4
+
+
+class SimulationTier(Enum):
+    FULL = 0
+    REDUCED = 1
+    DORMANT = 2
+
+
 class Action(Enum):
     WALK = 0
     STOP = 1
@@ -37,3 +51,4 @@ class GameEvent(Enum):
     GAME_RESTART = pg.USEREVENT + 4
     GAME_RETURN_TO_TITLE_SCREEN = pg.USEREVENT + 5
     GAME_LOAD_LEVEL = pg.USEREVENT + 6
+    GAME_RETRY_FROM_CHECKPOINT = pg.USEREVENT + 7
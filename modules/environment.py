@@ -0,0 +1,241 @@
+import pygame as pg
+import random
+import numpy as np
+from multiprocessing import shared_memory
+from .block import Coin
+from .entitystate import GameEvent, InputAction
+from .inputstate import InputState
+from .gamescene import GameScene
+from .timestep import FIXED_TIMESTEP
+from .headless import use_dummy_drivers, get_worker_context
+
+"""
+* =============================================================== *
+* This module contains a Gym-style environment around the         *
+* GameScene, which allows automated playtesters to play levels    *
+* without a keyboard, and a vectorised version which runs many    *
+* environments in parallel processes.                             *
+* =============================================================== *
+
+ACTIONS
+-------------------------
+An action is the bitmask of an InputState, so every combination of InputActions held down is an integer
+between 0 and ACTION_COUNT - 1. Each action is held for steps_per_action simulation steps.
+
+OBSERVATIONS
+-------------------------
+By default, an observation is a small vector describing the player (see OBSERVATION_FIELDS), which does not
+require anything to be rendered. If observation_size is given, the observation is instead game_display
+scaled down to (width, height), as an array of RGB values of shape (height, width, 3).
+
+REWARDS
+-------------------------
+    +1      ->      The level is completed (the episode ends)
+    -1      ->      The player dies (the episode ends)
+    +0.1    ->      For every coin collected
+Episodes are also cut short after max_steps simulation steps, in which case info["truncated"] is True.
+
+VECTORISED ENVIRONMENTS
+-------------------------
+The GameScene reports the end of a level through the PyGame event queue, which is shared by the whole
+process, so only one TowerEnv can run in each process. The VectorTowerEnv starts one worker process per
+environment, and the workers write their observations straight into a block of shared memory, so that
+only the actions, rewards and flags are sent between processes. Environments are reset automatically
+when their episode ends.
+"""
+
+ACTION_COUNT = 2 ** len(InputAction)
+
+OBSERVATION_FIELDS = ("x", "y", "x_velocity", "y_velocity", "state", "direction", "health", "coins_remaining")
+
+COIN_REWARD = 0.1
+
+
+class TowerEnv:
+    """Plays a single level of the game, one action at a time"""
+    def __init__(self, level: int = 1, steps_per_action: int = 1, observation_size=None, max_steps: int = 3600):
+        # Images can only be loaded once a display mode has been set
+        if pg.display.get_surface() is None:
+            pg.display.set_mode((800, 600))
+
+        self.level = level
+        self.steps_per_action = steps_per_action
+        self.observation_size = observation_size
+        self.max_steps = max_steps
+
+        self.scene = GameScene()
+
+        # Sound is never heard by an automated player, so it is muted just like when fast-forwarding
+        self.scene.manager.set_fast_forward(True)
+        self.observation_surface = None
+        if observation_size is not None:
+            self.observation_surface = pg.Surface(observation_size)
+
+        self.steps = 0
+        self.coins = []
+        self.coins_remaining = 0
+
+    @staticmethod
+    def get_observation_space(observation_size=None):
+        """Returns the shape and dtype of the observations for the given observation_size"""
+        if observation_size is None:
+            return (len(OBSERVATION_FIELDS),), np.float32
+        return (observation_size[1], observation_size[0], 3), np.uint8
+
+    def reset(self, level: int = None, seed: int = None):
+        """Starts a new episode on the given level (or the previous one), returning the first observation"""
+        if level is not None:
+            self.level = level
+        if seed is not None:
+            random.seed(seed)
+
+        scene = self.scene
+        scene.reset(self.level)
+        pg.event.clear()
+
+        self.steps = 0
+        self.coins = [sprite for sprite in scene.level_manager.level.map.interactive_objects_group
+                      if isinstance(sprite, Coin)]
+        self.coins_remaining = len(self.coins)
+        return self.get_observation()
+
+    def step(self, action: int):
+        """Holds down the InputActions in the action for steps_per_action steps.
+        Returns the observation, reward, whether the episode has ended, and a dictionary of extra information."""
+        scene = self.scene
+        scene.input_state = InputState(action)
+
+        outcome = None
+        for i in range(self.steps_per_action):
+            scene.update(FIXED_TIMESTEP)
+            self.steps += 1
+
+            for event in pg.event.get():
+                if event.type == GameEvent.SWITCH_LEVEL.value:
+                    outcome = "LEVEL_COMPLETE"
+                elif event.type == GameEvent.GAME_OVER.value:
+                    outcome = "GAME_OVER"
+            if outcome is not None or self.steps >= self.max_steps:
+                break
+
+        coins_remaining = sum(1 for coin in self.coins if coin.alive())
+        reward = COIN_REWARD * (self.coins_remaining - coins_remaining)
+        self.coins_remaining = coins_remaining
+
+        if outcome == "LEVEL_COMPLETE":
+            reward += 1
+        elif outcome == "GAME_OVER":
+            reward -= 1
+
+        truncated = outcome is None and self.steps >= self.max_steps
+        done = outcome is not None or truncated
+        info = {"outcome": outcome, "truncated": truncated, "steps": self.steps}
+        return self.get_observation(), reward, done, info
+
+    def get_observation(self):
+        """Returns the observation of the current state of the GameScene"""
+        if self.observation_surface is None:
+            player = self.scene.player
+            return np.array((player.rect.x,
+                             player.rect.y,
+                             player.x_velocity,
+                             player.y_velocity,
+                             player.state.value,
+                             player.direction.value,
+                             player.health,
+                             self.coins_remaining), dtype=np.float32)
+
+        # Renders exactly what the camera sees, without interpolating between steps
+        self.scene.camera.interpolate(1)
+        self.scene.draw_game_display()
+        pg.transform.scale(self.scene.game_display, self.observation_size, self.observation_surface)
+        return pg.surfarray.array3d(self.observation_surface).transpose(1, 0, 2)
+
+
+def run_worker(connection, memory_name: str, index: int, env_arguments: dict):
+    """Runs a TowerEnv in a worker process of a VectorTowerEnv, until it is told to close"""
+    env = TowerEnv(**env_arguments)
+    shape, dtype = TowerEnv.get_observation_space(env.observation_size)
+
+    memory = shared_memory.SharedMemory(name=memory_name)
+    offset = index * int(np.prod(shape)) * np.dtype(dtype).itemsize
+    observation = np.ndarray(shape, dtype, buffer=memory.buf, offset=offset)
+
+    while True:
+        command, argument = connection.recv()
+        if command == "step":
+            observation[...], reward, done, info = env.step(argument)
+            if done:
+                # Starts the next episode straight away, so the vectorised environment never has to wait
+                observation[...] = env.reset()
+            connection.send((reward, done, info))
+        elif command == "reset":
+            observation[...] = env.reset(*argument)
+            connection.send(None)
+        elif command == "close":
+            break
+
+    del observation
+    memory.close()
+    connection.close()
+
+
+class VectorTowerEnv:
+    """Runs several TowerEnvs in parallel worker processes, stepping all of them at once"""
+    def __init__(self, env_count: int, **env_arguments):
+        self.env_count = env_count
+        shape, dtype = TowerEnv.get_observation_space(env_arguments.get("observation_size"))
+
+        # Observations of every environment are written by the workers into one shared array
+        self.memory = shared_memory.SharedMemory(create=True,
+                                                 size=env_count * int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        self.observations = np.ndarray((env_count,) + shape, dtype, buffer=self.memory.buf)
+
+        # The workers have no window or sound (see modules/headless.py)
+        use_dummy_drivers()
+        context = get_worker_context()
+
+        self.connections = []
+        self.workers = []
+        for index in range(env_count):
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(target=run_worker,
+                                     args=(worker_connection, self.memory.name, index, env_arguments),
+                                     daemon=True)
+            worker.start()
+            self.connections.append(connection)
+            self.workers.append(worker)
+
+    def reset(self, level: int = None, seed: int = None):
+        """Starts a new episode in every environment, returning the observations of all environments"""
+        for index, connection in enumerate(self.connections):
+            connection.send(("reset", (level, None if seed is None else seed + index)))
+        for connection in self.connections:
+            connection.recv()
+        return self.observations
+
+    def step(self, actions):
+        """Steps every environment with its own action. Returns the observations, rewards, done flags
+        and information of all environments. Environments whose episode has ended are reset.
+        The observations are a view of the shared memory, and are overwritten by the next step."""
+        for connection, action in zip(self.connections, actions):
+            connection.send(("step", int(action)))
+
+        rewards = np.zeros(self.env_count, dtype=np.float32)
+        dones = np.zeros(self.env_count, dtype=bool)
+        infos = []
+        for index, connection in enumerate(self.connections):
+            rewards[index], dones[index], info = connection.recv()
+            infos.append(info)
+        return self.observations, rewards, dones, infos
+
+    def close(self):
+        """Stops every worker process and frees the shared memory"""
+        for connection in self.connections:
+            connection.send(("close", None))
+        for worker in self.workers:
+            worker.join()
+
+        del self.observations
+        self.memory.close()
+        self.memory.unlink()
@@ -3,15 +3,27 @@ import pygame.freetype as ft
 from .camera import Camera
 from .leveljson import LevelManager
 from .entities import Player
-from .background import StaticBackground
+from .background import BackgroundStack, DEFAULT_BACKGROUNDS
 from .headsupdisplay import HeadsUpDisplay
 from .entitystate import GameEvent
+from .components import SoundComponent, ParticleComponent
 from .userinterface import Menu, MenuButton, LevelSelectButton
+from .timestep import FixedTimestep
+from .inputstate import InputState, InputHandler
+from .renderqueue import RenderQueue
+from .animation import animation_clock
+from .checkpoint import CHECKPOINT_INTERVAL, Checkpoint
 import os
 import json
 import requests
 from Crypto.Cipher import AES
 
+try:
+    from .particles import ParticleSystem
+except ImportError:
+    # Particles need NumPy, which the game does not require, so the game is played without them instead
+    ParticleSystem = None
+
 """
 * =============================================================== *
 * This module contains all the different scenes that make up the  *
@@ -36,12 +48,23 @@ transitions between scenes.
 SCENE MANAGER
 -------------------------
 - TO BE COMPLETED -
+
+The SceneManager also owns the FixedTimestep of the game loop. update() is always invoked with the fixed
+length of a simulation step, and may be invoked several times (or not at all) between two calls to render().
+Scenes which interpolate their rendering read the interpolation factor from manager.timestep.alpha.
+
+While fast-forwarding, the FixedTimestep runs fast_forward_speed times faster, all sound is muted, and the game
+loop lifts its frame rate cap and only renders a frame every FAST_FORWARD_FRAME_TIME seconds, so that the
+speed of the game is limited by the cost of the simulation rather than the display.
 """
 
 # Size tuples
 WINDOW_SIZE = (800, 600)
 SURFACE_SIZE = (400, 300)
 
+# Fast-forward is active while this key is held down in the GameScene
+FAST_FORWARD_KEY = pg.K_TAB
+
 # Temporarily put this here so that code runs in Joshua's computer
 # Will comment this out when I push
 pg.init()
@@ -78,6 +101,9 @@ class Scene:
 
 class SceneManager:
     """Handles scene transitions from one scene to another"""
+    FAST_FORWARD_SPEED = 8
+    FAST_FORWARD_FRAME_TIME = 1 / 30
+
     def __init__(self, scene: Scene):
         # TODO: Implement previous_scene as stack without dictionary
         self.scene_stack = []           # Lists can also act as stacks
@@ -86,6 +112,17 @@ class SceneManager:
         self.scene = scene
         self.scene.manager = self
 
+        # Splits the time taken by each frame into fixed simulation steps
+        self.timestep = FixedTimestep()
+
+        # Optional ReplayRecorder which is handed every step simulated by the GameScene
+        self.recorder = None
+
+        # Fast-forward
+        self.fast_forward_speed = self.FAST_FORWARD_SPEED
+        self.is_fast_forwarding = False
+        self.music_volume = 0
+
     def switch_to_scene(self, scene: Scene):
         self.scene_stack.append(scene)
         self.scene = scene
@@ -96,6 +133,22 @@ class SceneManager:
         self.scene = self.scene_stack[-1]
         self.scene.manager = self
 
+    def set_fast_forward(self, is_fast_forwarding: bool):
+        """Turns fast-forward on or off"""
+        if is_fast_forwarding == self.is_fast_forwarding:
+            return
+
+        self.is_fast_forwarding = is_fast_forwarding
+        self.timestep.speed = self.fast_forward_speed if is_fast_forwarding else 1
+        SoundComponent.muted = is_fast_forwarding
+
+        # The music is silenced rather than paused, since scenes pause and unpause the music themselves
+        if is_fast_forwarding:
+            self.music_volume = pg.mixer.music.get_volume()
+            pg.mixer.music.set_volume(0)
+        else:
+            pg.mixer.music.set_volume(self.music_volume)
+
 
 class TitleScene(Scene):
     """Represents the title screen"""
@@ -104,9 +157,7 @@ class TitleScene(Scene):
         super().__init__()
 
         # Backgrounds
-        self.backgrounds = (StaticBackground("assets/textures/background/01_background.png", self.game_display),
-                            StaticBackground("assets/textures/background/03 background B.png", self.game_display),
-                            StaticBackground("assets/textures/background/04 background.png", self.game_display))
+        self.background_stack = BackgroundStack.from_definitions(DEFAULT_BACKGROUNDS, self.game_display)
 
         # Initialize title text
         self.title = freetype.render("THE TOWER", (70, 35, 35), None, 0, 0, 32)
@@ -153,8 +204,7 @@ class TitleScene(Scene):
 
     def render(self, surface: pg.Surface):
         # Blit backgrounds on game_display
-        for background in self.backgrounds:
-            background.render()
+        self.background_stack.render()
 
         # Blit text on game_display
         self.game_display.blit(self.title[0], self.title_blit_position)
@@ -225,9 +275,7 @@ class LevelSelectionScene(Scene):
         self.forward_button_rect = pg.Rect(363, 100, 20, 150)
 
         # backgrounds
-        self.backgrounds = (StaticBackground("assets/textures/background/01_background.png", self.game_display),
-                            StaticBackground("assets/textures/background/03 background B.png", self.game_display),
-                            StaticBackground("assets/textures/background/04 background.png", self.game_display))
+        self.background_stack = BackgroundStack.from_definitions(DEFAULT_BACKGROUNDS, self.game_display)
 
     def handle_events(self):
         for event in pg.event.get():
@@ -266,8 +314,7 @@ class LevelSelectionScene(Scene):
         pass
 
     def render(self, surface: pg.Surface):
-        for background in self.backgrounds:
-            background.render()
+        self.background_stack.render()
 
         self.game_display.blit(self.level_select_title[0], self.title_blit_position)
 
@@ -301,14 +348,26 @@ class GameScene(Scene):
         self.player.rect.x = self.level_manager.level.starting_position[0]
         self.player.rect.y = self.level_manager.level.starting_position[1]
 
+        # Visual effects are emitted by the player's messages
+        self.particle_system = None
+        if ParticleSystem is not None:
+            self.particle_system = ParticleSystem()
+            self.player.particle_component = ParticleComponent(self.particle_system)
+
         # Initialize GUI
         self.hud = HeadsUpDisplay()
 
-        # TODO: Delegate background handling to Map, since Maps should know their background
-        # Initialize backgrounds
-        self.backgrounds = (StaticBackground("assets/textures/background/01_background.png", self.game_display),
-                            StaticBackground("assets/textures/background/03 background B.png", self.game_display),
-                            StaticBackground("assets/textures/background/04 background.png", self.game_display))
+        # Everything in front of the backgrounds is drawn in batches, one layer at a time
+        self.render_queue = RenderQueue(self.game_display)
+
+        # The keyboard is polled once per frame, and the same InputState is shared by everything that reads input
+        self.input_handler = InputHandler()
+        self.input_state = InputState()
+
+        # The backgrounds and visibility are declared by the map of each level, and set up when the level is
+        # first drawn
+        self.background_stack = None
+        self.displayed_level = None
 
         # Play BGM
         pg.mixer.music.load("assets/sound/music/Deep Dream.ogg")
@@ -322,6 +381,46 @@ class GameScene(Scene):
         # hack to control ability to submit leaderboard
         self.can_submit_leaderboard = True
 
+        # Latest Checkpoint of the current level, which the player can go back to after dying
+        self.checkpoint = None
+
+    def reset(self, level: int = 1):
+        """Starts the game over from the given level in place, reusing the player, HUD, music and everything else
+        that was loaded when the GameScene was made"""
+        self.player.reset()
+        self.level_manager.load_level(level, self.player, self.camera)
+        if self.particle_system is not None:
+            self.particle_system.clear()
+        self.input_state = InputState()
+        self.checkpoint = None
+
+        self.score_timer.tick()
+        self.can_submit_leaderboard = True
+
+    def has_checkpoint(self) -> bool:
+        """Returns whether a checkpoint has been taken in the current level"""
+        return self.checkpoint is not None and self.checkpoint.level is self.level_manager.level
+
+    def update_checkpoint(self):
+        """Takes a new checkpoint if the last one is more than CHECKPOINT_INTERVAL seconds old, or was taken in
+        another level, as long as the player is somewhere safe to go back to"""
+        if self.has_checkpoint() and self.player.simulation_time - self.checkpoint.time < CHECKPOINT_INTERVAL:
+            return
+        if Checkpoint.is_safe(self.player):
+            self.checkpoint = self.level_manager.level.capture_checkpoint(self.player, self.camera)
+
+    def restore_checkpoint(self):
+        """Puts the level and player back into the state of the last checkpoint"""
+        level = self.level_manager.level
+        level.restore_checkpoint(self.checkpoint, self.player, self.camera)
+        if self.particle_system is not None:
+            self.particle_system.clear()
+        self.input_state = InputState()
+
+        # The rest of the level cannot be replayed, since replays always start from the start of the level
+        if self.manager.recorder is not None:
+            self.manager.recorder.skip_rest_of_level(level)
+
     def handle_events(self):
         # Clears the event queue and processes the events
         for event in pg.event.get():
@@ -338,59 +437,113 @@ class GameScene(Scene):
             elif event.type == GameEvent.SWITCH_LEVEL.value:
                 self.manager.switch_to_scene(FadeOutScene())
             elif event.type == GameEvent.GAME_OVER.value:
-                self.manager.switch_to_scene(GameOverScene())
+                self.manager.switch_to_scene(GameOverScene(self.has_checkpoint()))
             elif event.type == GameEvent.GAME_COMPLETE.value:
                 # FIXME: this is unnecessary, check and remove
                 self.manager.switch_to_scene(GameBeatenScene(self.score_timer.tick() / 1000))
                 if not self.can_submit_leaderboard:
                     self.manager.scene.submitted = True
 
-        # Processes the input for the player
-        self.player.handle_input()
+        # Takes a snapshot of the input for this frame
+        self.input_state = self.input_handler.poll()
+
+        # Fast-forwards for as long as the key is held down, and never outside of the GameScene
+        self.manager.set_fast_forward(self.manager.scene is self and pg.key.get_pressed()[FAST_FORWARD_KEY])
 
     def update(self, delta_time):
+        # Records the input of this step, so that it can be replayed later
+        if self.manager.recorder is not None:
+            self.manager.recorder.record(self.level_manager.current_level,
+                                         self.level_manager.level,
+                                         self.player,
+                                         self.camera,
+                                         self.input_state,
+                                         delta_time)
+
+        # Positions at the start of the step are kept so that rendering can interpolate between steps
+        self.player.save_previous_position()
+        self.camera.save_previous_position()
+
+        # Processes the input for the player
+        self.player.handle_input(self.input_state)
+
         self.player.update(delta_time, self.level_manager.level.map)
-        self.level_manager.level.update(delta_time, self.player)
+        self.level_manager.level.update(delta_time, self.player, self.camera, self.input_state)
+        animation_clock.advance(delta_time)
+        if self.particle_system is not None:
+            self.particle_system.update(delta_time)
         self.hud.update(delta_time, self.player, self.camera)
 
         # Move camera to player's position
         self.camera.follow_target(self.player)
 
+        self.update_checkpoint()
+
     def render(self, surface):
+        # Moves the view of the camera to where it would be between the last two simulation steps
+        self.camera.interpolate(self.manager.timestep.alpha)
+
+        self.draw_game_display()
+
+        # Blit game_display on window surface
+        surface.blit(pg.transform.scale(self.game_display, WINDOW_SIZE), (0, 0))
+
+    def draw_game_display(self):
+        """Draws the game onto game_display at its native resolution, as seen by the camera"""
         # Blit backgrounds on game_display
-        for background in self.backgrounds:
-            background.render()
+        level = self.level_manager.level
+        if self.displayed_level is not level:
+            self.background_stack = BackgroundStack.from_definitions(level.map.backgrounds, self.game_display)
+            self.hud.set_visibility(level.map.visibility, self.player, self.camera)
+            if self.particle_system is not None:
+                self.particle_system.clear()
+            self.displayed_level = level
+        self.background_stack.update(self.camera)
+        self.background_stack.render()
+
+        self.render_queue.begin_frame()
 
         # Draws the map and enemies
-        self.level_manager.level.render(self.camera, self.game_display)
+        self.level_manager.level.render(self.camera, self.render_queue)
 
         # Draw player on game_display wrt camera position
-        self.player.render(self.camera, self.game_display)
+        self.player.render(self.camera, self.render_queue)
+        self.render_queue.flush()
 
-        # Draw GUI
-        self.hud.render(self.game_display)
+        # Draw every particle in view, straight into the pixels of game_display
+        if self.particle_system is not None:
+            self.particle_system.render(self.camera.render_rect, self.game_display)
 
-        # Blit game_display on window surface
-        surface.blit(pg.transform.scale(self.game_display, WINDOW_SIZE), (0, 0))
+        # Lighting darkens everything drawn so far, but not the GUI
+        if self.level_manager.level.map.light_map is not None:
+            self.level_manager.level.map.render_lighting(self.camera, self.game_display, self.player)
+
+        # Draw GUI, including the number of draw calls made for the last frame
+        self.hud.render(self.render_queue)
+        self.render_queue.flush()
 
 
 class GameOverScene(Scene):
     """Represents the "Game Over" screen"""
 
-    def __init__(self):
+    def __init__(self, has_checkpoint: bool = False):
         super().__init__()
 
         # Initialize title
         self.title = freetype.render("GAME OVER", (235, 235, 235), None, 0, 0, 32)
         self.title_blit_position = (int((self.game_display.get_width() - self.title[0].get_width()) / 2), 100)
 
+        buttons = [("Restart", lambda: pg.event.post(pg.event.Event(GameEvent.GAME_RESTART.value))),
+                   ("Main Menu", lambda: pg.event.post(pg.event.Event(GameEvent.GAME_RETURN_TO_TITLE_SCREEN.value))),
+                   ("Quit", lambda: pg.event.post(pg.event.Event(pg.QUIT)))]
+        # Retrying is only offered once a checkpoint has been taken in the level
+        if has_checkpoint:
+            buttons.insert(0, ("Retry",
+                               lambda: pg.event.post(pg.event.Event(GameEvent.GAME_RETRY_FROM_CHECKPOINT.value))))
+
         self.menu = Menu(8,
                          (235, 235, 235),
-                         ("Restart", lambda: pg.event.post(pg.event.Event(GameEvent.GAME_RESTART.value)), (182, 180)),
-                         ("Main Menu",
-                          lambda: pg.event.post(pg.event.Event(GameEvent.GAME_RETURN_TO_TITLE_SCREEN.value)),
-                          (182, 200)),
-                         ("Quit", lambda: pg.event.post(pg.event.Event(pg.QUIT)), (182, 220)))
+                         *[(text, on_click, (182, 180 + index * 20)) for index, (text, on_click) in enumerate(buttons)])
 
     def handle_events(self):
         for event in pg.event.get():
@@ -398,9 +551,12 @@ class GameOverScene(Scene):
                 pg.quit()
                 quit()
             elif event.type == GameEvent.GAME_RESTART.value:
+                # The GameScene is always the scene before this one, and is started over rather than made again
                 self.manager.go_to_previous_scene()
+                self.manager.scene.reset()
+            elif event.type == GameEvent.GAME_RETRY_FROM_CHECKPOINT.value:
                 self.manager.go_to_previous_scene()
-                self.manager.switch_to_scene(GameScene())
+                self.manager.scene.restore_checkpoint()
             elif event.type == GameEvent.GAME_RETURN_TO_TITLE_SCREEN.value:
                 self.manager.go_to_previous_scene()
                 self.manager.go_to_previous_scene()
@@ -461,9 +617,9 @@ class GameBeatenScene(Scene):
                 pg.quit()
                 quit()
             elif event.type == GameEvent.GAME_RESTART.value:
+                # The GameScene is always the scene before this one, and is started over rather than made again
                 self.manager.go_to_previous_scene()
-                self.manager.go_to_previous_scene()
-                self.manager.switch_to_scene(GameScene())
+                self.manager.scene.reset()
             elif event.type == GameEvent.GAME_RETURN_TO_TITLE_SCREEN.value:
                 self.manager.go_to_previous_scene()
                 self.manager.go_to_previous_scene()
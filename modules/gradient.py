@@ -0,0 +1,26 @@
+import pygame as pg
+
+"""
+* =============================================================== *
+* This module contains draw_radial_gradient(), which draws the    *
+* circles that fade from one colour to another, e.g. the edge of  *
+* the vignette and the light sprites of the LightMap.             *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+The gradient is drawn as filled circles from the outside in, one for every pixel of radius, each one drawn over
+the last. pygame.draw.circle() replaces the pixels it draws rather than blending with them, even on surfaces with
+per-pixel alpha, so every circle leaves a ring of its own colour around the smaller circles drawn after it.
+"""
+
+
+def draw_radial_gradient(surface: pg.Surface, centre, radius: int, inner_radius: int, get_colour) -> None:
+    """Draws a gradient around the centre, from the radius in to the inner radius (which is left as it is). The
+    colour of each ring is given by get_colour(fraction), where fraction goes from 1 at the radius towards 0 at the
+    inner radius."""
+    for circle_radius in range(radius, inner_radius, -1):
+        pg.draw.circle(surface,
+                       get_colour((circle_radius - inner_radius) / (radius - inner_radius)),
+                       centre,
+                       circle_radius)
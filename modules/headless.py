@@ -0,0 +1,54 @@
+import multiprocessing
+import os
+import pygame as pg
+
+"""
+* =============================================================== *
+* This module contains the helpers shared by everything that runs *
+* the game without a window or sound (run_replay.py, the replay   *
+* and level checks, and VectorTowerEnv), often in parallel worker *
+* processes.                                                      *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+SDL reads the drivers it uses from the environment when PyGame is initialised, which happens as soon as the game
+modules are imported (see modules/gamescene.py). use_dummy_drivers() must therefore be called before any of them
+are imported. Worker processes inherit the environment, so they use the dummy drivers too.
+
+SDL does not survive being forked, so worker processes are always started as fresh processes, with the context
+returned by get_worker_context(), and initialise PyGame themselves with init_worker(). A display mode is still
+required for images to be converted, even with the dummy video driver.
+
+SDL also catches SIGTERM, so a Pool of workers cannot be terminated. map_in_workers() closes the pool and waits
+for the workers to exit by themselves instead.
+"""
+
+
+def use_dummy_drivers() -> None:
+    """Makes SDL run without a window or sound, unless other drivers have already been chosen"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+def get_worker_context():
+    """Returns the multiprocessing context which starts every worker as a fresh process"""
+    return multiprocessing.get_context("spawn")
+
+
+def init_worker() -> None:
+    """Initialises PyGame in a worker process, with a display mode so that images can be converted"""
+    pg.mixer.pre_init(44100, 16, 2, 512)
+    pg.init()
+    if pg.display.get_surface() is None:
+        pg.display.set_mode((800, 600))
+
+
+def map_in_workers(function, jobs: list, workers: int = None) -> list:
+    """Calls the function with every job in a pool of worker processes, returning the results in order"""
+    pool = get_worker_context().Pool(workers, initializer=init_worker)
+    try:
+        return pool.map(function, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
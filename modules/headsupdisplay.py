@@ -1,32 +1,64 @@
 import pygame as pg
 import pygame.freetype as ft
+from .background import image_cache
+from .gradient import draw_radial_gradient
 
 """
 * =============================================================== *
 * This module contains the various classes required to make a     *
 * Heads-Up Display (HUD) in the game.                             *
 * =============================================================== *
+
+VIGNETTE
+-------------------------
+Dark levels limit the vision of the player to a circle around them (see "visibility" in modules/leveljson.py).
+The mask which darkens everything outside of the circle is drawn once, at twice the size of the screen with the
+circle in its centre, and is then blitted at an offset every frame so that the circle is centred on the player.
+Wherever the player is on the screen, the mask covers the whole screen.
+
+Masks are kept in the shared image cache (see modules/background.py) by their radius and falloff, so the radius
+can be changed without drawing the mask again. A mask with no falloff has a hard edge, and is drawn with a
+colorkey. A mask with a falloff fades from transparent to dark over the last falloff pixels of the circle (see
+modules/gradient.py), and is drawn with per-pixel alpha.
 """
 
 
 class HeadsUpDisplay:
     """Manages all elements of the HUD"""
     def __init__(self):
-        # self.vignette = Vignette()
+        # Only shown in dark levels
+        self.vignette = None
         self.healthbar = Healthbar()
         self.fps_counter = FPSCounter()
+        self.draw_call_counter = DrawCallCounter()
 
     def update(self, delta_time, player, camera):
         """Updates all the elements of the HUD"""
-        # self.vignette.update(player, camera)
+        if self.vignette is not None:
+            self.vignette.update(player, camera)
         self.healthbar.update(player)
-        self.fps_counter.update(delta_time)
 
-    def render(self, surface):
-        """Renders the elements of the HUD onto the specified surface"""
-        # self.vignette.render(surface)
-        self.healthbar.render(surface)
-        self.fps_counter.render(surface)
+    def set_visibility(self, visibility, player, camera):
+        """Shows a vignette around the player with the radius and falloff in the visibility dict, or hides it if
+        visibility is None"""
+        if visibility is None:
+            self.vignette = None
+        else:
+            self.vignette = Vignette(visibility["radius"], visibility.get("falloff", 0))
+            self.vignette.update(player, camera)
+
+    def render(self, render_queue):
+        """Renders the elements of the HUD onto the specified RenderQueue"""
+        if self.vignette is not None:
+            self.vignette.render(render_queue)
+        self.healthbar.render(render_queue)
+
+        # The simulation runs at a fixed rate, so frames are counted when they are rendered instead
+        self.fps_counter.update()
+        self.fps_counter.render(render_queue)
+
+        self.draw_call_counter.update(render_queue)
+        self.draw_call_counter.render(render_queue)
 
 
 class Healthbar:
@@ -61,9 +93,11 @@ class FPSCounter:
         # Variables for calculating FPS
         self.time_counter = 0
         self.frame_counter = 0
+        self.clock = pg.time.Clock()
 
-    def update(self, delta_time):
-        """Updates the current FPS of the game"""
+    def update(self):
+        """Counts a rendered frame and updates the current FPS of the game"""
+        delta_time = self.clock.tick() / 1000
         if self.time_counter > 0.5:
             self.fps = self.freetype.render(str('%.1f' % (self.frame_counter / self.time_counter)),
                                             (150, 100, 100))
@@ -78,23 +112,81 @@ class FPSCounter:
         surface.blit(self.fps[0], (355, 20))
 
 
-class Vignette:
-    """Limits the vision of the player"""
-    # Since this is a post-process
+class DrawCallCounter:
+    """Shows the number of blits and draw calls made by a RenderQueue on the last frame"""
     def __init__(self):
-        self.image = pg.Surface((400, 300))
+        self.freetype = ft.Font("assets/fonts/pixChicago.ttf", 8)   # size must be set to 8, otherwise AA kicks in
+        self.freetype.antialiased = False
+        self.counts = None
+        self.text = None
+
+    def update(self, render_queue):
+        """Renders the text again only if the counts have changed since the last frame"""
+        counts = (render_queue.last_blit_count, render_queue.last_draw_call_count)
+        if counts != self.counts:
+            self.counts = counts
+            self.text = self.freetype.render("%d/%d" % counts, (150, 100, 100))
+
+    def render(self, surface):
+        """Renders the counts below the FPS counter, as blits/draw calls"""
+        surface.blit(self.text[0], (355, 32))
+
+
+class Vignette:
+    """Limits the vision of the player to a circle around them"""
+    DARK_COLOUR = (20, 20, 20)
+    TRANSPARENT_COLOUR = (255, 255, 255)
+    SCREEN_SIZE = (400, 300)
+
+    def __init__(self, radius: int = 100, falloff: int = 0):
+        self.radius = radius
+        self.falloff = falloff
+        self.image = Vignette.get_mask(radius, falloff)
+        self.player = None
+        self.camera = None
+
+    @staticmethod
+    def get_mask(radius: int, falloff: int) -> pg.Surface:
+        """Returns the mask with the given radius and falloff, drawing it if it is not in the cache"""
+        return image_cache.get_or_build(("vignette", radius, falloff), lambda: Vignette.draw_mask(radius, falloff))
+
+    @staticmethod
+    def draw_mask(radius: int, falloff: int) -> pg.Surface:
+        """Draws a mask twice the size of the screen, which darkens everything outside of a circle in its
+        centre"""
+        size = (Vignette.SCREEN_SIZE[0] * 2, Vignette.SCREEN_SIZE[1] * 2)
+        centre = Vignette.SCREEN_SIZE
+        if falloff <= 0:
+            mask = pg.Surface(size)
+            mask.fill(Vignette.DARK_COLOUR)
+            pg.draw.circle(mask, Vignette.TRANSPARENT_COLOUR, centre, radius)
+            mask.set_colorkey(Vignette.TRANSPARENT_COLOUR, pg.RLEACCEL)
+            return mask.convert()
+
+        # The mask fades from opaque at the radius to transparent at the inner radius
+        mask = pg.Surface(size, pg.SRCALPHA)
+        mask.fill(Vignette.DARK_COLOUR + (255,))
+        inner_radius = max(radius - falloff, 0)
+        draw_radial_gradient(mask, centre, radius, inner_radius,
+                             lambda fraction: Vignette.DARK_COLOUR + (int(255 * fraction),))
+        if inner_radius > 0:
+            pg.draw.circle(mask, Vignette.DARK_COLOUR + (0,), centre, inner_radius)
+        return mask.convert_alpha()
+
+    def set_radius(self, radius: int) -> None:
+        self.radius = radius
+        self.image = Vignette.get_mask(radius, self.falloff)
 
     def update(self, player, camera):
-        """Marks a circular area around the player's position on the surface as transparent"""
-        self.image = pg.Surface((400, 300))
-        self.image.fill((20, 20, 20))
-        pg.draw.circle(self.image,
-                       (255, 255, 255),
-                       (player.rect.centerx - camera.rect.x,
-                        player.rect.centery - camera.rect.y),
-                       100)
-        self.image.set_colorkey((255, 255, 255))
-
-    def render(self, surface: pg.Surface):
-        """Renders the vignette onto the screen"""
-        surface.blit(self.image, (0, 0))
+        """Follows the given player, as seen by the given camera"""
+        self.player = player
+        self.camera = camera
+
+    def render(self, surface):
+        """Renders the vignette onto the screen, with the circle centred on where the player is drawn"""
+        if self.player is None:
+            return
+        x, y = self.player.get_render_position(self.camera.alpha)
+        centre_x = x + self.player.rect.width // 2 - self.camera.render_rect.x
+        centre_y = y + self.player.rect.height // 2 - self.camera.render_rect.y
+        surface.blit(self.image, (centre_x - Vignette.SCREEN_SIZE[0], centre_y - Vignette.SCREEN_SIZE[1]))
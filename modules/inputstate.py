@@ -0,0 +1,77 @@
+import pygame as pg
+from .entitystate import InputAction
+
+"""
+* =============================================================== *
+* This module contains the InputState, which is a snapshot of the *
+* game actions held down by the player, and the InputHandler,     *
+* which polls the keyboard once per frame to produce it.          *
+* =============================================================== *
+
+RATIONALE
+-------------------------
+The keyboard is polled exactly once per frame, and the resulting InputState is passed to every 
+component and block which reacts to the player's input. Since the InputState only stores game actions 
+(and not physical keys), keys can be remapped by changing the key bindings of the InputHandler, and an 
+InputState can be stored and replayed later as a single integer.
+"""
+
+
+class InputState:
+    """Immutable snapshot of the game actions which are held down, stored as a bitmask of InputActions"""
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        object.__setattr__(self, "bits", bits)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("InputState is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, InputState) and self.bits == other.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __repr__(self):
+        return "InputState(" + ", ".join(action.name for action in InputAction if self.is_pressed(action)) + ")"
+
+    @staticmethod
+    def from_actions(*actions: InputAction):
+        """Creates an InputState where only the given actions are held down"""
+        bits = 0
+        for action in actions:
+            bits |= 1 << action.value
+        return InputState(bits)
+
+    def is_pressed(self, action: InputAction) -> bool:
+        """Checks if the given action is held down"""
+        return self.bits & (1 << action.value) != 0
+
+
+class InputHandler:
+    """Polls the keyboard and maps the keys which are held down to game actions"""
+    def __init__(self):
+        self.key_bindings = {pg.K_LEFT: InputAction.LEFT,
+                             pg.K_RIGHT: InputAction.RIGHT,
+                             pg.K_UP: InputAction.UP,
+                             pg.K_DOWN: InputAction.DOWN,
+                             pg.K_SPACE: InputAction.JUMP
+                             }
+
+    def bind(self, key: int, action: InputAction):
+        """Maps the given key to the given action, in addition to any existing bindings"""
+        self.key_bindings[key] = action
+
+    def unbind(self, key: int):
+        """Removes the binding of the given key"""
+        self.key_bindings.pop(key, None)
+
+    def poll(self) -> InputState:
+        """Reads the keyboard and returns the current InputState. Should only be called once per frame."""
+        current_keys = pg.key.get_pressed()
+        bits = 0
+        for key, action in self.key_bindings.items():
+            if current_keys[key]:
+                bits |= 1 << action.value
+        return InputState(bits)
@@ -1,10 +1,28 @@
 import pygame as pg
 import json
+import os
 from modules.block import Block, FallingBlock, PushableBlock, LadderBlock, SpikeBlock, GatewayBlock, Coin
 from modules.entities import Enemy, PinkGuy, TrashMonster, ToothWalker
-from modules.entitystate import GameEvent, EntityState
-from modules.components import PlayerPhysicsComponent, RenderComponent, EnemyAIInputComponent, EnemyPhysicsComponent
+from modules.entitystate import GameEvent, EntityState, SimulationTier
+from modules.components import PlayerPhysicsComponent, RenderComponent, EnemyAIInputComponent, \
+    EnemyAdvancedAIInputComponent, EnemyPhysicsComponent
 from modules.textureset import TextureSet
+from modules.scheduler import SimulationScheduler
+from modules.collision import CollisionGrid
+from modules.navigation import NavigationGraph
+from modules.tilelayer import TileLayer
+from modules.spatialindex import XIndex
+from modules.objectpool import object_pools
+from modules.background import DEFAULT_BACKGROUNDS
+from modules.lighting import LightMap, WINDOW_LIGHTS, PLAYER_LIGHT, COIN_LIGHT
+from modules.checkpoint import Checkpoint
+
+try:
+    from modules.flowfield import FlowField
+except ImportError:
+    # The flow field needs NumPy, which the game does not require. Without it, chasing enemies find their way
+    # with the navigation graph instead, which does not notice blocks being moved.
+    FlowField = None
 
 """
 * =============================================================== *
@@ -20,10 +38,34 @@ HOW TO MAKE A NEW LEVEL
         map                 ->          JSON object (python dict) containing 3 map layers, each represented by  
                                         a 2-dimensional array
         starting_position   ->          JSON array containing the starting position of the player
+    and can contain the following fields:
+        backgrounds         ->          JSON array containing one dict for each background layer, from back to
+                                        front (see modules/background.py). The default backgrounds are used if
+                                        it is left out.
+        visibility          ->          JSON object for dark levels, in which the player can only see a circle
+                                        around themselves. Contains the radius of the circle in pixels, and
+                                        optionally a falloff in pixels over which the edge of the circle fades
+                                        out, e.g. {"radius": 100, "falloff": 30}.
+        lighting            ->          JSON object for levels which are lit by their light sources (see
+                                        modules/lighting.py). Windows always let light in, and the object
+                                        can contain the following fields:
+                                            ambient     ->  JSON array of the colour of the light everywhere
+                                            lights      ->  JSON array containing one dict for each light, with
+                                                            its position (centre in pixels), radius and colour,
+                                                            e.g. {"position": [300, 200], "radius": 60,
+                                                                  "colour": [200, 150, 100]}
         
     Refer to the following link for the conversion tables between JSON and Python objects:
             https://docs.python.org/3/library/json.html#py-to-json-table
             
+    Each enemy dict contains the following fields:
+        type                ->          Name of the type of enemy, e.g. "Pink Guy"
+        coordinates         ->          JSON array containing the starting position of the enemy
+        ai (optional)       ->          "chase" for an enemy which chases the player around the map, using the
+                                        flow field of the level (see modules/flowfield.py), or the navigation
+                                        graph if NumPy is not installed (see modules/navigation.py). Enemies
+                                        patrol back and forth by default.
+
     Important note: the minimum size of the map must be 400 x 300, or 16 by 12 array entries.
     
 2.  Update the number_of_levels attribute in LevelManager to reflect the current amount of levels in the game.
@@ -57,17 +99,22 @@ class LevelManager:
             )
             return
 
+        # The objects of the last level are reused by the next one
+        self.level.release()
         self.level = Level("assets/levels/level" + str(self.current_level) + ".json")
         player.rect.x = self.level.starting_position[0]
         player.rect.y = self.level.starting_position[1]
+        player.save_previous_position()
         camera.snap_to_target(player)
         camera.update_boundaries(self.level.map.rect)
 
     def load_level(self, level_num: int, player, camera):
         self.current_level = level_num
+        self.level.release()
         self.level = Level("assets/levels/level" + str(level_num) + ".json")
         player.rect.x = self.level.starting_position[0]
         player.rect.y = self.level.starting_position[1]
+        player.save_previous_position()
         camera.snap_to_target(player)
         camera.update_boundaries(self.level.map.rect)
 
@@ -83,16 +130,60 @@ class Level:
 
         self.enemies = EnemyManager(data["enemies"])
         self.map = Map(data["map"])
+        self.map.backgrounds = data.get("backgrounds", DEFAULT_BACKGROUNDS)
+        self.map.visibility = data.get("visibility")
+        if "lighting" in data:
+            self.map.light_map = LightMap.from_level(data["lighting"], self.map.rect, self.map.windows)
         self.starting_position = data["starting_position"]
 
-    def update(self, delta_time, player):
+        # Only levels with chasing enemies need a flow field, or a navigation graph which is cached in the cache
+        # directory of the user
+        if self.enemies.has_chasing_enemies:
+            if FlowField is not None:
+                moving_blocks = [sprite for sprite in self.map.interactive_objects_group
+                                 if isinstance(sprite, (FallingBlock, PushableBlock))]
+                self.map.flow_field = FlowField(data["map"]["terrain"], moving_blocks)
+            else:
+                cache_filepath = NavigationGraph.get_cache_filepath(filepath)
+                self.map.navigation_graph = NavigationGraph.load_or_build(cache_filepath, data["map"]["terrain"])
+
+    def release(self) -> None:
+        """Releases the blocks and enemies of the level into the object pools, after which the level must not be
+        used again"""
+        self.map.release()
+        self.enemies.release()
+
+    def capture_checkpoint(self, player, camera) -> Checkpoint:
+        """Returns a Checkpoint of the current state of the level, the player and the camera"""
+        return Checkpoint(self,
+                          player.simulation_time,
+                          Checkpoint.capture_player(player),
+                          camera.rect.topleft,
+                          self.enemies.capture_state(),
+                          self.map.capture_state())
+
+    def restore_checkpoint(self, checkpoint: Checkpoint, player, camera) -> None:
+        """Puts the level, the player and the camera back into the state they were in when the checkpoint was
+        taken"""
+        Checkpoint.restore_player(player, checkpoint.player_state)
+        camera.rect.topleft = checkpoint.camera_position
+        camera.save_previous_position()
+        camera.interpolate(1)
+        self.enemies.restore_state(checkpoint.enemy_state)
+        self.map.restore_state(checkpoint.map_state)
+
+    def update(self, delta_time, player, camera, input_state):
+        # The flow field is shared by every chasing enemy, so it is brought up to date before they move
+        if self.map.flow_field is not None:
+            self.map.flow_field.update(player)
+
         # TODO: rework update for map to send events instead
-        self.enemies.update(delta_time, self.map, player)
-        self.map.update(player)
+        self.enemies.update(delta_time, self.map, player, camera)
+        self.map.update(player, input_state)
 
-    def render(self, camera, surface):
-        self.map.render(camera, surface)
-        self.enemies.render(camera, surface)
+    def render(self, camera, render_queue):
+        self.map.render(camera, render_queue)
+        self.enemies.render(camera, render_queue)
 
 
 class Map:
@@ -103,7 +194,23 @@ class Map:
         self.collideable_terrain_group = pg.sprite.Group()      # front layer
         self.interactive_objects_group = pg.sprite.Group()      # front layer
 
-        texture_set = TextureSet()
+        texture_set = TextureSet.get_shared()
+
+        # Static tiles are also kept in a grid for each layer, so that only the tiles in view are looked at when
+        # rendering. Falling and pushable blocks move, so they are rendered separately.
+        rows = len(map_dict["terrain"])
+        columns = len(map_dict["terrain"][0])
+        self.background_tiles = TileLayer(rows, columns)
+        self.middle_ground_tiles = TileLayer(rows, columns)
+        self.terrain_tiles = TileLayer(rows, columns)
+        self.object_tiles = TileLayer(rows, columns)
+        self.moving_blocks = []
+
+        # Every block is taken from the object pools, and released back into them by release()
+        self.pooled_objects = []
+
+        # Windows let light into levels with lighting, and are kept as (code, rect)
+        self.windows = []
 
         background_layer = map_dict["background"]
         for y in range(len(background_layer)):
@@ -111,9 +218,14 @@ class Map:
                 code = background_layer[y][x]
 
                 if code != "  ":
-                    self.background_terrain_group.add(Block(texture_set.get_texture_from_code(code),
-                                                            x * Block.BLOCK_SIZE,
-                                                            y * Block.BLOCK_SIZE))
+                    new_block = object_pools.acquire(Block, texture_set.get_texture_from_code(code),
+                                                     x * Block.BLOCK_SIZE,
+                                                     y * Block.BLOCK_SIZE)
+                    self.pooled_objects.append(new_block)
+                    self.background_terrain_group.add(new_block)
+                    self.background_tiles.set(y, x, new_block)
+                    if code in WINDOW_LIGHTS:
+                        self.windows.append((code, new_block.rect))
 
         decorations_layer = map_dict["decorations"]
         for y in range(len(decorations_layer)):
@@ -121,11 +233,22 @@ class Map:
                 code = decorations_layer[y][x]
 
                 if code != "  ":
-                    self.middle_ground_terrain_group.add(Block(texture_set.get_texture_from_code(code),
-                                                               x * Block.BLOCK_SIZE,
-                                                               y * Block.BLOCK_SIZE))
+                    new_block = object_pools.acquire(Block, texture_set.get_texture_from_code(code),
+                                                     x * Block.BLOCK_SIZE,
+                                                     y * Block.BLOCK_SIZE)
+                    self.pooled_objects.append(new_block)
+                    self.middle_ground_terrain_group.add(new_block)
+                    self.middle_ground_tiles.set(y, x, new_block)
+                    if code in WINDOW_LIGHTS:
+                        self.windows.append((code, new_block.rect))
 
         terrain_layer = map_dict["terrain"]
+
+        # Plain, full-sized tiles are merged into larger colliders, while every other collider is kept as is
+        solid_tiles = [[False] * len(terrain_layer[0]) for row in terrain_layer]
+        static_colliders = []
+        dynamic_colliders = []
+
         for y in range(len(terrain_layer)):
             for x in range(len(terrain_layer[0])):
                 code = terrain_layer[y][x]
@@ -133,68 +256,198 @@ class Map:
                 # I'm leaving out cloudy boi as it really does not fit the game
                 if code != "  ":
                     if code == "FB":
-                        new_block = FallingBlock(texture_set.get_texture_from_code(code),
-                                                  x * Block.BLOCK_SIZE,
-                                                  y * Block.BLOCK_SIZE)
+                        new_block = object_pools.acquire(FallingBlock, texture_set.get_texture_from_code(code),
+                                                         x * Block.BLOCK_SIZE,
+                                                         y * Block.BLOCK_SIZE)
+                        self.pooled_objects.append(new_block)
                         self.interactive_objects_group.add(new_block)
                         self.collideable_terrain_group.add(new_block)
+                        dynamic_colliders.append(new_block)
+                        self.moving_blocks.append(new_block)
                     elif code == "LB":
-                        new_block = LadderBlock(texture_set.get_texture_from_code(code),
-                                                                       x * Block.BLOCK_SIZE,
-                                                                       y * Block.BLOCK_SIZE)
+                        new_block = object_pools.acquire(LadderBlock, texture_set.get_texture_from_code(code),
+                                                         x * Block.BLOCK_SIZE,
+                                                         y * Block.BLOCK_SIZE)
+                        self.pooled_objects.append(new_block)
                         self.interactive_objects_group.add(new_block)
+                        self.object_tiles.set(y, x, new_block)
                     elif code == "PB":
-                        new_block = PushableBlock(texture_set.get_texture_from_code(code),
-                                                  x * Block.BLOCK_SIZE,
-                                                  y * Block.BLOCK_SIZE)
+                        new_block = object_pools.acquire(PushableBlock, texture_set.get_texture_from_code(code),
+                                                         x * Block.BLOCK_SIZE,
+                                                         y * Block.BLOCK_SIZE)
+                        self.pooled_objects.append(new_block)
                         self.interactive_objects_group.add(new_block)
                         self.collideable_terrain_group.add(new_block)
+                        dynamic_colliders.append(new_block)
+                        self.moving_blocks.append(new_block)
                     elif code == "SP":
-                        new_block = SpikeBlock(texture_set.get_texture_from_code(code),
-                                                                      x * Block.BLOCK_SIZE,
-                                                                      y * Block.BLOCK_SIZE)
+                        new_block = object_pools.acquire(SpikeBlock, texture_set.get_texture_from_code(code),
+                                                         x * Block.BLOCK_SIZE,
+                                                         y * Block.BLOCK_SIZE)
+                        self.pooled_objects.append(new_block)
                         self.interactive_objects_group.add(new_block)
                         self.collideable_terrain_group.add(new_block)
+                        static_colliders.append(new_block)
+                        self.terrain_tiles.set(y, x, new_block)
                     elif code == "GW":
-                        self.interactive_objects_group.add(GatewayBlock(texture_set.get_texture_from_code(code),
-                                                                        x * Block.BLOCK_SIZE,
-                                                                        y * Block.BLOCK_SIZE)
-                                                           )
+                        new_block = object_pools.acquire(GatewayBlock, texture_set.get_texture_from_code(code),
+                                                         x * Block.BLOCK_SIZE,
+                                                         y * Block.BLOCK_SIZE)
+                        self.pooled_objects.append(new_block)
+                        self.interactive_objects_group.add(new_block)
+                        self.object_tiles.set(y, x, new_block)
                     elif code == "CN":
-                        new_block = Coin(texture_set.get_texture_from_code(code),
-                                                                x * Block.BLOCK_SIZE,
-                                                                y * Block.BLOCK_SIZE)
+                        new_block = object_pools.acquire(Coin, texture_set.get_texture_from_code(code),
+                                                         x * Block.BLOCK_SIZE,
+                                                         y * Block.BLOCK_SIZE)
+                        self.pooled_objects.append(new_block)
                         self.interactive_objects_group.add(new_block)
+                        self.object_tiles.set(y, x, new_block)
                     else:
-                        new_block = Block(texture_set.get_texture_from_code(code),
-                                                                 x * Block.BLOCK_SIZE,
-                                                                 y * Block.BLOCK_SIZE)
+                        new_block = object_pools.acquire(Block, texture_set.get_texture_from_code(code),
+                                                         x * Block.BLOCK_SIZE,
+                                                         y * Block.BLOCK_SIZE)
+                        self.pooled_objects.append(new_block)
                         self.collideable_terrain_group.add(new_block)
+                        self.terrain_tiles.set(y, x, new_block)
+                        if new_block.rect == (x * Block.BLOCK_SIZE, y * Block.BLOCK_SIZE,
+                                              Block.BLOCK_SIZE, Block.BLOCK_SIZE):
+                            solid_tiles[y][x] = True
+                        else:
+                            static_colliders.append(new_block)
 
         self.rect = pg.Rect(0,
                             0,
                             len(terrain_layer[0]) * Block.BLOCK_SIZE,
                             len(terrain_layer) * Block.BLOCK_SIZE)
 
-    def update(self, player):
-        self.interactive_objects_group.update(player, self.collideable_terrain_group)
-
-    def render(self, camera, surface):
-        for sprite in self.background_terrain_group:
-            if camera.rect.colliderect(sprite.rect):
-                surface.blit(sprite.image, (sprite.rect.x - camera.rect.x, sprite.rect.y - camera.rect.y))
-
-        for sprite in self.middle_ground_terrain_group:
-            if camera.rect.colliderect(sprite.rect):
-                surface.blit(sprite.image, (sprite.rect.x - camera.rect.x, sprite.rect.y - camera.rect.y))
-
-        for sprite in self.collideable_terrain_group:
-            if camera.rect.colliderect(sprite.rect):
-                surface.blit(sprite.image, (sprite.rect.x - camera.rect.x, sprite.rect.y - camera.rect.y))
-
-        for sprite in self.interactive_objects_group:
-            if camera.rect.colliderect(sprite.rect):
-                surface.blit(sprite.image, (sprite.rect.x - camera.rect.x, sprite.rect.y - camera.rect.y))
+        # Collideable terrain is also stored by tile, so that hitboxes can be swept through it
+        self.collision_grid = CollisionGrid(Block.BLOCK_SIZE)
+        self.collision_grid.add_solid_tiles(solid_tiles)
+        for sprite in static_colliders:
+            self.collision_grid.add_static(sprite)
+        for sprite in dynamic_colliders:
+            self.collision_grid.add_dynamic(sprite)
+
+        # Set by the Level if any of its enemies chase the player
+        self.flow_field = None
+        self.navigation_graph = None
+
+        # Definitions of the background layers drawn behind the map, which can be set by the Level
+        self.backgrounds = DEFAULT_BACKGROUNDS
+
+        # Radius and falloff of the vision of the player in dark levels, which can be set by the Level
+        self.visibility = None
+
+        # Set by the Level if it is lit by its light sources
+        self.light_map = None
+
+        # Pushable blocks fall by themselves, so they are updated on every step. Every other interactive object
+        # only does something when the player touches it, and never moves sideways, so they are kept in an XIndex
+        # and only the ones next to the player are updated. Coins are animated by the shared animation clock
+        # (see modules/animation.py), so they do not need to be updated to animate.
+        self.update_order = {sprite: order for order, sprite in enumerate(self.interactive_objects_group)}
+        self.active_objects = [sprite for sprite in self.interactive_objects_group
+                               if isinstance(sprite, PushableBlock)]
+        self.object_index = XIndex(sprite for sprite in self.interactive_objects_group
+                                   if not isinstance(sprite, PushableBlock))
+
+        # Checkpoints only store the blocks which have moved from where they were placed, and the coins which have
+        # been collected
+        self.moving_block_origins = [tuple(sprite.rect) for sprite in self.moving_blocks]
+        self.coins = [sprite for sprite in self.interactive_objects_group if isinstance(sprite, Coin)]
+
+    def release(self) -> None:
+        """Releases every block of the map into the object pools"""
+        for sprite in self.pooled_objects:
+            sprite.kill()
+            object_pools.release(sprite)
+        self.pooled_objects = []
+
+    def capture_state(self) -> tuple:
+        """Returns the moving blocks which are not resting where they were placed as (index, rect, falling block
+        fallen or pushable block y velocity), and the indices of the coins which have been collected"""
+        moved_blocks = []
+        for index, sprite in enumerate(self.moving_blocks):
+            if isinstance(sprite, FallingBlock):
+                if sprite.fallen or sprite.rect != self.moving_block_origins[index]:
+                    moved_blocks.append((index, tuple(sprite.rect), sprite.fallen))
+            elif sprite.y_velocity != 0 or sprite.rect != self.moving_block_origins[index]:
+                moved_blocks.append((index, tuple(sprite.rect), sprite.y_velocity))
+
+        collected_coins = tuple(index for index, coin in enumerate(self.coins) if not coin.alive())
+        return tuple(moved_blocks), collected_coins
+
+    def restore_state(self, state: tuple) -> None:
+        """Puts the moving blocks and coins back into a state returned by capture_state()"""
+        moved_blocks, collected_coins = state
+
+        # Every block is put back to rest where it was placed first, and then the ones which had moved are moved
+        # again. Rects are changed in place, since the collision grid keeps references to them.
+        for index, sprite in enumerate(self.moving_blocks):
+            sprite.rect.update(self.moving_block_origins[index])
+            if isinstance(sprite, FallingBlock):
+                sprite.fallen = False
+            else:
+                sprite.y_velocity = 0
+        for index, rect, block_state in moved_blocks:
+            sprite = self.moving_blocks[index]
+            sprite.rect.update(rect)
+            if isinstance(sprite, FallingBlock):
+                sprite.fallen = block_state
+            else:
+                sprite.y_velocity = block_state
+
+        collected_coins = set(collected_coins)
+        for index, coin in enumerate(self.coins):
+            if index in collected_coins:
+                coin.kill()
+            elif not coin.alive():
+                self.interactive_objects_group.add(coin)
+
+    def update(self, player, input_state):
+        # Objects are still updated in the order that they were placed in, since some of them move the player
+        nearby_objects = self.object_index.query(player.rect.left - Block.BLOCK_SIZE,
+                                                 player.rect.right + Block.BLOCK_SIZE)
+        for sprite in sorted(nearby_objects + self.active_objects, key=self.update_order.__getitem__):
+            if sprite.alive():
+                sprite.update(player, self.collision_grid, input_state)
+
+    def render(self, camera, render_queue):
+        # Each layer is drawn with a single call, in order from the back to the front
+        for tile_layer in (self.background_tiles, self.middle_ground_tiles, self.terrain_tiles, self.object_tiles):
+            render_queue.extend(tile_layer.get_blits(camera.render_rect))
+            render_queue.flush()
+
+        self.render_moving_blocks(camera.render_rect, render_queue)
+        render_queue.flush()
+
+    def render_lighting(self, camera, surface, player):
+        """Darkens everything drawn so far according to the light map, with lights around the player and the
+        coins in view"""
+        view_rect = camera.render_rect
+        x, y = player.get_render_position(camera.alpha)
+        radius, colour = PLAYER_LIGHT
+        dynamic_lights = [((x + player.rect.width // 2 - view_rect.x, y + player.rect.height // 2 - view_rect.y),
+                           radius, colour)]
+
+        radius, colour = COIN_LIGHT
+        lit_rect = view_rect.inflate(radius * 2, radius * 2)
+        for sprite in self.object_index.query(lit_rect.left, lit_rect.right):
+            if isinstance(sprite, Coin) and sprite.alive() and lit_rect.colliderect(sprite.rect):
+                dynamic_lights.append(((sprite.rect.centerx - view_rect.x, sprite.rect.centery - view_rect.y),
+                                       radius, colour))
+
+        self.light_map.render(view_rect, surface, dynamic_lights)
+
+    def render_moving_blocks(self, view_rect, surface):
+        for sprite in self.moving_blocks:
+            if sprite.alive() and view_rect.colliderect(sprite.rect):
+                surface.blit(sprite.image, (sprite.rect.x - view_rect.x, sprite.rect.y - view_rect.y))
+
+
+def get_schedule_slot(enemy) -> int:
+    return enemy.schedule_slot
 
 
 class EnemyManager:
@@ -203,32 +456,127 @@ class EnemyManager:
         self.enemies_list = self.enemies.sprites()
 
         # takes in a list of dictionaries representing enemies
-        self.enemy_type = {"Pink Guy": PinkGuy(),
-                            "Trash Monster": TrashMonster(),
-                            "Tooth Walker": ToothWalker()
-                           }
+        self.enemy_type = EnemyManager.get_enemy_types()
         self.ai = EnemyAIInputComponent()
+        self.chase_ai = EnemyAdvancedAIInputComponent()
+        self.has_chasing_enemies = False
         self.physics = EnemyPhysicsComponent()
         self.renderer = RenderComponent()
 
-        for enemy_dict in enemies_list:
-            self.enemies.add(Enemy(self.enemy_type[enemy_dict["type"]],
-                                   self.ai,
-                                   self.physics,
-                                   self.renderer,
-                                   enemy_dict["coordinates"],
-                                   50)
-                             )
-
-    def update(self, delta_time, map, player):
+        # Decides how often each enemy is simulated, based on its distance from the camera
+        self.scheduler = SimulationScheduler()
+
+        # Every enemy is taken from the object pools, including the ones which are killed, and released back
+        # into them by release()
+        self.pooled_objects = []
+
+        for slot, enemy_dict in enumerate(enemies_list):
+            ai = self.ai
+            if enemy_dict.get("ai") == "chase":
+                ai = self.chase_ai
+                self.has_chasing_enemies = True
+
+            enemy = object_pools.acquire(Enemy,
+                                         self.enemy_type[enemy_dict["type"]],
+                                         ai,
+                                         self.physics,
+                                         self.renderer,
+                                         enemy_dict["coordinates"],
+                                         50)
+            enemy.schedule_slot = slot
+            self.enemies.add(enemy)
+            self.pooled_objects.append(enemy)
+
+        # Enemies sorted by x, so that only the ones in view of the camera are looked at when rendering
+        self.enemy_index = XIndex(self.enemies)
+
+    # Type objects only hold the images and sounds of each type of enemy, so they are loaded once and shared
+    enemy_types = None
+
+    @staticmethod
+    def get_enemy_types() -> dict:
+        if EnemyManager.enemy_types is None:
+            EnemyManager.enemy_types = {"Pink Guy": PinkGuy(),
+                                        "Trash Monster": TrashMonster(),
+                                        "Tooth Walker": ToothWalker()
+                                        }
+        return EnemyManager.enemy_types
+
+    def release(self) -> None:
+        """Releases every enemy into the object pools"""
+        for enemy in self.pooled_objects:
+            enemy.kill()
+            object_pools.release(enemy)
+        self.pooled_objects = []
+
+    def capture_state(self) -> tuple:
+        """Returns the step of the scheduler, and the state of every enemy in the order that they were placed in"""
+        return self.scheduler.step_counter, tuple((enemy.alive(),
+                                                   enemy.rect.x,
+                                                   enemy.rect.y,
+                                                   enemy.x_velocity,
+                                                   enemy.y_velocity,
+                                                   enemy.state,
+                                                   enemy.direction,
+                                                   enemy.health,
+                                                   enemy.pending_time)
+                                                  for enemy in self.pooled_objects)
+
+    def restore_state(self, state: tuple) -> None:
+        """Puts every enemy back into a state returned by capture_state(), bringing back enemies which have been
+        killed since"""
+        self.scheduler.step_counter, enemy_states = state
+        alive_enemies = []
+        for enemy, enemy_state in zip(self.pooled_objects, enemy_states):
+            alive, x, y, enemy.x_velocity, enemy.y_velocity, enemy.state, enemy.direction, enemy.health, \
+                enemy.pending_time = enemy_state
+            enemy.rect.topleft = (x, y)
+            enemy.save_previous_position()
+            if alive:
+                alive_enemies.append(enemy)
+
+        # Enemies are updated in the order that they are in the group, so the group is filled again in the order
+        # that they were placed in
+        self.enemies.empty()
+        self.enemies.add(*alive_enemies)
+        self.enemy_index = XIndex(self.enemies)
+
+    def update(self, delta_time, map, player, camera):
+        self.scheduler.begin_step(camera)
         for entity in self.enemies:
             if entity.state == EntityState.DEAD:
                 entity.kill()
+                self.enemy_index.remove(entity)
+                continue
+
+            # Time keeps accumulating until the enemy is due for its next update
+            entity.pending_time += delta_time
+            tier = self.scheduler.get_tier(entity)
+            if not self.scheduler.is_due(tier, entity.schedule_slot):
+                continue
+
+            self.scheduler.record(tier)
+            entity.save_previous_position()
+            if tier == SimulationTier.FULL:
+                entity.update(entity.pending_time, map, player)
             else:
-                entity.update(delta_time, map, player)
-
-    def render(self, camera, surface):
-        for entity in self.enemies:
-            entity.render(camera, surface)
+                entity.update_reduced(entity.pending_time, map, player)
+            entity.pending_time = 0
+
+        self.enemy_index.sort()
+
+    def get_tier_counts(self):
+        """Returns the number of enemies that were updated in each simulation tier on the last step"""
+        return dict(self.scheduler.tier_counts)
+
+    def render(self, camera, render_queue):
+        # Enemies are drawn between their last two positions, so a margin is left for the distance moved.
+        # They are drawn in the order that they were placed in, so that overlapping enemies are always drawn the
+        # same way around.
+        visible_enemies = self.enemy_index.query(camera.render_rect.left - Block.BLOCK_SIZE,
+                                                 camera.render_rect.right + Block.BLOCK_SIZE)
+        for entity in sorted(visible_enemies, key=get_schedule_slot):
+            entity.render(camera, render_queue)
+        render_queue.flush()
 
 
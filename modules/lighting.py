@@ -0,0 +1,134 @@
+import pygame as pg
+from .background import image_cache
+from .gradient import draw_radial_gradient
+
+"""
+* =============================================================== *
+* This module contains the LightMap, which darkens a level and    *
+* lights it up around its light sources, without doing any work   *
+* per pixel in Python.                                            *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+Every light is drawn as a light sprite: a circle on a black surface, which is brightest in its colour at the
+centre and fades to black at its radius. The light sprites are drawn once for every radius and colour, and kept
+in the shared image cache (see modules/background.py).
+
+Static lights never move, so they are baked into the light map when the level is loaded. The map is split into
+square chunks, and every chunk that a static light reaches is filled with the ambient light of the level, with
+the light sprites added onto it. Chunks which no static light reaches are not stored at all, since they only
+contain the ambient light.
+
+Every frame, the light buffer (a surface the size of the screen) is filled with the ambient light, the chunks in
+view are copied onto it, and the dynamic lights (e.g. the player and coins) are added onto it. The buffer is then
+multiplied onto the screen with a single blit, so that every pixel of the screen is darkened by the amount of
+light falling on it. The chunks and dynamic lights are each drawn with a single call to Surface.blits().
+
+STATIC LIGHTS
+-------------------------
+Windows in the background and decorations layers of the map let light in, and every type of window is given a
+light in WINDOW_LIGHTS. Levels can also place lights themselves (see "lighting" in modules/leveljson.py).
+"""
+
+# Size of the chunks of the light map, in pixels
+CHUNK_SIZE = 200
+
+# Ambient light of levels which do not set their own
+DEFAULT_AMBIENT_COLOUR = (50, 50, 70)
+
+# Light let in by each type of window, as (radius, colour)
+WINDOW_LIGHTS = {
+    "2w": (110, (120, 130, 160)),
+    "1w": (70, (120, 130, 160)),
+    "bw": (45, (100, 110, 140)),
+}
+
+# Dynamic lights, as (radius, colour)
+PLAYER_LIGHT = (80, (170, 150, 120))
+COIN_LIGHT = (25, (150, 40, 60))
+
+
+class LightMap:
+    """The static lights of a level baked into chunks, which dynamic lights are added to every frame"""
+    def __init__(self, map_rect, ambient_colour=DEFAULT_AMBIENT_COLOUR, static_lights=()):
+        self.map_rect = map_rect
+        self.ambient_colour = tuple(ambient_colour)
+        self.static_lights = list(static_lights)
+        self.chunks = {}
+        self.buffer = None
+
+        for centre, radius, colour in self.static_lights:
+            self.bake_light(centre, radius, colour)
+
+    @staticmethod
+    def get_sprite(radius: int, colour) -> pg.Surface:
+        """Returns the light sprite with the given radius and colour, drawing it if it is not in the cache"""
+        return image_cache.get_or_build(("light", radius, tuple(colour)), lambda: LightMap.draw_sprite(radius, colour))
+
+    @staticmethod
+    def draw_sprite(radius: int, colour) -> pg.Surface:
+        """Draws a circle which fades from the colour at its centre to black at its edge"""
+        sprite = pg.Surface((radius * 2, radius * 2))
+        sprite.fill((0, 0, 0))
+        draw_radial_gradient(sprite, (radius, radius), radius, 0,
+                             lambda fraction: (int(colour[0] * (1 - fraction)),
+                                               int(colour[1] * (1 - fraction)),
+                                               int(colour[2] * (1 - fraction))))
+        return sprite.convert()
+
+    def get_chunk(self, chunk_x: int, chunk_y: int) -> pg.Surface:
+        """Returns the chunk at the given position, filled with the ambient light if it has not been made yet"""
+        chunk = self.chunks.get((chunk_x, chunk_y))
+        if chunk is None:
+            chunk = self.chunks[(chunk_x, chunk_y)] = pg.Surface((CHUNK_SIZE, CHUNK_SIZE)).convert()
+            chunk.fill(self.ambient_colour)
+        return chunk
+
+    def bake_light(self, centre, radius: int, colour) -> None:
+        """Adds a static light onto every chunk that it reaches"""
+        sprite = LightMap.get_sprite(radius, colour)
+        left = centre[0] - radius
+        top = centre[1] - radius
+        for chunk_y in range(max(top, 0) // CHUNK_SIZE, max(top + radius * 2 - 1, 0) // CHUNK_SIZE + 1):
+            for chunk_x in range(max(left, 0) // CHUNK_SIZE, max(left + radius * 2 - 1, 0) // CHUNK_SIZE + 1):
+                self.get_chunk(chunk_x, chunk_y).blit(sprite,
+                                                      (left - chunk_x * CHUNK_SIZE, top - chunk_y * CHUNK_SIZE),
+                                                      special_flags=pg.BLEND_RGB_ADD)
+
+    def get_chunk_blits(self, view_rect) -> list:
+        """Returns the (chunk, position) of every baked chunk which can be seen through the view rect"""
+        first_x = max(view_rect.left, 0) // CHUNK_SIZE
+        last_x = max(view_rect.right - 1, 0) // CHUNK_SIZE
+        first_y = max(view_rect.top, 0) // CHUNK_SIZE
+        last_y = max(view_rect.bottom - 1, 0) // CHUNK_SIZE
+        return [(self.chunks[(chunk_x, chunk_y)],
+                 (chunk_x * CHUNK_SIZE - view_rect.x, chunk_y * CHUNK_SIZE - view_rect.y))
+                for chunk_y in range(first_y, last_y + 1)
+                for chunk_x in range(first_x, last_x + 1)
+                if (chunk_x, chunk_y) in self.chunks]
+
+    def render(self, view_rect, surface: pg.Surface, dynamic_lights=()) -> None:
+        """Darkens the surface according to the light falling on it, as seen through the view rect. Each dynamic
+        light is given as (centre, radius, colour), with its centre relative to the view rect."""
+        if self.buffer is None or self.buffer.get_size() != surface.get_size():
+            self.buffer = pg.Surface(surface.get_size()).convert()
+
+        self.buffer.fill(self.ambient_colour)
+        self.buffer.blits(self.get_chunk_blits(view_rect), doreturn=False)
+        self.buffer.blits([(LightMap.get_sprite(radius, colour), (centre[0] - radius, centre[1] - radius),
+                            None, pg.BLEND_RGB_ADD)
+                           for centre, radius, colour in dynamic_lights], doreturn=False)
+        surface.blit(self.buffer, (0, 0), special_flags=pg.BLEND_RGB_MULT)
+
+    @staticmethod
+    def from_level(lighting_dict: dict, map_rect, window_codes: list):
+        """Builds the light map of a level from its lighting dict (see "lighting" in modules/leveljson.py), with
+        the windows of the map given as (code, rect)"""
+        static_lights = []
+        for code, rect in window_codes:
+            radius, colour = WINDOW_LIGHTS[code]
+            static_lights.append((rect.center, radius, colour))
+        for light in lighting_dict.get("lights", []):
+            static_lights.append((tuple(light["position"]), light["radius"], tuple(light["colour"])))
+        return LightMap(map_rect, lighting_dict.get("ambient", DEFAULT_AMBIENT_COLOUR), static_lights)
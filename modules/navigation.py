@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+from .block import Block
+from .entitystate import Direction
+
+"""
+* =============================================================== *
+* This module contains the NavigationGraph, which lets enemies    *
+* find their way around a level without searching the map while   *
+* the game is running.                                            *
+* =============================================================== *
+
+ISLANDS
+-------------------------
+A tile can be stood on if it is empty and the tile below it is part of the collideable terrain. Every row of
+standable tiles next to each other forms an island, which an enemy can walk along freely. Enemies cannot jump,
+so the only ways to leave an island are to walk off its left or right end and fall onto the island below,
+through a gap at least ENEMY_WIDTH tiles wide.
+
+Every tile in the map also records the island that an enemy would land on by falling from it (island_below),
+so finding the island that an entity is on, or is falling towards, takes a single lookup. A solid tile records
+the island on top of it instead, which is the island of any entity standing on that tile.
+
+NEXT HOPS
+-------------------------
+The islands are the nodes of the navigation graph, and walking off either end of an island is an edge. When
+the graph is built, the shortest path (in number of islands) between every pair of islands is found with the
+Floyd-Warshall algorithm, and only the first step of each path is kept: next_hop[a][b] is the direction to
+walk in to get from island a towards island b, or None if b cannot be reached from a. An enemy chasing a
+target therefore makes its decision in constant time on every step.
+
+CACHING
+-------------------------
+Building the graph takes time proportional to the cube of the number of islands, so the graph is saved in
+CACHE_DIRECTORY, together with a hash of the terrain layer. The cached graph is used for as long as the terrain
+of the level has not changed. The cache is kept in the cache directory of the user rather than next to the level
+files, since the game may be installed somewhere it cannot write to. If the graph cannot be saved, it is simply
+built again the next time.
+"""
+
+# Terrain codes which do not block movement, and therefore cannot be stood on
+NON_COLLIDEABLE_CODES = ("  ", "LB", "GW", "CN")
+
+# Every enemy is wider than one tile, but no wider than two, so gaps have to be two tiles wide to fall through
+ENEMY_WIDTH = 2
+
+# Where navigation graphs are cached, in the cache directory of the user
+CACHE_DIRECTORY = os.path.join(os.environ.get("LOCALAPPDATA")
+                               or os.environ.get("XDG_CACHE_HOME")
+                               or os.path.join(os.path.expanduser("~"), ".cache"),
+                               "The Tower",
+                               "navigation")
+
+
+class Island:
+    """A row of standable tiles"""
+    def __init__(self, row: int, left: int, right: int):
+        self.row = row
+        self.left = left            # Column of the leftmost tile
+        self.right = right          # Column of the rightmost tile
+
+        # Islands landed on by walking off the left and right ends, or None if the enemy would fall out of the map
+        self.left_exit = None
+        self.right_exit = None
+
+
+class NavigationGraph:
+    """Islands of a map and the direction to walk in to get from any island to any other island"""
+    VERSION = 1
+
+    def __init__(self, islands: list, is_solid: list, island_below: list, next_hop: list):
+        self.islands = islands
+        self.is_solid = is_solid
+        self.island_below = island_below
+        self.next_hop = next_hop
+
+        self.rows = len(island_below)
+        self.columns = len(island_below[0]) if self.rows > 0 else 0
+
+    @staticmethod
+    def build(terrain_layer: list):
+        """Builds the navigation graph of a terrain layer"""
+        rows = len(terrain_layer)
+        columns = len(terrain_layer[0]) if rows > 0 else 0
+        is_solid = [[code not in NON_COLLIDEABLE_CODES for code in row] for row in terrain_layer]
+
+        # Find the islands, row by row
+        islands = []
+        island_at = [[None] * columns for row in range(rows)]
+        for row in range(rows - 1):
+            column = 0
+            while column < columns:
+                if is_solid[row][column] or not is_solid[row + 1][column]:
+                    column += 1
+                    continue
+
+                left = column
+                while column + 1 < columns and not is_solid[row][column + 1] and is_solid[row + 1][column + 1]:
+                    column += 1
+                for x in range(left, column + 1):
+                    island_at[row][x] = len(islands)
+                islands.append(Island(row, left, column))
+                column += 1
+
+        # Work out where an enemy lands when falling from each tile, from the bottom of each column upwards
+        island_below = [[None] * columns for row in range(rows)]
+        for column in range(columns):
+            landing_island = None
+            for row in range(rows - 1, -1, -1):
+                if is_solid[row][column]:
+                    landing_island = None
+                    if row > 0:
+                        island_below[row][column] = island_at[row - 1][column]
+                    continue
+                if island_at[row][column] is not None:
+                    landing_island = island_at[row][column]
+                island_below[row][column] = landing_island
+
+        # Walking off either end of an island drops the enemy through the next ENEMY_WIDTH columns, if they are
+        # all clear, onto the highest island below them
+        for island in islands:
+            island.left_exit = NavigationGraph.find_landing_island(
+                is_solid, island_below, island.row, range(island.left - ENEMY_WIDTH, island.left))
+            island.right_exit = NavigationGraph.find_landing_island(
+                is_solid, island_below, island.row, range(island.right + 1, island.right + 1 + ENEMY_WIDTH))
+
+        return NavigationGraph(islands, is_solid, island_below, NavigationGraph.find_next_hops(islands))
+
+    @staticmethod
+    def find_landing_island(is_solid: list, island_below: list, row: int, columns: range):
+        """Returns the island that an enemy lands on when falling from the row through the columns, or None if
+        the enemy does not fit or would fall out of the map"""
+        landing_island = None
+        for column in columns:
+            if not 0 <= column < len(is_solid[row]) or is_solid[row][column]:
+                return None
+            # Islands are numbered from the top of the map downwards, so the highest island has the lowest index
+            island = island_below[row][column]
+            if island is not None and (landing_island is None or island < landing_island):
+                landing_island = island
+        return landing_island
+
+    @staticmethod
+    def find_next_hops(islands: list) -> list:
+        """Finds the first step of the shortest path between every pair of islands, using Floyd-Warshall"""
+        count = len(islands)
+        infinity = count + 1
+        distance = [[infinity] * count for island in islands]
+        next_hop = [[None] * count for island in islands]
+
+        for index, island in enumerate(islands):
+            distance[index][index] = 0
+            for direction, exit_island in ((Direction.LEFT, island.left_exit), (Direction.RIGHT, island.right_exit)):
+                if exit_island is not None and exit_island != index and distance[index][exit_island] > 1:
+                    distance[index][exit_island] = 1
+                    next_hop[index][exit_island] = direction
+
+        for k in range(count):
+            distance_from_k = distance[k]
+            for i in range(count):
+                distance_to_k = distance[i][k]
+                if distance_to_k == infinity:
+                    continue
+                distance_from_i = distance[i]
+                next_hop_from_i = next_hop[i]
+                for j in range(count):
+                    if distance_to_k + distance_from_k[j] < distance_from_i[j]:
+                        distance_from_i[j] = distance_to_k + distance_from_k[j]
+                        next_hop_from_i[j] = next_hop_from_i[k]
+
+        return next_hop
+
+    @staticmethod
+    def get_cache_filepath(level_filepath: str) -> str:
+        """Returns the file that the navigation graph of the level file is cached in"""
+        return os.path.join(CACHE_DIRECTORY, os.path.splitext(os.path.basename(level_filepath))[0] + ".nav")
+
+    @staticmethod
+    def load_or_build(cache_filepath: str, terrain_layer: list):
+        """Loads the cached navigation graph of the terrain layer if it is up to date, and otherwise builds
+        the graph and saves it to the cache"""
+        terrain_hash = hashlib.sha1(json.dumps(terrain_layer).encode()).hexdigest()
+
+        try:
+            with open(cache_filepath) as f:
+                data = json.load(f)
+            if data["version"] == NavigationGraph.VERSION and data["hash"] == terrain_hash:
+                return NavigationGraph.from_dict(data)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        graph = NavigationGraph.build(terrain_layer)
+        data = graph.to_dict()
+        data["version"] = NavigationGraph.VERSION
+        data["hash"] = terrain_hash
+        try:
+            os.makedirs(os.path.dirname(cache_filepath), exist_ok=True)
+            with open(cache_filepath, "w") as f:
+                json.dump(data, f)
+        except OSError:
+            # The graph can always be built again, so it does not matter if it cannot be cached
+            pass
+        return graph
+
+    def to_dict(self) -> dict:
+        return {"islands": [[island.row, island.left, island.right, island.left_exit, island.right_exit]
+                            for island in self.islands],
+                "is_solid": self.is_solid,
+                "island_below": self.island_below,
+                "next_hop": [[None if direction is None else direction.value for direction in row]
+                             for row in self.next_hop]
+                }
+
+    @staticmethod
+    def from_dict(data: dict):
+        islands = []
+        for row, left, right, left_exit, right_exit in data["islands"]:
+            island = Island(row, left, right)
+            island.left_exit = left_exit
+            island.right_exit = right_exit
+            islands.append(island)
+
+        next_hop = [[None if value is None else Direction(value) for value in row] for row in data["next_hop"]]
+        return NavigationGraph(islands, data["is_solid"], data["island_below"], next_hop)
+
+    def get_island(self, rect):
+        """Returns the index of the island that the rect is standing on or falling towards, or None"""
+        # The tile just below the feet is solid if the entity is standing on something. This also works for
+        # blocks shorter than a tile, and for an entity at the end of an island with its centre over the edge.
+        row = rect.bottom // Block.BLOCK_SIZE
+        if not 0 <= row < self.rows:
+            return None
+        for x in (rect.centerx, rect.left, rect.right - 1):
+            column = x // Block.BLOCK_SIZE
+            if 0 <= column < self.columns and self.is_solid[row][column]:
+                return self.island_below[row][column]
+
+        column = rect.centerx // Block.BLOCK_SIZE
+        if 0 <= column < self.columns:
+            return self.island_below[row][column]
+        return None
+
+    def get_next_direction(self, start_island: int, goal_island: int):
+        """Returns the direction to walk in to get from one island towards another, or None if it is unreachable"""
+        return self.next_hop[start_island][goal_island]
@@ -0,0 +1,80 @@
+"""
+* =============================================================== *
+* This module contains the ObjectPools, which keep the objects of *
+* a level that is no longer needed, so that they can be reused by *
+* the next level instead of being made again.                     *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+There is an ObjectPool for every class of object which is pooled. Objects are made with acquire(), which takes
+the same arguments as the constructor of the class. If an object of the class has been released, it is taken
+out of the pool and reset() with those arguments, which puts it into the same state as a newly made object
+without loading anything again (e.g. the sound of a coin). Otherwise, a new object is made. When a level is
+replaced, every object that it made is released back into the pools.
+
+Every class which is pooled must have a reset() method taking the same arguments as its constructor. The
+constructor should load whatever can be shared between uses, and then call reset() for everything else.
+
+STATISTICS
+-------------------------
+Every pool counts how many objects were reused (hits) and how many had to be made (misses), which can be read
+with get_statistics().
+"""
+
+
+class ObjectPool:
+    """Released objects of one class, which are reset and reused instead of making new objects"""
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.free)
+
+    def acquire(self, *args):
+        """Returns a released object reset with the given arguments, or a new object if there are none"""
+        if self.free:
+            self.hits += 1
+            instance = self.free.pop()
+            instance.reset(*args)
+            return instance
+        self.misses += 1
+        return self.cls(*args)
+
+    def release(self, instance) -> None:
+        """Puts an object which is no longer used back into the pool"""
+        self.free.append(instance)
+
+
+class ObjectPools:
+    """An ObjectPool for every class of object which is pooled"""
+    def __init__(self):
+        self.pools = {}
+
+    def get_pool(self, cls) -> ObjectPool:
+        pool = self.pools.get(cls)
+        if pool is None:
+            pool = self.pools[cls] = ObjectPool(cls)
+        return pool
+
+    def acquire(self, cls, *args):
+        """Returns an object of the class, made or reset with the given arguments"""
+        return self.get_pool(cls).acquire(*args)
+
+    def release(self, instance) -> None:
+        self.get_pool(type(instance)).release(instance)
+
+    def clear(self) -> None:
+        """Drops every released object, and resets the statistics"""
+        self.pools.clear()
+
+    def get_statistics(self) -> dict:
+        """Returns (hits, misses, released objects waiting to be reused) for every class, by name"""
+        return {cls.__name__: (pool.hits, pool.misses, len(pool)) for cls, pool in self.pools.items()}
+
+
+# Shared by every level, so that the objects of one level are reused by the next
+object_pools = ObjectPools()
@@ -0,0 +1,146 @@
+import numpy as np
+import pygame as pg
+
+"""
+* =============================================================== *
+* This module contains the ParticleSystem, which simulates and    *
+* draws every particle of the visual effects in the game, e.g.    *
+* the dust kicked up by a jump.                                   *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+The particles are stored in NumPy arrays which are allocated once, with one entry for every particle that can
+be alive at the same time: their position, velocity, remaining lifetime and colour. Particles are never
+allocated or freed as objects. The indices of the entries which are not in use are kept on a free list, which
+is a stack stored in another array, so emitting particles takes entries off the top of the stack and particles
+which die are put back onto it. If the stack is empty, new particles are not emitted.
+
+Every step, every particle is moved at once with a few operations on the arrays, rather than with a loop in
+Python. Particles are drawn in the same way: every particle is a square of PARTICLE_SIZE pixels of a single
+colour, so they are written straight into the pixels of the surface (see pygame.surfarray.pixels2d()), with one
+write for each pixel of the square covering every visible particle at once. No Python object is made for a
+particle, and nothing is blitted.
+
+COST
+-------------------------
+With 3000 live particles in view, moving them takes well under a tenth of a millisecond, and drawing them about
+a third of a millisecond, within the budget of a millisecond per frame for the whole system (which is checked by
+tests/test_particles.py).
+
+EFFECTS
+-------------------------
+Particles are emitted in bursts by emit(), from a point and in a direction, with each particle given a random
+amount of spread. Particles are purely visual, so they have their own random number generator and never affect
+the simulation (see ParticleComponent in modules/components.py for the effects themselves).
+"""
+
+# Colours of particles, by name. Each particle stores the index of its colour.
+PALETTE = {
+    "DUST": (150, 140, 130),
+    "BLOOD": (180, 30, 40),
+    "RUBY": (230, 60, 90),
+    "SPARK": (255, 220, 150),
+}
+
+# Downwards acceleration of particles, in pixels per second per second
+GRAVITY = 300
+
+PARTICLE_SIZE = 2
+
+
+class ParticleSystem:
+    """Pool of particles stored in NumPy arrays, which are moved and drawn all at once"""
+    def __init__(self, capacity: int = 4096, seed: int = 0):
+        self.capacity = capacity
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.float32)
+        self.colour = np.zeros(capacity, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        # Stack of the indices of unused entries, of which the first free_count are on the stack
+        self.free_list = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = capacity
+
+        self.colour_indices = {name: index for index, name in enumerate(PALETTE)}
+        # The colours of PALETTE as pixel values of the surface last drawn onto, which depend on its format
+        self.pixel_colours = None
+        self.pixel_format = None
+
+        self.random = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return self.capacity - self.free_count
+
+    def clear(self) -> None:
+        """Kills every particle"""
+        self.alive[:] = False
+        self.free_list[:] = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = self.capacity
+
+    def emit(self, position, count: int, colour: str, velocity=(0, 0), spread: float = 50,
+             lifetime: float = 0.5) -> None:
+        """Emits a burst of particles from the position, moving at the velocity plus a random amount of up to
+        spread in each direction, and living for up to lifetime seconds"""
+        count = min(count, self.free_count)
+        if count <= 0:
+            return
+        indices = self.free_list[self.free_count - count:self.free_count]
+        self.free_count -= count
+
+        self.position[indices] = position
+        self.velocity[indices] = velocity
+        self.velocity[indices] += self.random.uniform(-spread, spread, (count, 2))
+        self.lifetime[indices] = self.random.uniform(lifetime / 2, lifetime, count)
+        self.colour[indices] = self.colour_indices[colour]
+        self.alive[indices] = True
+
+    def update(self, delta_time: float) -> None:
+        """Moves every particle, and puts the entries of the particles which have died back onto the free list"""
+        # Unused entries are moved too, since that is faster than picking out the particles which are alive, and
+        # every entry is set again when it is used
+        alive = self.alive
+        self.velocity[:, 1] += GRAVITY * delta_time
+        self.position += self.velocity * delta_time
+        self.lifetime -= delta_time
+
+        dead = np.flatnonzero(alive & (self.lifetime <= 0))
+        if len(dead):
+            alive[dead] = False
+            self.free_list[self.free_count:self.free_count + len(dead)] = dead
+            self.free_count += len(dead)
+
+    def get_pixel_colours(self, surface):
+        """Returns the colours of PALETTE as pixel values of the surface, in an array indexed by colour"""
+        pixel_format = (surface.get_bitsize(), surface.get_masks())
+        if pixel_format != self.pixel_format:
+            self.pixel_colours = np.array([surface.map_rgb(colour) for colour in PALETTE.values()], dtype=np.uint32)
+            self.pixel_format = pixel_format
+        return self.pixel_colours
+
+    def render(self, view_rect, surface) -> None:
+        """Draws every particle which can be seen through the view rect onto the surface"""
+        if self.free_count == self.capacity:
+            return
+        x = self.position[:, 0].astype(np.int32) - view_rect.x
+        y = self.position[:, 1].astype(np.int32) - view_rect.y
+        width, height = surface.get_size()
+        visible = np.flatnonzero(self.alive & (x > -PARTICLE_SIZE) & (x < width)
+                                 & (y > -PARTICLE_SIZE) & (y < height))
+        if not len(visible):
+            return
+        x = x[visible]
+        y = y[visible]
+        colours = self.get_pixel_colours(surface)[self.colour[visible]]
+
+        # Indexed by [x, y], and locks the surface until it is deleted
+        pixels = pg.surfarray.pixels2d(surface)
+        for offset_x in range(PARTICLE_SIZE):
+            for offset_y in range(PARTICLE_SIZE):
+                pixel_x = x + offset_x
+                pixel_y = y + offset_y
+                # Particles on the edge of the view are only partly drawn
+                inside = (pixel_x >= 0) & (pixel_x < width) & (pixel_y >= 0) & (pixel_y < height)
+                pixels[pixel_x[inside], pixel_y[inside]] = colours[inside]
+        del pixels
@@ -0,0 +1,62 @@
+"""
+* =============================================================== *
+* This module contains the RenderQueue, which collects everything *
+* drawn onto a surface and draws it in as few calls as possible.  *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+Calling Surface.blit() once for every sprite costs a Python function call (and the conversion of its arguments)
+each time. Surface.blits() draws a whole sequence of (image, position) or (image, position, area) tuples in a
+single call, so the RenderQueue collects the blits of one layer at a time, in the order that they are drawn, and
+submits them together when the layer is finished with flush().
+
+The RenderQueue has a blit() method which takes the same arguments as Surface.blit(), so anything which renders
+onto a surface can render onto a RenderQueue instead without being changed. Layers which already have a list of
+blits (e.g. the TileLayers of the map) add all of them at once with extend().
+
+DRAW CALLS
+-------------------------
+The number of blits and the number of calls made to draw them are counted for every frame. begin_frame() starts
+counting a new frame, and the counts of the last complete frame are kept in last_blit_count and
+last_draw_call_count.
+"""
+
+
+class RenderQueue:
+    """Collects the blits of a layer, and draws them onto the surface with a single call"""
+    def __init__(self, surface):
+        self.surface = surface
+        self.blit_sequence = []
+
+        self.blit_count = 0
+        self.draw_call_count = 0
+        self.last_blit_count = 0
+        self.last_draw_call_count = 0
+
+    def begin_frame(self) -> None:
+        """Starts counting the blits and draw calls of a new frame"""
+        self.last_blit_count = self.blit_count
+        self.last_draw_call_count = self.draw_call_count
+        self.blit_count = 0
+        self.draw_call_count = 0
+
+    def blit(self, image, position, area=None) -> None:
+        """Queues a single blit, taking the same arguments as Surface.blit()"""
+        if area is None:
+            self.blit_sequence.append((image, position))
+        else:
+            self.blit_sequence.append((image, position, area))
+
+    def extend(self, blit_sequence) -> None:
+        """Queues a sequence of (image, position) or (image, position, area) tuples"""
+        self.blit_sequence.extend(blit_sequence)
+
+    def flush(self) -> None:
+        """Draws everything queued so far onto the surface with a single call"""
+        if not self.blit_sequence:
+            return
+        self.surface.blits(self.blit_sequence, doreturn=False)
+        self.blit_count += len(self.blit_sequence)
+        self.draw_call_count += 1
+        self.blit_sequence.clear()
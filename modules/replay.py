@@ -0,0 +1,286 @@
+import pygame as pg
+import atexit
+import hashlib
+import os
+import random
+import struct
+import time
+from .entitystate import EntityState, Direction, GameEvent
+from .inputstate import InputState
+from .block import FallingBlock, PushableBlock, Coin
+from .gamescene import GameScene
+
+"""
+* =============================================================== *
+* This module contains the classes required to record a run of a  *
+* level and play it back exactly, without a window.               *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+Since the simulation is stepped with a fixed delta_time and only reads input through an InputState,
+storing the InputState and delta_time of every step is enough to reproduce a run of a level exactly.
+The ReplayRecorder is attached to the SceneManager, and GameScene hands it every step that it simulates.
+A new Replay is started whenever a new level is loaded, and saved when the next level is loaded or the
+game is closed. The ReplayRunner plays a Replay back through a fresh GameScene as fast as possible.
+
+FILE FORMAT
+-------------------------
+All values are little-endian.
+    Header
+        magic               4 bytes         b"TWRP"
+        version             uint8
+        level               uint16          Level number
+        seed                uint32          Seed of the random module at the start of the level
+        step count          uint32
+        health              int16           State of the player at the start of the level
+        x velocity          int32
+        y velocity          int32
+        state               uint8           Value of the EntityState of the player
+        direction           uint8           Value of the Direction of the player
+        immunity            float64         Seconds left before the player can take damage again
+        camera x            int32           Position of the camera at the start of the level, which depends
+        camera y            int32           on the boundaries of the previous level
+    One record for every simulation step
+        input               uint8           Bits of the InputState
+        delta time          float64         Stored at full precision, so that the physics is reproduced exactly
+
+STATE HASHES
+-------------------------
+Since a replay always reproduces the same run, the state of the simulation at any step can be compared
+against a previous version of the game to catch changes to gameplay. The state of the player, every enemy,
+every falling and pushable block and the coins remaining is hashed every few steps while a replay is played
+back, and the list of hashes (the trace) is compared against a golden trace recorded earlier.
+"""
+
+
+class Replay:
+    """A recorded run of a single level"""
+    MAGIC = b"TWRP"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBHIIhiiBBdii")
+    STEP = struct.Struct("<Bd")
+
+    def __init__(self, level: int, seed: int, start_state=None):
+        self.level = level
+        self.seed = seed
+
+        # (health, x velocity, y velocity, state, direction, immunity, camera x, camera y) at the start
+        # of the level, since these carry over from the previous level
+        if start_state is None:
+            start_state = (100, 0, 0, EntityState.IDLE.value, Direction.RIGHT.value, 0, 0, 0)
+        self.start_state = start_state
+
+        # List of (input bits, delta time) tuples, one for every simulation step
+        self.steps = []
+
+    @staticmethod
+    def capture_start_state(player, camera) -> tuple:
+        """Returns the parts of the state of the game which carry over from one level to the next"""
+        immunity = 0
+        if player.is_immune():
+            immunity = player.IMMUNITY_TIME - (player.simulation_time - player.last_collide_time)
+        return (player.health,
+                player.x_velocity,
+                player.y_velocity,
+                player.state.value,
+                player.direction.value,
+                immunity,
+                camera.rect.x,
+                camera.rect.y)
+
+    def apply_start_state(self, player, camera):
+        """Restores the state of the game at the start of the recorded level"""
+        health, x_velocity, y_velocity, state, direction, immunity, camera_x, camera_y = self.start_state
+        player.health = health
+        player.x_velocity = x_velocity
+        player.y_velocity = y_velocity
+        player.state = EntityState(state)
+        player.direction = Direction(direction)
+        if immunity > 0:
+            player.last_collide_time = player.simulation_time - (player.IMMUNITY_TIME - immunity)
+
+        camera.rect.topleft = (camera_x, camera_y)
+        camera.save_previous_position()
+        camera.interpolate(1)
+
+    def save(self, filepath: str):
+        """Writes the replay to the specified file"""
+        with open(filepath, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC,
+                                     self.VERSION,
+                                     self.level,
+                                     self.seed,
+                                     len(self.steps),
+                                     *self.start_state))
+            f.write(b"".join(self.STEP.pack(bits, delta_time) for bits, delta_time in self.steps))
+
+    @staticmethod
+    def load(filepath: str):
+        """Reads a replay from the specified file"""
+        with open(filepath, "rb") as f:
+            data = f.read()
+
+        if len(data) < Replay.HEADER.size:
+            raise ValueError(filepath + " is not a replay file")
+        magic, version, level, seed, step_count, *start_state = Replay.HEADER.unpack_from(data)
+        if magic != Replay.MAGIC:
+            raise ValueError(filepath + " is not a replay file")
+        if version != Replay.VERSION:
+            raise ValueError(filepath + " was recorded with an unsupported replay version (" + str(version) + ")")
+
+        replay = Replay(level, seed, tuple(start_state))
+        replay.steps = list(Replay.STEP.iter_unpack(data[Replay.HEADER.size:
+                                                         Replay.HEADER.size + step_count * Replay.STEP.size]))
+        return replay
+
+
+class ReplayRecorder:
+    """Records every simulation step of the GameScene, saving one Replay for every level played"""
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.replay = None
+        self.level = None
+
+        # The game can be closed from many places, so make sure that the last replay is always saved
+        atexit.register(self.stop)
+
+    def record(self, level_number: int, level, player, camera, input_state: InputState, delta_time: float):
+        """Records a single simulation step, starting a new Replay if a different level has been loaded"""
+        if level is not self.level:
+            self.stop()
+            self.start(level_number, level, player, camera)
+        if self.replay is not None:
+            self.replay.steps.append((input_state.bits, delta_time))
+
+    def start(self, level_number: int, level, player, camera):
+        """Starts recording a new Replay of the given level"""
+        seed = random.randrange(2 ** 32)
+        random.seed(seed)
+        self.level = level
+        self.replay = Replay(level_number, seed, Replay.capture_start_state(player, camera))
+
+    def skip_rest_of_level(self, level):
+        """Saves the Replay currently being recorded, and records nothing more until another level is loaded.
+        Used when the level is restored from a checkpoint, which a Replay cannot reproduce."""
+        self.stop()
+        self.level = level
+
+    def stop(self):
+        """Saves the Replay currently being recorded, if any"""
+        if self.replay is not None and len(self.replay.steps) > 0:
+            filename = "level" + str(self.replay.level) + "-" + time.strftime("%Y%m%d-%H%M%S") + ".replay"
+            self.replay.save(os.path.join(self.directory, filename))
+        self.replay = None
+        self.level = None
+
+
+def capture_state(scene) -> tuple:
+    """Returns everything in the GameScene that affects gameplay, as a tuple of plain values"""
+    player = scene.player
+    level = scene.level_manager.level
+
+    player_state = (tuple(player.rect),
+                    player.x_velocity,
+                    player.y_velocity,
+                    player.state.value,
+                    player.direction.value,
+                    player.health)
+
+    enemy_states = tuple((enemy.schedule_slot,
+                          tuple(enemy.rect),
+                          enemy.x_velocity,
+                          enemy.y_velocity,
+                          enemy.state.value,
+                          enemy.direction.value,
+                          enemy.health)
+                         for enemy in level.enemies.enemies)
+
+    block_states = []
+    coin_positions = []
+    for sprite in level.map.interactive_objects_group:
+        if isinstance(sprite, FallingBlock):
+            block_states.append((tuple(sprite.rect), sprite.vel, sprite.fallen))
+        elif isinstance(sprite, PushableBlock):
+            block_states.append((tuple(sprite.rect), sprite.y_velocity))
+        elif isinstance(sprite, Coin):
+            coin_positions.append(sprite.rect.topleft)
+
+    return player_state, enemy_states, tuple(block_states), tuple(coin_positions)
+
+
+def hash_state(scene) -> str:
+    """Returns a short hash of the state of the GameScene"""
+    return hashlib.blake2b(repr(capture_state(scene)).encode(), digest_size=8).hexdigest()
+
+
+class ReplayResult:
+    """Summary of a Replay that has been played back"""
+    def __init__(self, outcome: str, steps: int, simulated_time: float, elapsed_time: float, scene):
+        self.outcome = outcome                  # "LEVEL_COMPLETE", "GAME_OVER" or "INCOMPLETE"
+        self.steps = steps
+        self.simulated_time = simulated_time
+        self.elapsed_time = elapsed_time
+        self.scene = scene                      # The GameScene in its final state
+
+
+class ReplayRunner:
+    """Plays a Replay through a new GameScene as fast as possible, without rendering anything"""
+    def __init__(self, replay: Replay):
+        self.replay = replay
+
+    def create_scene(self) -> GameScene:
+        """Creates a GameScene in the state at the start of the recorded level"""
+        scene = GameScene()
+
+        # Nothing is heard or seen, so sound is muted just like when fast-forwarding
+        scene.manager.set_fast_forward(True)
+
+        scene.level_manager.load_level(self.replay.level, scene.player, scene.camera)
+        self.replay.apply_start_state(scene.player, scene.camera)
+        random.seed(self.replay.seed)
+        pg.event.clear()
+        return scene
+
+    def run(self, on_step=None) -> ReplayResult:
+        """Plays back every step of the Replay. on_step(step_number, scene) is called after every step."""
+        scene = self.create_scene()
+        start_time = time.perf_counter()
+
+        outcome = "INCOMPLETE"
+        steps = 0
+        simulated_time = 0
+        for bits, delta_time in self.replay.steps:
+            scene.input_state = InputState(bits)
+            scene.update(delta_time)
+            simulated_time += delta_time
+            if on_step is not None:
+                on_step(steps, scene)
+            steps += 1
+
+            # The recording ends when the GameScene stops being updated
+            for event in pg.event.get():
+                if event.type == GameEvent.SWITCH_LEVEL.value:
+                    outcome = "LEVEL_COMPLETE"
+                elif event.type == GameEvent.GAME_OVER.value:
+                    outcome = "GAME_OVER"
+            if outcome != "INCOMPLETE":
+                break
+
+        return ReplayResult(outcome, steps, simulated_time, time.perf_counter() - start_time, scene)
+
+    def run_trace(self, interval: int = 30):
+        """Plays back the Replay, hashing the state every interval steps and after the last step.
+        Returns the ReplayResult and the trace as a list of (step number, hash) tuples."""
+        trace = []
+
+        def on_step(step, scene):
+            if (step + 1) % interval == 0:
+                trace.append((step + 1, hash_state(scene)))
+
+        result = self.run(on_step)
+        if len(trace) == 0 or trace[-1][0] != result.steps:
+            trace.append((result.steps, hash_state(result.scene)))
+        return result, trace
@@ -0,0 +1,68 @@
+import pygame as pg
+from .entitystate import SimulationTier
+
+"""
+* =============================================================== *
+* This module contains the SimulationScheduler, which decides how *
+* often each entity is simulated based on its distance from the   *
+* camera.                                                         *
+* =============================================================== *
+
+LEVELS OF DETAIL
+-------------------------
+Every entity is placed in one of three tiers on every simulation step:
+    FULL        ->      Within FULL_MARGIN pixels of the camera. Simulated on every step with
+                        AI, physics, damage checks and animation.
+    REDUCED     ->      Within REDUCED_MARGIN pixels of the camera. Simulated every few steps
+                        in a single coarse physics step, and without animation.
+    DORMANT     ->      Everything else. Simulated rarely, in the coarsest physics step.
+
+Time that passes between the updates of an entity is accumulated on the entity, so that an entity
+which is simulated less often still covers the same distance. Entities are assigned a slot when they
+are created, which staggers the updates of REDUCED and DORMANT entities across steps.
+"""
+
+
+class SimulationScheduler:
+    """Assigns entities to simulation tiers and decides which entities are due for an update"""
+    FULL_MARGIN = 100
+    REDUCED_MARGIN = 400
+
+    # Number of simulation steps between two updates of an entity in each tier
+    UPDATE_INTERVALS = {SimulationTier.FULL: 1,
+                        SimulationTier.REDUCED: 2,
+                        SimulationTier.DORMANT: 4
+                        }
+
+    def __init__(self):
+        self.step_counter = 0
+        self.full_rect = pg.Rect(0, 0, 0, 0)
+        self.reduced_rect = pg.Rect(0, 0, 0, 0)
+
+        # Number of entities which were updated in each tier on the current step
+        self.tier_counts = {tier: 0 for tier in SimulationTier}
+
+    def begin_step(self, camera):
+        """Recomputes the tier boundaries around the camera and resets the counters for the new step"""
+        self.step_counter += 1
+        self.full_rect = camera.rect.inflate(2 * self.FULL_MARGIN, 2 * self.FULL_MARGIN)
+        self.reduced_rect = camera.rect.inflate(2 * self.REDUCED_MARGIN, 2 * self.REDUCED_MARGIN)
+        for tier in self.tier_counts:
+            self.tier_counts[tier] = 0
+
+    def get_tier(self, entity) -> SimulationTier:
+        """Returns the simulation tier of the entity on the current step"""
+        if self.full_rect.colliderect(entity.rect):
+            return SimulationTier.FULL
+        elif self.reduced_rect.colliderect(entity.rect):
+            return SimulationTier.REDUCED
+        else:
+            return SimulationTier.DORMANT
+
+    def is_due(self, tier: SimulationTier, slot: int) -> bool:
+        """Checks if an entity in the given tier and slot should be updated on the current step"""
+        return (self.step_counter + slot) % self.UPDATE_INTERVALS[tier] == 0
+
+    def record(self, tier: SimulationTier):
+        """Counts an entity as having been updated in the given tier on the current step"""
+        self.tier_counts[tier] += 1
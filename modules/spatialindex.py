@@ -0,0 +1,61 @@
+from bisect import bisect_left, bisect_right
+
+"""
+* =============================================================== *
+* This module contains the XIndex, which keeps sprites sorted by  *
+* their x-coordinate, so that the sprites within a range of x can *
+* be found without looking at every sprite.                       *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+The sprites are kept in a list sorted by the left edge of their rects, together with a list of the left edges
+themselves, which is searched with bisect. A sprite overlaps the range from left to right if its left edge is
+before right and its right edge is after left, so only the sprites whose left edges lie between
+left - max_width and right have to be looked at. Finding the sprites in a range therefore takes logarithmic
+time, plus the number of sprites found.
+
+MOVING SPRITES
+-------------------------
+The index does not notice sprites moving. Sprites which move must be followed by a call to sort(), which sorts
+the sprites by their new positions. Sprites only move a few pixels at a time, so the list is already almost in
+order, which Python's sort handles in linear time.
+"""
+
+
+def get_left(sprite) -> int:
+    return sprite.rect.left
+
+
+class XIndex:
+    """Sprites sorted by the left edge of their rects"""
+    def __init__(self, sprites=()):
+        self.sprites = sorted(sprites, key=get_left)
+        self.lefts = [sprite.rect.left for sprite in self.sprites]
+        self.max_width = max((sprite.rect.width for sprite in self.sprites), default=0)
+
+    def __len__(self) -> int:
+        return len(self.sprites)
+
+    def add(self, sprite) -> None:
+        index = bisect_right(self.lefts, sprite.rect.left)
+        self.sprites.insert(index, sprite)
+        self.lefts.insert(index, sprite.rect.left)
+        self.max_width = max(self.max_width, sprite.rect.width)
+
+    def remove(self, sprite) -> None:
+        # The sprite may have moved since it was sorted, so it is looked up directly rather than by its position
+        index = self.sprites.index(sprite)
+        del self.sprites[index]
+        del self.lefts[index]
+
+    def sort(self) -> None:
+        """Sorts the sprites again after any of them have moved"""
+        self.sprites.sort(key=get_left)
+        self.lefts = [sprite.rect.left for sprite in self.sprites]
+
+    def query(self, left: int, right: int) -> list:
+        """Returns the sprites which overlap the range of x from left to right, in order of their left edges"""
+        start = bisect_right(self.lefts, left - self.max_width)
+        end = bisect_left(self.lefts, right)
+        return [sprite for sprite in self.sprites[start:end] if sprite.rect.right > left]
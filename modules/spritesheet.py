@@ -107,4 +107,15 @@ class TerrainType:
         self.block_width = block_width
         self.block_height = block_height
 
+        # Image scaled to the size of the hitbox, which is shared by every Block of this type
+        self.block_image = None
+
+    def get_block_image(self, block_size: int) -> pg.Surface:
+        """Returns the image scaled to the size of the hitbox, scaling it the first time that it is needed"""
+        if self.block_image is None:
+            self.block_image = pg.transform.scale(self.image.convert_alpha(),
+                                                  (int(self.block_width * block_size),
+                                                   int(self.block_height * block_size)))
+        return self.block_image
+
 
@@ -7,6 +7,15 @@ from modules.spritesheet import Tileset, TerrainType
 class TextureSet:
     """Contains a dictionary of the types of tiles and its corresponding TerrainType objects,
     and allows for the retrieval for the corresponding TerrainType object of the specified tile type"""
+    # Shared by every level, so that the tilesets are only loaded once
+    shared = None
+
+    @staticmethod
+    def get_shared():
+        if TextureSet.shared is None:
+            TextureSet.shared = TextureSet()
+        return TextureSet.shared
+
     def __init__(self):
         ruby = Tileset("assets/textures/environment/animated/ruby.png")
         tileset = Tileset("assets/textures/environment/static/terrain.png")
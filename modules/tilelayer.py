@@ -0,0 +1,74 @@
+from .block import Block
+
+"""
+* =============================================================== *
+* This module contains the TileLayer, which holds the static      *
+* tiles of one layer of the map in a grid, so that only the tiles *
+* in view have to be looked at when rendering.                    *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+Every tile is placed at the cell of the map that it was placed in by the level, so the cells which can be seen
+are a simple range of rows and columns worked out from the rect of the camera. The cost of rendering a layer
+therefore depends on the size of the screen rather than the size of the map.
+
+Some tiles are drawn larger than a single cell, or offset from their cell (e.g. BG_WINDOW_DOUBLE covers 4.5 by
+4 cells), so they can be seen even when their own cell is off screen. The TileLayer keeps track of how far its
+tiles reach past their cells, and widens the range of cells by that much on each side.
+
+Tiles which have been killed (e.g. collected coins, or tiles deleted in the level editor) are skipped. The
+visible tiles are returned by get_blits() as a list which can be drawn with a single call to Surface.blits().
+"""
+
+
+class TileLayer:
+    """Grid of the static tiles of one layer of the map"""
+    def __init__(self, rows: int, columns: int):
+        self.rows = rows
+        self.columns = columns
+        self.cells = [[None] * columns for row in range(rows)]
+
+        # Furthest that any tile reaches past the top left corner of its cell, in pixels.
+        # Every tile covers at least its own cell.
+        self.min_dx = 0
+        self.max_dx = Block.BLOCK_SIZE
+        self.min_dy = 0
+        self.max_dy = Block.BLOCK_SIZE
+
+    def set(self, row: int, column: int, sprite) -> None:
+        """Places the sprite in a cell, replacing whatever was there. The sprite can be None to empty the cell."""
+        self.cells[row][column] = sprite
+        if sprite is None:
+            return
+
+        # The margins only ever grow, which at worst means looking at a few more cells than necessary
+        x = column * Block.BLOCK_SIZE
+        y = row * Block.BLOCK_SIZE
+        self.min_dx = min(self.min_dx, sprite.rect.left - x)
+        self.max_dx = max(self.max_dx, sprite.rect.right - x)
+        self.min_dy = min(self.min_dy, sprite.rect.top - y)
+        self.max_dy = max(self.max_dy, sprite.rect.bottom - y)
+
+    def get_visible_range(self, view_rect):
+        """Returns the first and last rows and columns of the cells whose tiles could overlap the view rect"""
+        first_row = max((view_rect.top - self.max_dy) // Block.BLOCK_SIZE, 0)
+        last_row = min((view_rect.bottom - 1 - self.min_dy) // Block.BLOCK_SIZE, self.rows - 1)
+        first_column = max((view_rect.left - self.max_dx) // Block.BLOCK_SIZE, 0)
+        last_column = min((view_rect.right - 1 - self.min_dx) // Block.BLOCK_SIZE, self.columns - 1)
+        return first_row, last_row, first_column, last_column
+
+    def get_blits(self, view_rect) -> list:
+        """Returns the (image, position) of every tile which can be seen through the view rect, with the position
+        relative to the view rect"""
+        first_row, last_row, first_column, last_column = self.get_visible_range(view_rect)
+        view_x = view_rect.x
+        view_y = view_rect.y
+        return [(sprite.image, (sprite.rect.x - view_x, sprite.rect.y - view_y))
+                for row in self.cells[first_row:last_row + 1]
+                for sprite in row[first_column:last_column + 1]
+                if sprite is not None and sprite.alive()]
+
+    def render(self, view_rect, surface) -> None:
+        """Draws the tiles which can be seen through the view rect"""
+        surface.blits(self.get_blits(view_rect), doreturn=False)
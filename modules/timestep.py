@@ -0,0 +1,69 @@
+"""
+* =============================================================== *
+* This module contains the FixedTimestep class, which allows the  *
+* game loop to advance the simulation in steps of a fixed length, *
+* independently of the frame rate.                                *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+The time taken by every frame is added to an accumulator. The simulation is then stepped forward
+by FIXED_TIMESTEP for as long as the accumulator holds at least one full step, so the simulation
+always advances by the same amount of time no matter how long the frame took.
+
+The time left in the accumulator is a fraction of a step that has not been simulated yet. This
+fraction (alpha) is used by the renderer to interpolate between the previous and current state
+of each moving object, so movement remains smooth even when the frame rate and the simulation
+rate differ.
+
+If the game loop stops stepping before the accumulator runs out because the scene is about to
+change, it calls stop_stepping(), so that alpha is not left over from the previous frame. Since
+the remaining time may be more than a full step, alpha is clamped to 1, which renders the state of
+the last simulated step. The remaining time belonged to the scene that is ending, so it is thrown
+away rather than given to the next scene, whose animations (e.g. the FadeOutScene and the
+LoadingScene) count steps and would otherwise be cut short after a long or fast-forwarded frame.
+
+FAST-FORWARD
+-------------------------
+The time of every frame is multiplied by speed before it is added to the accumulator, so a speed of
+N runs N simulation steps for every step's worth of real time. The simulation itself is unchanged,
+since every step still advances the game by exactly FIXED_TIMESTEP.
+"""
+
+# Every step of the simulation advances the game by exactly this amount of time
+FIXED_TIMESTEP = 1 / 60
+
+
+class FixedTimestep:
+    """Accumulates frame time and releases it in steps of a fixed length"""
+    # Frames longer than this are clamped, so that a long stall does not make the simulation
+    # run a huge number of steps to catch up
+    MAX_FRAME_TIME = 0.25
+
+    def __init__(self, step: float = FIXED_TIMESTEP):
+        self.step = step
+        self.accumulator = 0
+        self.alpha = 0
+
+        # Number of seconds of game time simulated for every second of real time
+        self.speed = 1
+
+    def advance(self, frame_time: float):
+        """Adds the time taken by the last frame to the accumulator"""
+        self.accumulator += min(frame_time, self.MAX_FRAME_TIME) * self.speed
+
+    def consume_step(self) -> bool:
+        """Removes one step from the accumulator if possible, returning True if a step should be simulated"""
+        if self.accumulator >= self.step:
+            self.accumulator -= self.step
+            return True
+
+        # No more steps to simulate, so the remainder determines how far to interpolate when rendering
+        self.alpha = self.accumulator / self.step
+        return False
+
+    def stop_stepping(self):
+        """Sets the interpolation factor when no more steps will be simulated this frame because the scene is
+        changing, and throws away the time left in the accumulator"""
+        self.alpha = min(self.accumulator / self.step, 1)
+        self.accumulator = 0
@@ -0,0 +1,43 @@
+from modules.headless import use_dummy_drivers
+
+# Replays are played back without a window or sound
+use_dummy_drivers()
+
+import argparse
+import pygame as pg
+from modules.replay import Replay, ReplayRunner
+
+"""
+* =============================================================== *
+* This is the entry point for playing back replays recorded with  *
+* "main.py --record DIRECTORY". Every replay is simulated as fast *
+* as possible without rendering, and its outcome is printed.      *
+* =============================================================== *
+"""
+
+
+def main() -> None:
+    """Plays back every replay given on the command line"""
+    parser = argparse.ArgumentParser(description="Plays back replays of The Tower without a window")
+    parser.add_argument("replays", nargs="+", metavar="REPLAY", help="replay file to play back")
+    args = parser.parse_args()
+
+    # Initialise PyGame. A display mode is still required for images to be converted.
+    pg.mixer.pre_init(44100, 16, 2, 512)
+    pg.init()
+    pg.display.set_mode((800, 600))
+
+    for filepath in args.replays:
+        replay = Replay.load(filepath)
+        result = ReplayRunner(replay).run()
+        player = result.scene.player
+
+        print("%s: level %d, %s after %d steps (%.2f s)"
+              % (filepath, replay.level, result.outcome, result.steps, result.simulated_time))
+        print("    player at (%d, %d) with %d health, played back in %.2f s"
+              % (player.rect.x, player.rect.y, player.health, result.elapsed_time))
+
+    pg.quit()
+
+
+main()
@@ -1,25 +1,44 @@
 from cx_Freeze import setup, Executable
 
+# Modules which need NumPy are left out, since the game does not require it: modules.flowfield and
+# modules.particles are optional, and the game runs without them, while modules.environment is only used by
+# automated playtesters running from the source tree, never by the built game.
 options = {
     "build_exe": {
         "includes": ["modules.__init__",
+                     "modules.animation",
                      "modules.background",
                      "modules.block",
                      "modules.camera",
+                     "modules.checkpoint",
+                     "modules.collision",
                      "modules.components",
                      "modules.entities",
                      "modules.entitystate",
                      "modules.gamescene",
+                     "modules.gradient",
+                     "modules.headless",
                      "modules.headsupdisplay",
+                     "modules.inputstate",
                      "modules.leveljson",
+                     "modules.lighting",
+                     "modules.navigation",
+                     "modules.objectpool",
+                     "modules.renderqueue",
+                     "modules.replay",
+                     "modules.scheduler",
+                     "modules.spatialindex",
                      "modules.spritesheet",
                      "modules.textureset",
+                     "modules.tilelayer",
+                     "modules.timestep",
                      "dev_modules.__init__",
                      "dev_modules.editorcamera",
                      "dev_modules.editorlevel",
                      "dev_modules.editorpanels",
                      "dev_modules.editorscenes",
-                     "dev_modules.events"
+                     "dev_modules.events",
+                     "dev_modules.solvability"
                      ],
 
         "include_files": ["assets/",
@@ -0,0 +1,179 @@
+import unittest
+
+import pygame as pg
+
+from modules.collision import CollisionGrid
+
+"""
+* =============================================================== *
+* Regression tests for the CollisionGrid, comparing its sweeps    *
+* against the per-sprite resolution that it replaced, and the     *
+* merged terrain against one collider per tile.                   *
+* =============================================================== *
+
+HOW IT WORKS
+-------------------------
+The same map of solid tiles is added to one grid tile by tile, and to another with add_solid_tiles(), which merges
+the tiles. Hitboxes which start clear of the terrain must end up in the same place with either grid, and in the same
+place as the old resolution, which moved the hitbox first and then pushed it out of every tile it overlapped.
+
+Hitboxes which start inside the terrain must also end up in the same place with either grid, and must overlap the
+same tiles.
+"""
+
+CELL_SIZE = 16
+
+# A floor, a platform, a wall and a pillar, with a gap between the floor and the wall
+TILE_MAP = ["..........",
+            "..........",
+            "...###..#.",
+            "........#.",
+            "........#.",
+            "##.###..#.",
+            "##.#######"]
+
+
+def get_solid_tiles() -> list:
+    """Returns the TILE_MAP as a 2-dimensional array of booleans"""
+    return [[character == "#" for character in row] for row in TILE_MAP]
+
+
+def get_tile_rects() -> list:
+    """Returns the rect of every solid tile in the TILE_MAP"""
+    return [pg.Rect(column * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+            for row, line in enumerate(TILE_MAP)
+            for column, character in enumerate(line) if character == "#"]
+
+
+class Tile:
+    """A collider covering a single tile, as the terrain was stored before tiles were merged"""
+    def __init__(self, rect: pg.Rect):
+        self.rect = rect
+        self.is_spike = False
+
+
+def resolve_per_sprite(rect, distance: int, axis: str) -> pg.Rect:
+    """Moves a copy of the rect and pushes it out of every tile it overlaps, as the PhysicsComponent did before
+    the CollisionGrid was added"""
+    rect = rect.copy()
+    if axis == "x":
+        rect.x += distance
+        for other in [tile for tile in get_tile_rects() if tile.colliderect(rect)]:
+            if other.left < rect.left < other.right:
+                rect.left = other.right
+            if other.left < rect.right < other.right:
+                rect.right = other.left
+    else:
+        rect.y += distance
+        for other in [tile for tile in get_tile_rects() if tile.colliderect(rect)]:
+            if other.top < rect.top < other.bottom:
+                rect.top = other.bottom
+            if other.top < rect.bottom < other.bottom:
+                rect.bottom = other.top
+    return rect
+
+
+class TestCollisionGrid(unittest.TestCase):
+    def setUp(self):
+        self.per_tile_grid = CollisionGrid(CELL_SIZE)
+        for tile in get_tile_rects():
+            self.per_tile_grid.add_static(Tile(tile))
+
+        self.merged_grid = CollisionGrid(CELL_SIZE)
+        self.merged_grid.add_solid_tiles(get_solid_tiles())
+
+    def get_clear_rects(self, size: int) -> list:
+        """Returns every rect of the given size, on a 2 pixel grid in and around the map, which overlaps no tile"""
+        tiles = get_tile_rects()
+        width = len(TILE_MAP[0]) * CELL_SIZE
+        height = len(TILE_MAP) * CELL_SIZE
+        return [rect for rect in (pg.Rect(x, y, size, size)
+                                  for x in range(-size, width + 1, 2)
+                                  for y in range(-size, height + 1, 2))
+                if rect.collidelist(tiles) == -1]
+
+    def test_merged_tiles_are_fewer(self):
+        merged = {id(sprite) for sprites in self.merged_grid.static_cells.values() for sprite in sprites}
+        self.assertLess(len(merged), len(get_tile_rects()))
+
+    def test_clear_rects_match_per_sprite_resolution(self):
+        # The old resolution only worked for moves shorter than both the hitbox and a tile
+        for rect in self.get_clear_rects(12):
+            for distance in (-11, -5, -1, 1, 5, 11):
+                for axis in ("x", "y"):
+                    sweep = "sweep_x" if axis == "x" else "sweep_y"
+                    per_tile, hit = getattr(self.per_tile_grid, sweep)(rect, distance)
+                    merged, merged_hit = getattr(self.merged_grid, sweep)(rect, distance)
+                    expected = resolve_per_sprite(rect, distance, axis)
+                    moved = rect.move(per_tile, 0) if axis == "x" else rect.move(0, per_tile)
+
+                    message = "{} moved {} along {}".format(rect, distance, axis)
+                    self.assertEqual(per_tile, merged, message)
+                    self.assertEqual(hit is None, merged_hit is None, message)
+                    self.assertEqual(moved, expected, message)
+
+    def test_clear_rects_match_for_long_sweeps(self):
+        for rect in self.get_clear_rects(12):
+            for distance in (-500, -40, 40, 500):
+                self.assertEqual(self.per_tile_grid.sweep_x(rect, distance)[0],
+                                 self.merged_grid.sweep_x(rect, distance)[0])
+                self.assertEqual(self.per_tile_grid.sweep_y(rect, distance)[0],
+                                 self.merged_grid.sweep_y(rect, distance)[0])
+
+    def test_long_sweeps_stop_at_nearest_collider(self):
+        # Falling from far above the pillar lands on top of it
+        rect = pg.Rect(8 * CELL_SIZE, -1000, 12, 12)
+        distance, hit = self.merged_grid.sweep_y(rect, 5000)
+        self.assertEqual(rect.bottom + distance, 2 * CELL_SIZE)
+        self.assertIsNotNone(hit)
+
+        # Sweeps outside of the map never hit anything
+        rect = pg.Rect(-1000, -1000, 12, 12)
+        self.assertEqual(self.merged_grid.sweep_x(rect, 5000), (5000, None))
+        self.assertEqual(self.merged_grid.sweep_y(rect, -5000), (-5000, None))
+
+    def get_rects_inside_terrain(self, size: int) -> list:
+        """Returns every rect of the given size, on a 2 pixel grid in the map, which overlaps a tile"""
+        tiles = get_tile_rects()
+        width = len(TILE_MAP[0]) * CELL_SIZE
+        height = len(TILE_MAP) * CELL_SIZE
+        return [rect for rect in (pg.Rect(x, y, size, size)
+                                  for x in range(0, width, 2)
+                                  for y in range(0, height, 2))
+                if rect.collidelist(tiles) != -1]
+
+    def test_rects_inside_terrain_match_per_tile(self):
+        for rect in self.get_rects_inside_terrain(12):
+            for distance in (-40, -11, -4, -1, 1, 4, 11, 40):
+                for sweep in ("sweep_x", "sweep_y"):
+                    per_tile, hit = getattr(self.per_tile_grid, sweep)(rect, distance)
+                    merged, merged_hit = getattr(self.merged_grid, sweep)(rect, distance)
+
+                    message = "{} moved {} with {}".format(rect, distance, sweep)
+                    self.assertEqual(per_tile, merged, message)
+                    self.assertEqual(hit is None, merged_hit is None, message)
+
+    def test_rect_inside_terrain_moving_down(self):
+        # A hitbox inside the pillar, overlapping the top of the tile below the one it is in, is pushed back up out
+        # of the tile below, even though the top of the pillar is above it
+        rect = pg.Rect(8 * CELL_SIZE + 2, 3 * CELL_SIZE - 6, 12, 12)
+        self.assertEqual(self.per_tile_grid.sweep_y(rect, 4)[0], -6)
+        self.assertEqual(self.merged_grid.sweep_y(rect, 4)[0], -6)
+
+    def test_rect_inside_terrain_moving_sideways(self):
+        # A hitbox inside the floor, overlapping the left of the tile next to the one it is in, is pushed back left
+        # out of that tile, even though the left of the floor is behind it
+        rect = pg.Rect(4 * CELL_SIZE - 6, 6 * CELL_SIZE + 2, 12, 12)
+        self.assertEqual(self.per_tile_grid.sweep_x(rect, 4)[0], -6)
+        self.assertEqual(self.merged_grid.sweep_x(rect, 4)[0], -6)
+
+    def test_overlapping_returns_tiles(self):
+        # Crushing compares the bottom of each tile above an enemy with its centre, so merged tiles are split up
+        for rect in self.get_rects_inside_terrain(12):
+            per_tile = sorted(tuple(sprite.rect) for sprite in self.per_tile_grid.get_overlapping(rect))
+            merged = sorted(tuple(sprite.rect) for sprite in self.merged_grid.get_overlapping(rect))
+            self.assertEqual(per_tile, merged, rect)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import time
+import unittest
+
+import pygame as pg
+
+from modules.particles import ParticleSystem, PALETTE, PARTICLE_SIZE
+
+"""
+* =============================================================== *
+* Tests for the ParticleSystem, including the budget of a         *
+* millisecond per frame for thousands of particles.               *
+* =============================================================== *
+"""
+
+# Every frame, the particle system may take up to this long to move and draw this many particles
+BUDGET = 0.001
+BUDGET_PARTICLES = 3000
+
+
+class TestParticleSystem(unittest.TestCase):
+    def setUp(self):
+        self.surface = pg.Surface((320, 240))
+        self.view_rect = pg.Rect(100, 50, 320, 240)
+        self.particle_system = ParticleSystem(seed=1)
+
+    def test_particle_is_drawn_as_square(self):
+        self.particle_system.emit((110, 60), 1, "RUBY", spread=0, lifetime=1)
+        self.particle_system.render(self.view_rect, self.surface)
+
+        colour = pg.Color(*PALETTE["RUBY"])
+        for x in range(10, 10 + PARTICLE_SIZE):
+            for y in range(10, 10 + PARTICLE_SIZE):
+                self.assertEqual(self.surface.get_at((x, y)), colour)
+        self.assertEqual(self.surface.get_at((10 + PARTICLE_SIZE, 10)), pg.Color(0, 0, 0))
+        self.assertEqual(self.surface.get_at((10, 10 + PARTICLE_SIZE)), pg.Color(0, 0, 0))
+
+    def test_particles_on_edge_are_clipped(self):
+        # Half in view to the top left and bottom right, and wholly out of view
+        for position in ((99, 49), (419, 289), (90, 60), (500, 60)):
+            self.particle_system.emit(position, 1, "SPARK", spread=0, lifetime=1)
+        self.particle_system.render(self.view_rect, self.surface)
+
+        colour = pg.Color(*PALETTE["SPARK"])
+        self.assertEqual(self.surface.get_at((0, 0)), colour)
+        self.assertEqual(self.surface.get_at((319, 239)), colour)
+        self.assertEqual(pg.mask.from_threshold(self.surface, colour, (1, 1, 1, 255)).count(), 2)
+
+    def test_dead_particles_are_not_drawn(self):
+        self.particle_system.emit((110, 60), 10, "DUST", spread=0, lifetime=0.1)
+        self.particle_system.update(0.2)
+        self.assertEqual(len(self.particle_system), 0)
+        self.particle_system.render(self.view_rect, self.surface)
+        self.assertEqual(self.surface.get_at((10, 10)), pg.Color(0, 0, 0))
+
+    def test_budget(self):
+        # The best of several runs, so that the test does not fail whenever something else is running. Each run
+        # starts with new particles and is short, so that every particle stays in view and is drawn.
+        frame_times = []
+        for run in range(10):
+            self.particle_system.clear()
+            for colour in PALETTE:
+                self.particle_system.emit((260, 170), BUDGET_PARTICLES // len(PALETTE), colour, spread=600,
+                                          lifetime=60)
+            self.assertEqual(len(self.particle_system), BUDGET_PARTICLES)
+
+            start = time.perf_counter()
+            for frame in range(5):
+                self.particle_system.update(1 / 60)
+                self.particle_system.render(self.view_rect, self.surface)
+            frame_times.append((time.perf_counter() - start) / 5)
+        self.assertLess(min(frame_times), BUDGET)
+
+if __name__ == "__main__":
+    unittest.main()
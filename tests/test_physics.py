@@ -0,0 +1,120 @@
+import unittest
+
+import pygame as pg
+
+from modules.block import Block, FallingBlock, PushableBlock
+from modules.collision import CollisionGrid
+from modules.components import PlayerPhysicsComponent, EnemyPhysicsComponent
+from modules.entitystate import EntityState, Direction
+
+"""
+* =============================================================== *
+* Regression tests for tunnelling: entities and moving blocks at  *
+* extreme velocities must stop at a floor or wall only one tile   *
+* thick, rather than passing through it in a single step.         *
+* =============================================================== *
+"""
+
+DELTA_TIME = 1 / 60
+
+# Far more than the size of the map in a single step
+EXTREME_VELOCITY = 10 ** 6
+
+TILE_SIZE = Block.BLOCK_SIZE
+MAP_SIZE = 40
+
+# Row of the floor and column of the wall, each one tile thick
+FLOOR_ROW = 30
+WALL_COLUMN = 30
+
+
+class Map:
+    """The parts of a Map used by the physics: a floor across the whole map, and a wall standing on it"""
+    def __init__(self):
+        self.rect = pg.Rect(0, 0, MAP_SIZE * TILE_SIZE, MAP_SIZE * TILE_SIZE)
+        solid_tiles = [[row == FLOOR_ROW or (column == WALL_COLUMN and row < FLOOR_ROW)
+                        for column in range(MAP_SIZE)]
+                       for row in range(MAP_SIZE)]
+        self.collision_grid = CollisionGrid(TILE_SIZE)
+        self.collision_grid.add_solid_tiles(solid_tiles)
+
+
+class Entity:
+    """The parts of an entity used by the physics"""
+    def __init__(self, x, y, x_velocity=0, y_velocity=0):
+        self.rect = pg.Rect(x, y, 20, 30)
+        self.x_velocity = x_velocity
+        self.y_velocity = y_velocity
+        self.state = EntityState.JUMPING
+        self.direction = Direction.RIGHT
+
+
+class TerrainType:
+    """The parts of a TerrainType used by a block which covers a whole tile"""
+    block_pos_x = 0
+    block_pos_y = 0
+    block_width = 1
+    block_height = 1
+
+    @staticmethod
+    def get_block_image(size: int):
+        return pg.Surface((size, size))
+
+
+class TestTunnelling(unittest.TestCase):
+    def setUp(self):
+        self.map = Map()
+        self.floor_top = FLOOR_ROW * TILE_SIZE
+        self.wall_left = WALL_COLUMN * TILE_SIZE
+
+    def test_player_falling_lands_on_floor(self):
+        player = Entity(100, 100, y_velocity=EXTREME_VELOCITY)
+        PlayerPhysicsComponent().update(DELTA_TIME, player, self.map)
+        self.assertEqual(player.rect.bottom, self.floor_top)
+        self.assertEqual(player.state, EntityState.IDLE)
+
+    def test_player_jumping_hits_floor_from_below(self):
+        player = Entity(100, self.floor_top + 2 * TILE_SIZE, y_velocity=-EXTREME_VELOCITY)
+        PlayerPhysicsComponent().update(DELTA_TIME, player, self.map)
+        self.assertEqual(player.rect.top, self.floor_top + TILE_SIZE)
+
+    def test_player_running_stops_at_wall(self):
+        player = Entity(100, self.floor_top - 30, x_velocity=EXTREME_VELOCITY)
+        PlayerPhysicsComponent().update(DELTA_TIME, player, self.map)
+        self.assertEqual(player.rect.right, self.wall_left)
+
+        player = Entity(self.wall_left + 2 * TILE_SIZE, self.floor_top - 30, x_velocity=-EXTREME_VELOCITY)
+        PlayerPhysicsComponent().update(DELTA_TIME, player, self.map)
+        self.assertEqual(player.rect.left, self.wall_left + TILE_SIZE)
+
+    def test_enemy_stops_at_floor_and_wall(self):
+        enemy = Entity(100, 100, x_velocity=EXTREME_VELOCITY, y_velocity=EXTREME_VELOCITY)
+        EnemyPhysicsComponent().update(DELTA_TIME, enemy, self.map)
+        self.assertEqual(enemy.rect.bottom, self.floor_top)
+        self.assertEqual(enemy.rect.right, self.wall_left)
+        # Enemies turn around when they walk into a wall
+        self.assertEqual(enemy.direction, Direction.LEFT)
+
+    def test_pushable_block_lands_on_floor(self):
+        block = PushableBlock(TerrainType(), 100, 100)
+        self.map.collision_grid.add_dynamic(block)
+        block.y_velocity = EXTREME_VELOCITY
+        block.update(Entity(500, 100), self.map.collision_grid)
+        self.assertEqual(block.rect.bottom, self.floor_top)
+        self.assertEqual(block.y_velocity, 0)
+
+    def test_falling_block_lands_on_floor(self):
+        block = FallingBlock(TerrainType(), 100, 100)
+        self.map.collision_grid.add_dynamic(block)
+        block.vel = EXTREME_VELOCITY
+
+        # The block only falls while the player stands on it
+        player = Entity(block.rect.x + 2, 0)
+        player.rect.bottom = block.rect.top
+        block.update(player, self.map.collision_grid)
+        self.assertEqual(block.rect.bottom, self.floor_top)
+        self.assertTrue(block.fallen)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from modules.timestep import FixedTimestep
+
+"""
+* =============================================================== *
+* Tests for the FixedTimestep, and the interpolation factor that  *
+* it gives to the renderer.                                       *
+* =============================================================== *
+"""
+
+
+# A step which can be stored exactly as a float, so that the number of steps is never rounded
+STEP = 1 / 64
+
+
+class TestFixedTimestep(unittest.TestCase):
+    def setUp(self):
+        self.timestep = FixedTimestep(STEP)
+
+    def count_steps(self) -> int:
+        """Consumes every step in the accumulator, returning how many there were"""
+        steps = 0
+        while self.timestep.consume_step():
+            steps += 1
+        return steps
+
+    def test_remainder_sets_alpha(self):
+        self.timestep.advance(3.5 * STEP)
+        self.assertEqual(self.count_steps(), 3)
+        self.assertEqual(self.timestep.alpha, 0.5)
+
+    def test_stop_stepping_replaces_alpha_of_previous_frame(self):
+        self.timestep.advance(1.5 * STEP)
+        self.count_steps()
+        self.assertEqual(self.timestep.alpha, 0.5)
+
+        # The loop stops after the first step, with several steps still in the accumulator
+        self.timestep.advance(4.5 * STEP)
+        self.assertTrue(self.timestep.consume_step())
+        self.timestep.stop_stepping()
+        self.assertEqual(self.timestep.alpha, 1)
+
+        # The remaining time belonged to the scene that ended, so it is not simulated afterwards
+        self.assertEqual(self.count_steps(), 0)
+
+    def test_next_scene_gets_only_its_own_time(self):
+        # A fast-forwarded frame ends the scene after its first step, with the rest of the frame left over
+        self.timestep.speed = 8
+        self.timestep.advance(FixedTimestep.MAX_FRAME_TIME)
+        self.assertTrue(self.timestep.consume_step())
+        self.timestep.stop_stepping()
+
+        # The next frame only simulates the steps of that frame in the next scene
+        self.timestep.advance(2 * STEP)
+        self.assertEqual(self.count_steps(), 16)
+
+    def test_stop_stepping_on_last_step(self):
+        self.timestep.advance(1.25 * STEP)
+        self.assertTrue(self.timestep.consume_step())
+        self.timestep.stop_stepping()
+        self.assertEqual(self.timestep.alpha, 0.25)
+
+
+if __name__ == "__main__":
+    unittest.main()